@@ -1,7 +1,6 @@
 from flask import Flask
 from flask import redirect, request, session, url_for, flash
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_babel import Babel
 
@@ -11,7 +10,6 @@ from config import Config
 
 db = SQLAlchemy()
 login_manager = LoginManager()
-migrate = Migrate()
 babel = Babel()
 
 
@@ -19,33 +17,96 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    db.init_app(app)
-    login_manager.init_app(app)
-    # Redirect unauthenticated users to login page
-    login_manager.login_view = 'frontend.login_page'
-    migrate.init_app(app, db)
-    # Locale selection helper
-
-    def select_locale():
-        return session.get('lang', app.config.get('BABEL_DEFAULT_LOCALE', 'pl'))
-
-    babel.init_app(app, locale_selector=select_locale)
-
-    # Import models so Flask-Migrate can detect them
-    from app.models import models  # noqa: F401
-
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.frontend import frontend_bp
-    from app.routes.public import public_bp
-    from app.routes.wishlist import wishlist_bp
-    from app.routes.events import events_bp
-
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(wishlist_bp)
-    app.register_blueprint(public_bp)
-    app.register_blueprint(events_bp)
-    app.register_blueprint(frontend_bp)
+    # Per-phase init timings for `flask perf startup`
+    from app.services.startup import PhaseTimer
+    timer = PhaseTimer(app)
+
+    with timer.phase('extensions'):
+        # Backend-specific pool settings and SQLite pragmas
+        from app.services import engine
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine.engine_options(app.config))
+        db.init_app(app)
+        engine.init_app(app)
+        login_manager.init_app(app)
+        # Redirect unauthenticated users to login page
+        login_manager.login_view = 'frontend.login_page'
+        # Locale selection helper
+
+        def select_locale():
+            return session.get('lang', app.config.get('BABEL_DEFAULT_LOCALE', 'pl'))
+
+        babel.init_app(app, locale_selector=select_locale)
+
+    with timer.phase('models'):
+        # Import models so Flask-Migrate can detect them
+        from app.models import models  # noqa: F401
+
+    with timer.phase('services'):
+        # Per-worker caches with invalidation hooks on the session
+        from app.services import dashboard
+        from app.services import user_cache
+        from app.services import wishlist_version
+        dashboard.init_app(app)
+        user_cache.init_app(app)
+        wishlist_version.init_app(app)
+
+        # Folded nicknames for ranking user search results
+        from app.services import user_search
+        user_search.init_app(app)
+
+        # Exchange rates and normalized item prices
+        from app.services import fx
+        fx.init_app(app)
+
+        # Password hashing service (optional process pool)
+        from app.services import passwords
+        passwords.init_app(app)
+
+        # Jinja bytecode cache and rendered static pages
+        from app.services import page_cache
+        page_cache.init_app(app)
+
+        # Opt-in request/SQL/template metrics at /metrics; only imported when enabled
+        if app.config.get('METRICS_ENABLED'):
+            from app.services import metrics
+            metrics.init_app(app)
+
+        # Slow statements with their query plans, as JSON lines (SLOW_QUERY_THRESHOLD_MS)
+        if app.config.get('SLOW_QUERY_THRESHOLD_MS') is not None:
+            from app.services import slow_query
+            slow_query.init_app(app)
+
+        # Server-sent event notifications (in-process or database-backed pub/sub)
+        from app.services import notifications
+        notifications.init_app(app)
+
+        # Link previews fetched in a background asyncio thread after commit; the
+        # fetcher (asyncio, ssl, html.parser) is only imported when enabled
+        from app.services import link_preview
+        link_preview.init_app(app)
+
+    with timer.phase('blueprints'):
+        # Register blueprints
+        from app.routes.auth import auth_bp
+        from app.routes.frontend import frontend_bp
+        from app.routes.public import public_bp
+        from app.routes.wishlist import wishlist_bp
+        from app.routes.events import events_bp
+
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(wishlist_bp)
+        app.register_blueprint(public_bp)
+        app.register_blueprint(events_bp)
+        app.register_blueprint(frontend_bp)
+
+    with timer.phase('cli'):
+        # Maintenance / performance CLI commands (flask perf ...); `flask db`
+        # only imports Flask-Migrate and Alembic when it is actually invoked
+        from app.cli import perf_bp, fx_bp, previews_bp, LazyMigrateGroup
+        app.register_blueprint(perf_bp)
+        app.register_blueprint(fx_bp)
+        app.register_blueprint(previews_bp)
+        app.cli.add_command(LazyMigrateGroup(app, db))
 
     # Expose locale helper to Jinja (for html lang attr)
     app.jinja_env.globals['get_locale'] = select_locale
@@ -0,0 +1,305 @@
+import click
+from flask import Blueprint, current_app
+
+perf_bp = Blueprint('perf', __name__, cli_group='perf')
+fx_bp = Blueprint('fx', __name__, cli_group='fx')
+previews_bp = Blueprint('previews', __name__, cli_group='previews')
+
+
+class LazyMigrateGroup(click.Group):
+    """Stand-in for the `flask db` group that defers Flask-Migrate.
+
+    Importing flask_migrate pulls in Alembic, Mako and Pygments, which the
+    web workers never use; they are only loaded once a `flask db` command is
+    resolved.
+    """
+
+    def __init__(self, app, db):
+        super().__init__('db', help='Perform database migrations.')
+        self._app = app
+        self._db = db
+        self._group = None
+
+    def _load(self):
+        if self._group is None:
+            from flask_migrate import Migrate
+            from flask_migrate.cli import db as db_group
+            Migrate(self._app, self._db)
+            self._group = db_group
+        return self._group
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Hand parsing and invocation over to the real group
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+
+@perf_bp.cli.command('check-plans')
+def check_plans():
+    """Fail if any hot query's SQLite plan degrades to a full table scan."""
+    from app.services import query_plans
+    failed = False
+    for name, (plan, scans) in query_plans.check().items():
+        status = 'FULL SCAN: ' + ', '.join(scans) if scans else 'ok'
+        click.echo(f'{name}: {status}')
+        for line in plan:
+            click.echo(f'    {line}')
+        failed = failed or bool(scans)
+    if failed:
+        raise SystemExit(1)
+
+
+@perf_bp.cli.command('startup')
+@click.option('--path', default='/login', show_default=True, help='URL of the first request.')
+@click.option('--budget-ms', type=int, default=None, help='Defaults to STARTUP_BUDGET_MS.')
+@click.option('--top', default=15, show_default=True, help='Packages to list in the import breakdown.')
+def startup(path, budget_ms, top):
+    """Cold-start the app in a fresh interpreter and fail if it is over budget."""
+    from app.services import startup as startup_service
+    if budget_ms is None:
+        budget_ms = current_app.config['STARTUP_BUDGET_MS']
+    report = startup_service.measure(path, cwd=current_app.root_path + '/..')
+
+    click.echo('imports (self time, -X importtime):')
+    for name, micros in report['imports'].most_common(top):
+        click.echo(f'    {micros / 1000:8.1f} ms  {name}')
+    click.echo('create_app phases:')
+    for name, seconds in report['phases']:
+        click.echo(f'    {seconds * 1000:8.1f} ms  {name}')
+    click.echo(f'import app:      {report["import_app"] * 1000:8.1f} ms')
+    click.echo(f'create_app():    {report["create_app"] * 1000:8.1f} ms')
+    click.echo(f'first request:   {report["first_request"] * 1000:8.1f} ms  (GET {path} -> {report["status"]})')
+    total_ms = report['time_to_first_response'] * 1000
+    click.echo(f'time to first response: {total_ms:.1f} ms (budget {budget_ms} ms, '
+               f'process wall {report["wall"] * 1000:.1f} ms)')
+    if report['status'] >= 500 or total_ms > budget_ms:
+        raise SystemExit(1)
+
+
+@perf_bp.cli.command('seed')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--events', default=200, show_default=True)
+@click.option('--participants', default='zipf:3-30', show_default=True,
+              help='Participants per event: fixed:N, uniform:A-B or zipf:A-B.')
+@click.option('--items', default='uniform:0-15', show_default=True, help='Wishlist items per user, same format.')
+@click.option('--drawn', default=0.3, show_default=True, help='Fraction of events with the drawing enabled.')
+@click.option('--archived', default=0.05, show_default=True, help='Fraction of archived events.')
+@click.option('--accept-rate', default=0.85, show_default=True, help='Share of accepted invitations.')
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible dataset.')
+@click.option('--password', default='benchmark', show_default=True, help='Password of every generated user.')
+def seed(users, events, participants, items, drawn, archived, accept_rate, seed, password):
+    """Add a synthetic dataset of users, wishlists, events and drawings."""
+    import time
+    from app.services import datagen
+    started = time.perf_counter()
+    try:
+        stats = datagen.generate(users, events, participants=participants, items=items, drawn=drawn,
+                                 archived=archived, accept_rate=accept_rate, seed=seed, password=password)
+    except datagen.InvalidDistribution as exc:
+        raise click.BadParameter(str(exc))
+    click.echo(', '.join(f'{count} {name}' for name, count in stats.items())
+               + f' in {time.perf_counter() - started:.1f}s')
+
+
+def _print_stats(name, stats):
+    queries = '-' if stats['queries'] is None else f'{stats["queries"]:g}'
+    errors = f'  ERRORS {stats["errors"]} {stats["error_statuses"]}' if stats['errors'] else ''
+    click.echo(f'{name:<40} {stats["count"]:>5} {stats["p50_ms"]:>9.2f} {stats["p95_ms"]:>9.2f} '
+               f'{stats["p99_ms"]:>9.2f} {stats["rps"] or 0:>8.1f} {queries:>6}{errors}')
+
+
+def _print_comparison(baseline, current, metric, max_regression):
+    from app.services import benchmark
+    click.echo(f'{metric} vs {baseline["meta"].get("commit")} ({baseline["meta"].get("created")}):')
+    regressed = []
+    for name, before, after, change in benchmark.compare(baseline, current, metric):
+        if change is None:
+            click.echo(f'    {name:<40} {"new" if before is None else "-":>9}')
+            continue
+        flag = ''
+        if max_regression is not None and change > max_regression:
+            flag = '  REGRESSION'
+            regressed.append(name)
+        click.echo(f'    {name:<40} {before:>9.2f} -> {after:>9.2f} {change:>+7.1f}%{flag}')
+    return regressed
+
+
+@perf_bp.cli.command('bench')
+@click.option('--driver', type=click.Choice(['client', 'server']), default='client', show_default=True,
+              help='In-process test client, or HTTP against gunicorn.')
+@click.option('--url', default=None, help='Benchmark an already running server instead of spawning gunicorn.')
+@click.option('--workers', default=2, show_default=True, help='gunicorn workers to spawn.')
+@click.option('--threads', default=4, show_default=True, help='Threads per gunicorn worker.')
+@click.option('--concurrency', default=4, show_default=True, help='Concurrent clients (server driver).')
+@click.option('--requests', 'iterations', default=50, show_default=True, help='Timed requests per route.')
+@click.option('--warmup', default=3, show_default=True, help='Untimed requests per route and client first.')
+@click.option('--duration', default=10.0, show_default=True,
+              help='Seconds of mixed read-only load for overall throughput (0 skips).')
+@click.option('--only', multiple=True, help='Only routes whose endpoint contains this text (repeatable).')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Result file; defaults to a new file in BENCHMARK_RESULTS_DIR.')
+@click.option('--compare', 'baseline_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Earlier result to compare p95 latency with.')
+@click.option('--max-regression', type=float, default=None,
+              help='With --compare, fail when any route p95 grew by more than this many percent.')
+def bench(driver, url, workers, threads, concurrency, iterations, warmup, duration, only, output,
+          baseline_path, max_regression):
+    """Benchmark every route and save p50/p95/p99 latency, throughput and queries per request."""
+    from app.services import benchmark
+    if url is not None:
+        driver = 'server'
+    scenarios = benchmark.select(only)
+    if not scenarios:
+        raise click.BadParameter('no route matches --only')
+    if not only:
+        for endpoint, method in benchmark.uncovered(current_app):
+            click.echo(f'warning: no benchmark scenario for {method} {endpoint}', err=True)
+    click.echo(f'{"route":<40} {"n":>5} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"q/req":>6}')
+    try:
+        result = benchmark.run(scenarios, driver=driver, url=url, workers=workers, threads=threads,
+                               concurrency=concurrency, iterations=iterations, warmup=warmup,
+                               duration=duration, progress=_print_stats)
+    except benchmark.BenchmarkError as exc:
+        raise click.ClickException(str(exc))
+    if result['mixed']:
+        _print_stats(f'mixed read-only ({duration:g}s)', result['mixed'])
+    path = benchmark.save(result, output, current_app.config['BENCHMARK_RESULTS_DIR'])
+    click.echo(f'saved {path}')
+    failed = any(stats['errors'] for stats in result['scenarios'].values())
+    if baseline_path:
+        failed = bool(_print_comparison(benchmark.load(baseline_path), result, 'p95_ms', max_regression)) or failed
+    if failed:
+        raise SystemExit(1)
+
+
+@perf_bp.cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--metric', type=click.Choice(['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'queries']),
+              default='p95_ms', show_default=True)
+@click.option('--max-regression', type=float, default=None,
+              help='Fail when any route grew by more than this many percent.')
+def compare(baseline, current, metric, max_regression):
+    """Compare two saved `flask perf bench` results route by route."""
+    from app.services import benchmark
+    if _print_comparison(benchmark.load(baseline), benchmark.load(current), metric, max_regression):
+        raise SystemExit(1)
+
+
+def _parse_sizes(ctx, param, value):
+    if not value:
+        return None
+    try:
+        sizes = [int(part) for part in value.split(',')]
+    except ValueError:
+        raise click.BadParameter('expected comma-separated integers, e.g. 10,100,1000')
+    if any(size < 1 for size in sizes):
+        raise click.BadParameter('sizes must be positive')
+    return sizes
+
+
+@perf_bp.cli.command('micro')
+@click.argument('names', nargs=-1)
+@click.option('--sizes', callback=_parse_sizes, default=None,
+              help="Comma-separated input sizes instead of each benchmark's defaults.")
+@click.option('--repeat', default=5, show_default=True, help='Timed runs per size and variant.')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Result file; defaults to a new file in BENCHMARK_RESULTS_DIR.')
+@click.option('--compare', 'baseline_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Earlier micro result to compare p50 latency with.')
+def micro(names, sizes, repeat, output, baseline_path):
+    """Time optimised code paths against the implementations they replaced."""
+    from app.services import benchmark
+    from app.services import microbench
+    unknown = [name for name in names if name not in microbench.BENCHMARKS]
+    if unknown:
+        raise click.BadParameter(f'unknown benchmark(s) {", ".join(unknown)}; '
+                                 f'choose from {", ".join(microbench.BENCHMARKS)}')
+
+    def progress(name, stats):
+        errors = f'  FAILED {stats["errors"]}' if stats['errors'] else ''
+        queries = '-' if stats['queries'] is None else f'{stats["queries"]:g}'
+        click.echo(f'{name:<40} {stats["p50_ms"]:>10.3f} {stats["p95_ms"]:>10.3f} '
+                   f'{stats["per_second"] or 0:>12.1f} {queries:>7}{errors}')
+
+    click.echo(f'{"benchmark":<40} {"p50 ms":>10} {"p95 ms":>10} {"units/s":>12} {"queries":>7}')
+    result = microbench.run(names, sizes, repeat, progress=progress)
+    click.echo('speedup (before p50 / after p50):')
+    for name, size, before, after, ratio in microbench.speedups(result):
+        click.echo(f'    {name:<20} n={size:<8} {before:>10.3f} -> {after:>10.3f} ms  {ratio or 0:>7.1f}x')
+    path = benchmark.save(result, output, current_app.config['BENCHMARK_RESULTS_DIR'])
+    click.echo(f'saved {path}')
+    if baseline_path:
+        _print_comparison(benchmark.load(baseline_path), result, 'p50_ms', None)
+
+
+@fx_bp.cli.command('load')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def load_rates(path):
+    """Load exchange rates from a CSV (currency,rate) or JSON file and re-price items."""
+    from app.services import engine
+    from app.services import fx
+    fmt = 'json' if path.lower().endswith('.json') else 'csv'
+    try:
+        with open(path, newline='') as stream:
+            rates = fx.parse_rates(stream, fmt)
+        changed, updated = engine.run_in_transaction(fx.store_rates, rates)
+    except fx.InvalidRates as exc:
+        raise click.ClickException(str(exc))
+    click.echo(f'{len(rates)} rates read, {len(changed)} changed ({", ".join(changed) or "none"}), '
+               f'{updated} items re-priced')
+
+
+@fx_bp.cli.command('show')
+def show_rates():
+    """Print the cached exchange rates (units of BASE_CURRENCY per unit)."""
+    from app.services import fx
+    for currency, rate in sorted(fx.rates().items()):
+        click.echo(f'{currency} {rate:g}')
+
+
+@fx_bp.cli.command('recompute')
+def recompute_prices():
+    """Re-derive price_base for every item from the stored rates."""
+    from app import db
+    from app.models.models import WishlistItem
+    from app.services import engine
+    from app.services import fx
+
+    def run():
+        currencies = [c for (c,) in db.session.query(WishlistItem.currency).distinct() if c]
+        return fx.recompute(db.session.connection(), currencies)
+    click.echo(f'{engine.run_in_transaction(run)} items re-priced')
+
+
+@previews_bp.cli.command('fetch')
+@click.argument('urls', nargs=-1, required=True)
+@click.option('--store/--no-store', default=True, show_default=True, help='Save the results in link_preview.')
+def fetch_previews(urls, store):
+    """Fetch link previews in the foreground with the background fetcher's limits."""
+    import asyncio
+    from app import db
+    from app.services import link_fetcher
+    from app.services import link_preview
+    settings = link_preview.settings(current_app.config)
+    normalized = [link_preview.normalize(url) for url in urls]
+    for url, checked in zip(urls, normalized):
+        if checked is None:
+            raise click.BadParameter(f'{url} is not an http(s) URL')
+
+    async def run():
+        fetcher = link_fetcher.Fetcher(settings['concurrency'], settings['per_host'],
+                                       settings['domain_interval'], settings['timeout'],
+                                       settings['max_bytes'], settings['allow_private'],
+                                       settings['user_agent'])
+        try:
+            return await fetcher.fetch_many(normalized)
+        finally:
+            fetcher.close()
+    results = asyncio.run(run())
+    for preview in results:
+        details = ', '.join(f'{key}={preview[key]!r}' for key in
+                            ('http_status', 'title', 'image', 'price', 'currency', 'error') if preview.get(key))
+        click.echo(f'{preview["status"]:<5} {preview["url"]}  {details}')
+    if store:
+        with db.engine.begin() as connection:
+            link_preview.store(connection, results, settings['ttl'], settings['error_ttl'])
@@ -3,6 +3,8 @@ from datetime import timezone
 
 from flask_login import UserMixin
 
+from sqlalchemy.orm import joinedload
+
 from app import db
 
 # ---------------------------------------------------------------------------
@@ -25,10 +27,16 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     nickname = db.Column(db.String(64), unique=True, nullable=False)
+    # nickname folded like the search index folds it (app/services/user_search.py), for result ranking
+    nickname_key = db.Column(db.String(64))
     name = db.Column(db.String(64))
     surname = db.Column(db.String(64))
     avatar = db.Column(db.String(256), default='default_avatar.png')
     password_hash = db.Column(db.String(128), nullable=False)
+    # Bumped on every WishlistItem write; used as the ETag validator for wishlist JSON
+    wishlist_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped on every change to the user's participations or their events; keys the dashboard cache
+    dashboard_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     wishlist_items = db.relationship('WishlistItem', backref='owner', lazy=True)
     # Specify foreign_keys to disambiguate from assigned_recipient_user_id
     event_participations = db.relationship(
@@ -53,12 +61,22 @@ class WishlistItem(db.Model):
     name = db.Column(db.String(128), nullable=False)
     price = db.Column(db.Float)
     currency = db.Column(db.String(3), default='PLN')  # NEW: currency for price consistency
+    # price converted to BASE_CURRENCY on write (app/services/fx.py); NULL when no rate is known
+    price_base = db.Column(db.Float)
     details = db.Column(db.Text)
     event = db.Column(db.String(128))
     link = db.Column(db.String(256))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        # Owner listings ordered by (created_at, id) and per-currency event views
+        db.Index('ix_wishlist_item_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_wishlist_item_user_currency', 'user_id', 'currency'),
+        # Cross-currency price filters and price ordering
+        db.Index('ix_wishlist_item_user_price_base', 'user_id', 'price_base', 'id'),
+    )
+
     def __repr__(self):
         return f"<WishlistItem {self.name} {self.price or ''} {self.currency}>"
 
@@ -79,9 +97,17 @@ class Event(db.Model):
     archived = db.Column(db.Boolean, default=False, nullable=False)
     # Active flag retained for backward compatibility with older schema expecting NOT NULL is_active
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Linked earlier edition (e.g. last year's); its assignments are not repeated when drawing
+    previous_event_id = db.Column(db.Integer, db.ForeignKey('event.id', ondelete='SET NULL'))
 
     admin = db.relationship('User', foreign_keys=[admin_user_id])
     participants = db.relationship('EventParticipant', backref='event', lazy=True, cascade='all, delete-orphan')
+    previous_event = db.relationship('Event', remote_side=[id], foreign_keys=[previous_event_id])
+    exclusions = db.relationship('EventExclusion', backref='event', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_event_admin_id', 'admin_id'),
+    )
 
     def __repr__(self):
         return f'<Event {self.name} ({self.budget_amount} {self.budget_currency})>'
@@ -99,6 +125,17 @@ class Event(db.Model):
         db.session.add(participant)
         return participant
 
+    def participants_with_users(self):
+        """Return all participant rows with their user and recipient eagerly loaded.
+        Uses a single joined SELECT so rendering the participant list does not
+        issue one lazy load per row.
+        """
+        return (EventParticipant.query
+                .options(joinedload(EventParticipant.user), joinedload(EventParticipant.recipient))
+                .filter_by(event_id=self.id)
+                .order_by(EventParticipant.id)
+                .all())
+
     def accepted_participants(self):
         participants = getattr(self, 'participants', [])
         return [p for p in participants if p.status == EVENT_PARTICIPANT_STATUS_ACCEPTED]
@@ -120,6 +157,8 @@ class EventParticipant(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('event_id', 'user_id', name='uq_event_user'),
+        # Dashboard and "my events" look up a user's participations by status
+        db.Index('ix_event_participant_user_status', 'user_id', 'status'),
     )
 
     def accept(self):
@@ -131,3 +170,78 @@ class EventParticipant(db.Model):
 
     def __repr__(self):
         return f'<EventParticipant user={self.user_id} event={self.event_id} status={self.status} recipient={self.assigned_recipient_user_id} drawn={bool(self.drawn_at)}>'
+
+
+class EventExclusion(db.Model):
+    """Pair of users that must not be matched with each other in an event's drawing.
+    The pair is symmetric and stored with user_a_id < user_b_id.
+    """
+    __tablename__ = 'event_exclusion'
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    user_a_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_a_id', 'user_b_id', name='uq_event_exclusion_pair'),
+    )
+
+    def __repr__(self):
+        return f'<EventExclusion event={self.event_id} {self.user_a_id}<->{self.user_b_id}>'
+
+
+class ExchangeRate(db.Model):
+    """Locally cached exchange rate: units of BASE_CURRENCY per one unit of currency."""
+    __tablename__ = 'exchange_rate'
+    currency = db.Column(db.String(3), primary_key=True)
+    rate = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<ExchangeRate {self.currency}={self.rate}>'
+
+
+class Notification(db.Model):
+    """Published update for the database notification broker (app/services/notifications.py).
+
+    Rows are short-lived: workers poll for ids above the last one they saw and
+    old rows are purged after NOTIFICATIONS_RETENTION seconds.
+    """
+    __tablename__ = 'notification'
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_notification_created_at', 'created_at'),  # retention purge
+    )
+
+    def __repr__(self):
+        return f'<Notification {self.id} {self.channel}>'
+
+
+class LinkPreview(db.Model):
+    """Fetched page metadata for a WishlistItem.link (app/services/link_preview.py).
+
+    One row per URL, shared by every item linking to it. Failed fetches are
+    stored too (status 'error') so they are not retried before expires_at.
+    """
+    __tablename__ = 'link_preview'
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(256), nullable=False, unique=True)
+    domain = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(16), nullable=False)  # 'ok' | 'error'
+    http_status = db.Column(db.Integer)
+    title = db.Column(db.String(256))
+    description = db.Column(db.String(512))
+    image = db.Column(db.String(512))
+    price = db.Column(db.Float)
+    currency = db.Column(db.String(3))
+    error = db.Column(db.String(256))
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<LinkPreview {self.url} {self.status}>'
@@ -10,12 +10,12 @@ from flask_login import current_user
 from flask_login import login_required
 from flask_login import login_user
 from flask_login import logout_user
-from werkzeug.security import check_password_hash
-from werkzeug.security import generate_password_hash
 
 from app import db
 from app import login_manager
 from app.models.models import User
+from app.services import passwords
+from app.services import user_cache
 from flask_babel import _
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -23,7 +23,7 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(int(user_id))
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -41,10 +41,17 @@ def register():
         return jsonify({'error': 'Missing required fields'}), 400
     if User.query.filter((User.email == email) | (User.nickname == nickname)).first():
         return jsonify({'error': 'Email or nickname already exists'}), 400
+    try:
+        password_hash = passwords.hash_password(password)
+    except passwords.HashingBusy:
+        if not request.is_json:
+            flash(_('Server is busy, please try again.'), 'error')
+            return redirect(url_for('frontend.register_page'))
+        return jsonify({'error': 'Server is busy, please try again'}), 503
     user = User(
         email=email,
         nickname=nickname,
-        password_hash=generate_password_hash(password)
+        password_hash=password_hash
     )
     db.session.add(user)
     db.session.commit()
@@ -66,7 +73,22 @@ def login():
         password = request.form.get('password')
     user = User.query.filter_by(email=email).first()
 
-    if user and password is not None and check_password_hash(user.password_hash, password):
+    try:
+        valid = bool(user and password is not None and passwords.verify_password(user.password_hash, password))
+    except passwords.HashingBusy:
+        if not request.is_json:
+            flash(_('Server is busy, please try again.'), 'error')
+            return redirect(url_for('frontend.login_page'))
+        return jsonify({'error': 'Server is busy, please try again'}), 503
+
+    if valid:
+        # Transparently upgrade hashes made with an older method or cost
+        if passwords.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = passwords.hash_password(password)
+                db.session.commit()
+            except passwords.HashingBusy:
+                pass
         login_user(user)
         if not request.is_json:
             return redirect(url_for('events.dashboard'))
@@ -1,39 +1,109 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, abort, flash
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, abort, flash, g
 from flask_babel import _
 from flask_login import login_required, current_user
+from sqlalchemy import and_
 from datetime import datetime
 
 from app import db
-from app.models.models import Event, EventParticipant, User, EVENT_PARTICIPANT_STATUS_PENDING, EVENT_PARTICIPANT_STATUS_ACCEPTED, ALLOWED_CURRENCIES
+from app.models.models import Event, EventExclusion, EventParticipant, User, EVENT_PARTICIPANT_STATUS_PENDING, EVENT_PARTICIPANT_STATUS_ACCEPTED, ALLOWED_CURRENCIES
+from app.services import dashboard as dashboard_service
+from app.services import drawing
+from app.services import engine
+from app.services import fx
+from app.services import invitations
+from app.services import notifications
+from app.services import serialization
+from app.services import wishlist_listing
+from app.services import wishlist_version
 
 events_bp = Blueprint('events', __name__, url_prefix='/events')
 
 
 # -------------------------- Helper functions -------------------------------
 
-def _user_is_event_admin(event: Event) -> bool:
-    return event.admin_user_id == current_user.id
+class EventAccess:
+    """What the current user may do with one event, resolved once per request.
 
+    Holds the event and the caller's own EventParticipant row (or None).
+    """
 
-def _load_event_or_404(event_id: int) -> Event:
-    event = Event.query.get_or_404(event_id)
+    def __init__(self, event: Event, participant):
+        self.event = event
+        self.participant = participant
+
+    @property
+    def is_admin(self) -> bool:
+        return self.event.admin_user_id == current_user.id
+
+    @property
+    def is_accepted(self) -> bool:
+        return bool(self.participant and self.participant.status == EVENT_PARTICIPANT_STATUS_ACCEPTED)
+
+    @property
+    def archived(self) -> bool:
+        return bool(getattr(self.event, 'archived', False))
+
+    @property
+    def drawing_enabled(self) -> bool:
+        return bool(getattr(self.event, 'drawing_enabled', False))
+
+    @property
+    def can_invite(self) -> bool:
+        return self.is_accepted and not self.archived and not self.drawing_enabled
+
+
+def _event_access(event_id: int) -> EventAccess:
+    """Load the event together with the caller's participation in a single query,
+    memoized on flask.g so every helper in the request reuses it.
+    """
+    cache = g.setdefault('event_access', {})
+    access = cache.get(event_id)
+    if access is None:
+        row = (db.session.query(Event, EventParticipant)
+               .outerjoin(EventParticipant, and_(EventParticipant.event_id == Event.id,
+                                                 EventParticipant.user_id == current_user.id))
+               .filter(Event.id == event_id)
+               .first())
+        if row is None:
+            abort(404)
+        access = cache[event_id] = EventAccess(row[0], row[1])
+    return access
+
+
+def _notify_event(event: Event, kind: str) -> None:
+    """Tell everyone watching the event page or a dashboard listing it."""
+    notifications.publish(notifications.event_channel(event.id), kind, event_id=event.id, event_name=event.name)
+
+
+def _notify_invited(event: Event, user_ids) -> None:
+    """Tell the invitees' dashboards and the event page about new invitations."""
+    notifications.publish([notifications.user_channel(uid) for uid in user_ids], 'invited',
+                          event_id=event.id, event_name=event.name)
+    notifications.publish(notifications.event_channel(event.id), 'invited', event_id=event.id, count=len(user_ids))
+
+
+def _load_access_or_404(event_id: int) -> EventAccess:
+    access = _event_access(event_id)
     # Ensure current user is participant (accepted or pending if admin checking invitation) unless admin
-    part = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id).first()
-    if not part and not _user_is_event_admin(event):
+    if not access.participant and not access.is_admin:
         abort(403)
-    return event
+    return access
 
 
 # -------------------------- Dashboard -------------------------------------
 @events_bp.route('/dashboard')
 @login_required
 def dashboard():
-    accepted_participations = EventParticipant.query.filter_by(user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_ACCEPTED).all()
-    events_active = [p.event for p in accepted_participations if not getattr(p.event, 'archived', False)]
-    events_archived = [p.event for p in accepted_participations if getattr(p.event, 'archived', False)]
-    pending_participations = EventParticipant.query.filter_by(user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_PENDING).all()
-    pending_events = [p.event for p in pending_participations]
-    return render_template('dashboard.html', events=events_active, archived_events=events_archived, pending_events=pending_events)
+    data = dashboard_service.get_dashboard(current_user.id)
+    return render_template('dashboard.html', events=data.events, archived_events=data.archived_events, pending_events=data.pending_events,
+                           dashboard_version=data.version)
+
+
+@events_bp.route('/dashboard/version')
+@login_required
+def dashboard_version():
+    """Checked (one primary-key lookup) when the dashboard's stream reconnects, to catch up on missed messages."""
+    return jsonify({'version': dashboard_service.current_version(current_user.id)})
 
 
 # -------------------------- Create Event ----------------------------------
@@ -102,24 +172,36 @@ def create_event():
 @events_bp.route('/<int:event_id>')
 @login_required
 def view_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    participants = EventParticipant.query.filter_by(event_id=event.id).all()
-    # Identify current user's participation to persist draw state across reloads
+    access = _load_access_or_404(event_id)
+    event = access.event
+    # Users and recipients are joined in, so the template never triggers lazy loads
+    participants = event.participants_with_users()
+    # The caller's row from the joined list (same identity as access.participant) carries the recipient
     my_part = next((p for p in participants if p.user_id == current_user.id), None)
     user_has_drawn = bool(my_part and my_part.drawn_at)
     recipient_nickname = my_part.recipient.nickname if (user_has_drawn and my_part and my_part.recipient) else None
-    return render_template('event.html', event=event, participants=participants,
-                           user_has_drawn=user_has_drawn, recipient_nickname=recipient_nickname)
+    exclusions = []
+    previous_event_choices = []
+    if access.is_admin:
+        exclusions = event.exclusions
+        dashboard_data = dashboard_service.get_dashboard(current_user.id)
+        previous_event_choices = [e for e in dashboard_data.events + dashboard_data.archived_events if e.id != event.id]
+    nicknames = {p.user_id: p.user.nickname for p in participants}
+    return render_template('event.html', event=event, access=access, participants=participants, my_part=my_part,
+                           user_has_drawn=user_has_drawn, recipient_nickname=recipient_nickname,
+                           exclusions=exclusions, nicknames=nicknames,
+                           previous_event_choices=previous_event_choices)
 
 
 # -------------------------- Edit Event ------------------------------------
 @events_bp.route('/<int:event_id>/edit', methods=['POST'])
 @login_required
 def edit_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Archived event cannot be edited. Unarchive first.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     name = request.form.get('name', event.name)
@@ -148,6 +230,21 @@ def edit_event(event_id: int):
             return redirect(url_for('events.view_event', event_id=event.id))
     if budget_currency in ALLOWED_CURRENCIES:
         event.budget_currency = budget_currency
+    previous_event_id = request.form.get('previous_event_id')
+    if previous_event_id == '':
+        event.previous_event_id = None
+    elif previous_event_id is not None:
+        # Only an earlier event the admin took part in can be linked
+        try:
+            prev_id = int(previous_event_id)
+        except ValueError:
+            prev_id = None
+        linked = prev_id is not None and prev_id != event.id and EventParticipant.query.filter_by(
+            event_id=prev_id, user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_ACCEPTED).first()
+        if not linked:
+            flash(_('Invalid previous event'), 'error')
+            return redirect(url_for('events.view_event', event_id=event.id))
+        event.previous_event_id = prev_id
     db.session.commit()
     flash(_('Event updated'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
@@ -157,10 +254,11 @@ def edit_event(event_id: int):
 @events_bp.route('/<int:event_id>/delete', methods=['POST'])
 @login_required
 def delete_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if not getattr(event, 'archived', False):
+    if not access.archived:
         flash(_('Event must be archived before permanent deletion.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     # Legacy delete kept for compatibility but UI now archives instead.
@@ -174,8 +272,11 @@ def delete_event(event_id: int):
 @events_bp.route('/<int:event_id>/leave', methods=['POST'])
 @login_required
 def leave_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    participant = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id).first_or_404()
+    access = _load_access_or_404(event_id)
+    event = access.event
+    participant = access.participant
+    if participant is None:
+        abort(404)
     if participant.is_admin:
         flash(_('Admin cannot leave. Delete the event instead.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
@@ -189,15 +290,15 @@ def leave_event(event_id: int):
 @events_bp.route('/<int:event_id>/invite', methods=['POST'])
 @login_required
 def invite_user(event_id: int):
-    event = _load_event_or_404(event_id)
-    if getattr(event, 'archived', False):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if access.archived:
         flash(_('Cannot invite to archived event.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    if getattr(event, 'drawing_enabled', False):
+    if access.drawing_enabled:
         flash(_('Cannot invite new participants after drawing has been enabled.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    inviter_part = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id).first()
-    if not inviter_part or inviter_part.status != EVENT_PARTICIPANT_STATUS_ACCEPTED:
+    if not access.can_invite:
         abort(403)
     if request.is_json:
         data = request.get_json()
@@ -222,6 +323,7 @@ def invite_user(event_id: int):
     participant.is_admin = False
     db.session.add(participant)
     db.session.commit()
+    _notify_invited(event, [user.id])
     flash(_('Invitation sent'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
 
@@ -231,64 +333,39 @@ def invite_user(event_id: int):
 @login_required
 def invite_page(event_id: int):
     """Render multi-invite search page for an event."""
-    event = _load_event_or_404(event_id)
+    access = _load_access_or_404(event_id)
+    event = access.event
     # Allow only accepted participants (including admin) to invite, block if drawing enabled
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Event archived. Unarchive to invite participants.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    if getattr(event, 'drawing_enabled', False):
+    if access.drawing_enabled:
         flash(_('Cannot invite after drawing enabled.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    inviter_part = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id).first()
-    if not inviter_part or inviter_part.status != EVENT_PARTICIPANT_STATUS_ACCEPTED:
+    if not access.can_invite:
         abort(403)
-    return render_template('event_invite.html', event=event)
+    return render_template('event_invite.html', event=event, access=access)
 
 
 # -------------------------- Bulk Invite Confirm (POST) -------------------
 @events_bp.route('/<int:event_id>/invite/confirm', methods=['POST'])
 @login_required
 def confirm_invitations(event_id: int):
-    event = _load_event_or_404(event_id)
-    if getattr(event, 'archived', False):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if access.archived:
         return jsonify({'error': 'Event archived; cannot invite.'}), 400
-    if getattr(event, 'drawing_enabled', False):
+    if access.drawing_enabled:
         return jsonify({'error': 'Drawing enabled; cannot invite.'}), 400
-    inviter_part = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id).first()
-    if not inviter_part or inviter_part.status != EVENT_PARTICIPANT_STATUS_ACCEPTED:
+    if not access.can_invite:
         return jsonify({'error': 'Not authorized to invite.'}), 403
     data = request.get_json(silent=True) or {}
     user_ids = data.get('user_ids') or []
     if not isinstance(user_ids, list):
         return jsonify({'error': 'user_ids must be a list'}), 400
-    created = []
-    skipped = []
-    for uid in user_ids:
-        try:
-            uid_int = int(uid)
-        except (ValueError, TypeError):
-            skipped.append(uid)
-            continue
-        if uid_int == current_user.id:
-            skipped.append(uid_int)
-            continue  # skip self
-        existing = EventParticipant.query.filter_by(event_id=event.id, user_id=uid_int).first()
-        if existing:
-            skipped.append(uid_int)
-            continue
-        user_obj = User.query.get(uid_int)
-        if not user_obj:
-            skipped.append(uid_int)
-            continue
-        part = EventParticipant()
-        part.event_id = event.id
-        part.user_id = uid_int
-        part.status = EVENT_PARTICIPANT_STATUS_PENDING
-        part.is_admin = False
-        db.session.add(part)
-        created.append(uid_int)
+    created, skipped = engine.run_in_transaction(invitations.invite, event.id, current_user.id, user_ids)
     if created:
-        db.session.commit()
+        _notify_invited(event, created)
     return jsonify({'invited_count': len(created), 'invited_user_ids': created, 'skipped': skipped, 'redirect': url_for('events.view_event', event_id=event.id)})
 
 
@@ -299,6 +376,8 @@ def accept_invitation(event_id: int):
     participant = EventParticipant.query.filter_by(event_id=event_id, user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_PENDING).first_or_404()
     participant.status = EVENT_PARTICIPANT_STATUS_ACCEPTED
     db.session.commit()
+    notifications.publish(notifications.event_channel(event_id), 'accepted', event_id=event_id,
+                          user_id=current_user.id, nickname=current_user.nickname)
     flash(_('Invitation accepted'), 'success')
     return redirect(url_for('events.view_event', event_id=event_id))
 
@@ -318,61 +397,64 @@ def reject_invitation(event_id: int):
 @events_bp.route('/<int:event_id>/participant/<int:user_id>/wishlist')
 @login_required
 def participant_wishlist(event_id: int, user_id: int):
-    me_part = EventParticipant.query.filter_by(event_id=event_id, user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_ACCEPTED).first()
-    if not me_part:
+    access = _event_access(event_id)
+    if not access.is_accepted:
         abort(403)
     target_part = EventParticipant.query.filter_by(event_id=event_id, user_id=user_id).first_or_404()
     if target_part.status != EVENT_PARTICIPANT_STATUS_ACCEPTED:
         abort(403)
-    from app.models.models import WishlistItem, Event as EventModel
-    event = EventModel.query.get_or_404(event_id)
-    items = WishlistItem.query.filter_by(user_id=user_id, currency=event.budget_currency).all()
-    return jsonify([
-        {
-            'id': item.id,
-            'name': item.name,
-            'price': item.price,
-            'currency': item.currency,
-            'details': item.details,
-            'event': item.event,
-            'link': item.link
-        } for item in items
-    ])
+    event = access.event
+    rate = fx.rates().get(event.budget_currency)
+    max_amount = event.budget_amount if request.args.get('within_budget', type=int) else None
+
+    def build():
+        rows = wishlist_listing.budget_items(user_id, event.budget_currency, rate, max_amount).all()
+        return serialization.json_response(
+            [dict(serialization.item_dict(row), budget_price=row.budget_price) for row in rows])
+    # The body also depends on the event's budget and the rate used for it
+    return wishlist_version.conditional(user_id, build, event.budget_currency, event.budget_amount, rate)
 
 
 # -------------------------- Drawing: enable --------------------------------
 @events_bp.route('/<int:event_id>/drawing/enable', methods=['POST'])
 @login_required
 def enable_drawing(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Archived event cannot enable drawing.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     accepted = [p for p in EventParticipant.query.filter_by(event_id=event.id, status=EVENT_PARTICIPANT_STATUS_ACCEPTED).all()]
     if len(accepted) < 2:
         flash(_('Need at least 2 accepted participants to enable drawing.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    if event.drawing_enabled:
+    if access.drawing_enabled:
         flash(_('Drawing already enabled.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    import random
-    user_ids = [p.user_id for p in accepted]
-    for attempt in range(50):
-        perm = user_ids[:]
-        random.shuffle(perm)
-        if all(uid != perm[i] for i, uid in enumerate(user_ids)):
-            break
-    else:
-        flash(_('Failed to generate drawing assignments, please retry.'), 'error')
+    exclusions = [(x.user_a_id, x.user_b_id) for x in event.exclusions]
+    previous_assignments = []
+    if event.previous_event_id:
+        previous_assignments = db.session.query(EventParticipant.user_id, EventParticipant.assigned_recipient_user_id).filter(
+            EventParticipant.event_id == event.previous_event_id,
+            EventParticipant.assigned_recipient_user_id.isnot(None)).all()
+    try:
+        assignment_map = drawing.assign_recipients([p.user_id for p in accepted], exclusions=exclusions,
+                                                   forbidden=previous_assignments)
+    except drawing.InfeasibleDrawing as exc:
+        # One lookup for the blocked givers instead of lazy-loading each participant's user
+        names = ', '.join(sorted(row.nickname for row in db.session.query(User.nickname).filter(User.id.in_(exc.givers))))
+        flash(_('Drawing impossible with current exclusions. No valid recipients for: %(names)s.', names=names), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    assignment_map = {user_ids[i]: perm[i] for i in range(len(user_ids))}
-    for p in accepted:
-        p.assigned_recipient_user_id = assignment_map[p.user_id]
-        p.drawn_at = None
-    event.drawing_enabled = True
-    db.session.commit()
+
+    def apply_assignments():
+        for p in accepted:
+            p.assigned_recipient_user_id = assignment_map[p.user_id]
+            p.drawn_at = None
+        event.drawing_enabled = True
+    engine.run_in_transaction(apply_assignments)
+    _notify_event(event, 'drawing_enabled')
     flash(_('Drawing enabled. Participants can now draw their recipient.'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
 
@@ -381,29 +463,97 @@ def enable_drawing(event_id: int):
 @events_bp.route('/<int:event_id>/drawing/draw', methods=['POST'])
 @login_required
 def draw_recipient(event_id: int):
-    event = _load_event_or_404(event_id)
-    if getattr(event, 'archived', False):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if access.archived:
         return jsonify({'error': 'Event archived'}), 400
-    if not event.drawing_enabled:
+    if not access.drawing_enabled:
         abort(403)
-    participant = EventParticipant.query.filter_by(event_id=event.id, user_id=current_user.id, status=EVENT_PARTICIPANT_STATUS_ACCEPTED).first_or_404()
+    if not access.is_accepted:
+        abort(404)
+    participant = access.participant
     if participant.drawn_at is not None:
         return jsonify({'error': 'Already drawn', 'recipient_nickname': participant.recipient.nickname if participant.recipient else None}), 400
     if participant.assigned_recipient_user_id is None:
         return jsonify({'error': 'No assignment found'}), 400
-    participant.drawn_at = datetime.utcnow()
-    db.session.commit()
+
+    def mark_drawn():
+        participant.drawn_at = datetime.utcnow()
+    engine.run_in_transaction(mark_drawn)
     return jsonify({'recipient_user_id': participant.assigned_recipient_user_id, 'recipient_nickname': participant.recipient.nickname})
 
 
+# -------------------------- Drawing: exclusions ----------------------------
+@events_bp.route('/<int:event_id>/exclusions', methods=['POST'])
+@login_required
+def add_exclusion(event_id: int):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
+        abort(403)
+    if access.archived:
+        flash(_('Archived event cannot be edited. Unarchive first.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    if access.drawing_enabled:
+        flash(_('Reset the drawing before changing exclusions.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    try:
+        user_a_id = int(request.form.get('user_a_id'))
+        user_b_id = int(request.form.get('user_b_id'))
+    except (TypeError, ValueError):
+        flash(_('Select two participants.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    if user_a_id == user_b_id:
+        flash(_('Select two different participants.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    found = EventParticipant.query.filter(EventParticipant.event_id == event.id,
+                                          EventParticipant.user_id.in_([user_a_id, user_b_id])).count()
+    if found != 2:
+        flash(_('Both users must be participants of this event.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    user_a_id, user_b_id = sorted((user_a_id, user_b_id))
+    if EventExclusion.query.filter_by(event_id=event.id, user_a_id=user_a_id, user_b_id=user_b_id).first():
+        flash(_('This exclusion already exists.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    exclusion = EventExclusion()
+    exclusion.event_id = event.id
+    exclusion.user_a_id = user_a_id
+    exclusion.user_b_id = user_b_id
+    db.session.add(exclusion)
+    db.session.commit()
+    flash(_('Exclusion added.'), 'success')
+    return redirect(url_for('events.view_event', event_id=event.id))
+
+
+@events_bp.route('/<int:event_id>/exclusions/<int:exclusion_id>/remove', methods=['POST'])
+@login_required
+def remove_exclusion(event_id: int, exclusion_id: int):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
+        abort(403)
+    if access.archived:
+        flash(_('Archived event cannot be edited. Unarchive first.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    if access.drawing_enabled:
+        flash(_('Reset the drawing before changing exclusions.'), 'error')
+        return redirect(url_for('events.view_event', event_id=event.id))
+    exclusion = EventExclusion.query.filter_by(id=exclusion_id, event_id=event.id).first_or_404()
+    db.session.delete(exclusion)
+    db.session.commit()
+    flash(_('Exclusion removed.'), 'success')
+    return redirect(url_for('events.view_event', event_id=event.id))
+
+
 # -------------------------- Drawing: reset ---------------------------------
 @events_bp.route('/<int:event_id>/drawing/reset', methods=['POST'])
 @login_required
 def reset_drawing(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Archived event cannot reset drawing.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     participants = EventParticipant.query.filter_by(event_id=event.id).all()
@@ -412,6 +562,7 @@ def reset_drawing(event_id: int):
         p.drawn_at = None
     event.drawing_enabled = False
     db.session.commit()
+    _notify_event(event, 'drawing_reset')
     flash(_('Drawing has been reset.'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
 
@@ -424,18 +575,40 @@ def my_events_json():
     return jsonify([{'id': p.event.id, 'name': p.event.name, 'archived': getattr(p.event, 'archived', False)} for p in parts])
 
 
+# -------------------------- Server-sent updates ---------------------------
+@events_bp.route('/stream')
+@login_required
+def stream():
+    """Push notifications for the current user and either one event (?event_id=) or their dashboard events."""
+    channels = [notifications.user_channel(current_user.id)]
+    event_id = request.args.get('event_id', type=int)
+    if event_id is not None:
+        if not _event_access(event_id).is_accepted:
+            abort(404)
+        channels.append(notifications.event_channel(event_id))
+    else:
+        data = dashboard_service.get_dashboard(current_user.id)
+        channels.extend(notifications.event_channel(ev.id) for ev in data.events + data.archived_events)
+    response = notifications.stream(channels)
+    if response is None:
+        return jsonify({'error': 'Too many open update streams, retry later'}), 503, {'Retry-After': '30'}
+    return response
+
+
 # -------------------------- Archive / Unarchive --------------------------
 @events_bp.route('/<int:event_id>/archive', methods=['POST'])
 @login_required
 def archive_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Event already archived.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     event.archived = True
     db.session.commit()
+    _notify_event(event, 'archived')
     flash(_('Event archived.'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
 
@@ -443,14 +616,16 @@ def archive_event(event_id: int):
 @events_bp.route('/<int:event_id>/unarchive', methods=['POST'])
 @login_required
 def unarchive_event(event_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if not getattr(event, 'archived', False):
+    if not access.archived:
         flash(_('Event is not archived.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     event.archived = False
     db.session.commit()
+    _notify_event(event, 'unarchived')
     flash(_('Event unarchived.'), 'success')
     return redirect(url_for('events.view_event', event_id=event.id))
 
@@ -459,13 +634,14 @@ def unarchive_event(event_id: int):
 @events_bp.route('/<int:event_id>/participants/<int:participant_id>/remove', methods=['POST'])
 @login_required
 def remove_participant(event_id: int, participant_id: int):
-    event = _load_event_or_404(event_id)
-    if not _user_is_event_admin(event):
+    access = _load_access_or_404(event_id)
+    event = access.event
+    if not access.is_admin:
         abort(403)
-    if getattr(event, 'archived', False):
+    if access.archived:
         flash(_('Archived event: cannot remove participants.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
-    if event.drawing_enabled:
+    if access.drawing_enabled:
         flash(_('Disable drawing before removing participants.'), 'error')
         return redirect(url_for('events.view_event', event_id=event.id))
     participant = EventParticipant.query.filter_by(id=participant_id, event_id=event.id).first_or_404()
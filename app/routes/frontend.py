@@ -6,10 +6,13 @@ from flask import url_for
 from flask_login import current_user
 from flask_login import login_required
 
+from app.services.page_cache import cached_page
+
 frontend_bp = Blueprint('frontend', __name__)
 
 
 @frontend_bp.route('/users')
+@cached_page
 def user_search_page():
     return render_template('user_search.html')
 
@@ -21,6 +24,7 @@ def wishlist_page():
 
 
 @frontend_bp.route('/')
+@cached_page
 def home():
     if current_user.is_authenticated:
         return redirect(url_for('events.dashboard'))
@@ -28,11 +32,13 @@ def home():
 
 
 @frontend_bp.route('/login')
+@cached_page
 def login_page():
     return render_template('login.html')
 
 
 @frontend_bp.route('/register')
+@cached_page
 def register_page():
     return render_template('register.html')
 
@@ -44,6 +50,7 @@ def profile_page():
 
 
 @frontend_bp.route('/settings')
+@cached_page
 def settings_page():
     """Settings page: language selection always visible; logout shown if authenticated."""
     return render_template('settings.html')
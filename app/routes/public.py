@@ -1,9 +1,15 @@
 from flask import Blueprint
+from flask import current_app
 from flask import jsonify
 from flask import request
 
+from app.models.models import ALLOWED_CURRENCIES
 from app.models.models import User
 from app.models.models import WishlistItem
+from app.services import fx
+from app.services import user_search
+from app.services import wishlist_listing
+from app.services import wishlist_version
 
 public_bp = Blueprint('public', __name__, url_prefix='/public')
 
@@ -11,10 +17,14 @@ public_bp = Blueprint('public', __name__, url_prefix='/public')
 @public_bp.route('/users', methods=['GET'])
 def search_users():
     query = request.args.get('q', '')
-    users = User.query.filter(
-        (User.nickname.ilike(f'%{query}%')) | (User.name.ilike(f'%{query}%')) | (User.surname.ilike(f'%{query}%'))
-    ).all()
-    return jsonify([
+    max_limit = current_app.config['USER_SEARCH_MAX_PAGE_SIZE']
+    limit = request.args.get('limit', current_app.config['USER_SEARCH_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, max_limit))
+    try:
+        users, next_cursor = user_search.search_users(query, limit, request.args.get('cursor'))
+    except user_search.InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    response = jsonify([
         {
             'id': user.id,
             'nickname': user.nickname,
@@ -23,26 +33,26 @@ def search_users():
             'surname': user.surname
         } for user in users
     ])
+    # Body stays a plain list for existing callers; the next page is advertised in a header
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @public_bp.route('/wishlist/<int:user_id>', methods=['GET'])
 def view_wishlist(user_id):
+    # Price bounds are converted with the worker's current rates
+    return wishlist_version.conditional(user_id, lambda: _wishlist_response(user_id), fx.rates())
+
+
+def _wishlist_response(user_id):
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
-    query = WishlistItem.query.filter_by(user_id=user_id)
-    if min_price is not None:
-        query = query.filter(WishlistItem.price >= min_price)
-    if max_price is not None:
-        query = query.filter(WishlistItem.price <= max_price)
-    items = query.all()
-    return jsonify([
-        {
-            'id': item.id,
-            'name': item.name,
-            'price': item.price,
-            'currency': item.currency,
-            'details': item.details,
-            'event': item.event,
-            'link': item.link
-        } for item in items
-    ])
+    # Bounds are given in `currency` (default: the base currency) and compared
+    # against every item's price converted to the base currency; where a rate
+    # is missing, items in the bounds' own currency are compared by raw price
+    currency = request.args.get('currency', fx.base_currency()).upper()
+    if currency not in fx.rates() and currency not in ALLOWED_CURRENCIES:
+        return jsonify({'error': 'Unsupported currency'}), 400
+    query = wishlist_listing.price_range(WishlistItem.query.filter_by(user_id=user_id), currency, min_price, max_price)
+    return wishlist_listing.list_response(query)
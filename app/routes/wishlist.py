@@ -1,11 +1,21 @@
 from flask import Blueprint
+from flask import Response
+from flask import current_app
 from flask import jsonify
 from flask import request
+from flask import stream_with_context
 from flask_login import current_user
 from flask_login import login_required
 
 from app import db
 from app.models.models import WishlistItem
+from app.services import engine
+from app.services import link_preview
+from app.services import serialization
+from app.services import wishlist_batch
+from app.services import wishlist_listing
+from app.services import wishlist_transfer
+from app.services import wishlist_version
 
 wishlist_bp = Blueprint('wishlist', __name__, url_prefix='/wishlist')
 
@@ -13,48 +23,29 @@ wishlist_bp = Blueprint('wishlist', __name__, url_prefix='/wishlist')
 @wishlist_bp.route('/<int:item_id>', methods=['GET'])
 @login_required
 def get_item(item_id):
-    item = WishlistItem.query.filter_by(
-        id=item_id, user_id=current_user.id).first_or_404()
-    return jsonify({
-        'id': item.id,
-        'name': item.name,
-        'price': item.price,
-        'currency': item.currency,
-        'details': item.details,
-        'event': item.event,
-        'link': item.link
-    })
+    row = serialization.project_items(WishlistItem.query.filter_by(
+        id=item_id, user_id=current_user.id)).first_or_404()
+    return serialization.json_response(serialization.item_dict(row))
 
 
 @wishlist_bp.route('/', methods=['GET'])
 @login_required
 def get_wishlist():
-    items = WishlistItem.query.filter_by(user_id=current_user.id).all()
-    return jsonify([{
-        'id': item.id,
-        'name': item.name,
-        'price': item.price,
-        'currency': item.currency,
-        'details': item.details,
-        'event': item.event,
-        'link': item.link
-    } for item in items])
+    return wishlist_version.conditional(
+        current_user.id,
+        lambda: wishlist_listing.list_response(WishlistItem.query.filter_by(user_id=current_user.id)))
 
 
 @wishlist_bp.route('/', methods=['POST'])
 @login_required
 def add_item():
-    data = request.get_json()
-    item = WishlistItem(
-        name=data.get('name'),  # type: ignore
-        price=data.get('price'),  # type: ignore
-        currency=(data.get('currency') or 'PLN'),  # type: ignore
-        details=data.get('details'),  # type: ignore
-        event=data.get('event'),  # type: ignore
-        link=data.get('link'),  # type: ignore
-        user_id=current_user.id  # type: ignore
-    )
-
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    values, error = wishlist_transfer.validate_row(data)
+    if error:
+        return jsonify({'error': error}), 400
+    item = WishlistItem(user_id=current_user.id, **values)  # type: ignore
     db.session.add(item)
     db.session.commit()
     return jsonify({'message': 'Item added', 'id': item.id}), 201
@@ -65,13 +56,17 @@ def add_item():
 def edit_item(item_id):
     item = WishlistItem.query.filter_by(
         id=item_id, user_id=current_user.id).first_or_404()
-    data = request.get_json()
-    item.name = data.get('name', item.name)
-    item.price = data.get('price', item.price)
-    item.currency = data.get('currency', item.currency)
-    item.details = data.get('details', item.details)
-    item.event = data.get('event', item.event)
-    item.link = data.get('link', item.link)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    # Omitted fields keep their value; the result is validated like an import row
+    merged = {field: getattr(item, field) for field in wishlist_transfer.EXPORT_FIELDS}
+    merged.update({key: value for key, value in data.items() if key in wishlist_transfer.EXPORT_FIELDS})
+    values, error = wishlist_transfer.validate_row(merged)
+    if error:
+        return jsonify({'error': error}), 400
+    for field, value in values.items():
+        setattr(item, field, value)
     db.session.commit()
     return jsonify({'message': 'Item updated'})
 
@@ -84,3 +79,63 @@ def delete_item(item_id):
     db.session.delete(item)
     db.session.commit()
     return jsonify({'message': 'Item deleted'})
+
+
+@wishlist_bp.route('/previews', methods=['GET'])
+@login_required
+def link_previews():
+    """Cached title/image/price previews for the given ?url= links, keyed by URL."""
+    urls = request.args.getlist('url')
+    if len(urls) > link_preview.MAX_LOOKUP:
+        return jsonify({'error': f'At most {link_preview.MAX_LOOKUP} urls'}), 400
+    return serialization.json_response(link_preview.previews(urls))
+
+
+@wishlist_bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """Apply a list of create/update/delete operations in one transaction."""
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else data
+    try:
+        operations = wishlist_batch.check(operations, current_app.config['WISHLIST_BATCH_MAX_OPS'])
+    except wishlist_batch.InvalidBatch as exc:
+        return jsonify({'error': str(exc)}), 400
+    applied, results = engine.run_in_transaction(wishlist_batch.apply, current_user.id, operations)
+    return jsonify({'applied': applied, 'results': results}), 200 if applied else 422
+
+
+@wishlist_bp.route('/import', methods=['POST'])
+@login_required
+def import_items():
+    """Bulk-add items from an uploaded CSV/JSON Lines file or a raw request body."""
+    upload = request.files.get('file')
+    fmt = wishlist_transfer.detect_format(
+        request.args.get('format'),
+        upload.filename if upload else None,
+        upload.mimetype if upload else request.mimetype)
+    if fmt is None:
+        return jsonify({'error': 'Unsupported format, use csv or jsonl'}), 400
+    config = current_app.config
+    try:
+        report = wishlist_transfer.import_items(
+            current_user.id, upload.stream if upload else request.stream, fmt,
+            config['WISHLIST_IMPORT_BATCH_SIZE'], config['WISHLIST_IMPORT_MAX_ROWS'],
+            config['WISHLIST_IMPORT_MAX_ERRORS'])
+    except UnicodeDecodeError:
+        return jsonify({'error': 'File must be UTF-8 encoded'}), 400
+    except wishlist_transfer.ImportTooLarge as exc:
+        return jsonify({'error': f'Too many rows ({exc})'}), 413
+    return jsonify(report), 201 if report['imported'] else 200
+
+
+@wishlist_bp.route('/export', methods=['GET'])
+@login_required
+def export_items():
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in wishlist_transfer.FORMATS:
+        return jsonify({'error': 'Unsupported format, use csv or jsonl'}), 400
+    response = Response(stream_with_context(wishlist_transfer.export_items(current_user.id, fmt)),
+                        mimetype=wishlist_transfer.mimetype(fmt))
+    response.headers['Content-Disposition'] = f'attachment; filename=wishlist.{fmt}'
+    return response
@@ -0,0 +1,860 @@
+"""Route benchmark harness behind `flask perf bench`.
+
+Every route registered on the app has a scenario below: the timed request
+plus the untimed setup and teardown calls that put the data back the way
+they found it, so write routes can be repeated any number of times. Redirect
+targets are fetched untimed as a browser would, which also consumes the
+flashed messages the page cache keys on.
+
+Two drivers run the same scenarios:
+
+* ``client`` goes through app.test_client() in this process and counts SQL
+  statements per request from engine events;
+* ``server`` talks HTTP to gunicorn (spawned with gunicorn.conf.py, or any
+  --url), one keep-alive connection per thread, and derives statements per
+  request from the server's /metrics counters when they are exposed.
+
+Scenarios run against per-thread fixture events owned by a generated user
+(`flask perf seed`); the fixtures are removed afterwards. Results are JSON
+files carrying the commit and dataset size, and compare() diffs two of them.
+"""
+import contextlib
+import contextvars
+import http.client
+import json
+import math
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections import namedtuple
+from datetime import datetime
+from datetime import timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from flask import current_app
+from sqlalchemy import event as sa_event
+
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import Event
+from app.models.models import EventExclusion
+from app.models.models import EventParticipant
+from app.models.models import User
+from app.models.models import WishlistItem
+from app.services import datagen
+
+Reply = namedtuple('Reply', 'status location body')
+
+_EVENT_LOCATION = re.compile(r'/events/(\d+)')
+_METRIC_LINE = re.compile(r'^(\w+)\{([^}]*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+# Routes that are part of the harness, or long-lived streams with no latency to speak of
+_UNBENCHED = {'metrics', 'events.stream'}
+_FIXTURE_NAME = 'Benchmark fixture'
+_IMPORT_NAME = 'Benchmark import'
+
+
+class BenchmarkError(RuntimeError):
+    """The benchmark cannot run (no dataset, server did not start, ...)."""
+
+
+# -------------------------- Sessions --------------------------------------
+
+def _encode(json_body=None, form=None, body=None, content_type=None):
+    if json_body is not None:
+        return json.dumps(json_body).encode(), 'application/json'
+    if form is not None:
+        return urlencode(form).encode(), 'application/x-www-form-urlencoded'
+    return body, content_type
+
+
+class ClientSession:
+    """One signed-in user on the Flask test client."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, json=None, form=None, body=None, content_type=None):
+        data, content_type = _encode(json, form, body, content_type)
+        # A request reuses an app context that is already pushed, and with it g and the
+        # db session; run it in an empty context so it gets its own like a server request
+        return contextvars.Context().run(self._open, method, path, data, content_type)
+
+    def _open(self, method, path, data, content_type):
+        # Read the body here: streamed responses re-enter the request context
+        response = self._client.open(path, method=method, data=data, content_type=content_type)
+        return Reply(response.status_code, response.headers.get('Location'), response.get_data())
+
+
+class HttpSession:
+    """One signed-in user on a keep-alive HTTP connection with its own cookies."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._connection = None
+        self._cookies = SimpleCookie()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self._host, self._port, timeout=60)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def request(self, method, path, json=None, form=None, body=None, content_type=None):
+        data, content_type = _encode(json, form, body, content_type)
+        headers = {}
+        if content_type:
+            headers['Content-Type'] = content_type
+        cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in self._cookies.items())
+        if cookie:
+            headers['Cookie'] = cookie
+        for attempt in (1, 2):
+            try:
+                connection = self._connect()
+                connection.request(method, path, body=data, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                self.close()
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self._cookies.load(header)
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        return Reply(response.status, response.getheader('Location'), payload)
+
+
+# -------------------------- Scenarios -------------------------------------
+
+class Context:
+    """What a scenario sees: the signed-in sessions and the thread's fixture."""
+
+    def __init__(self, me, peer, fixture):
+        self.me = me
+        self.peer = peer
+        self.fixture = fixture
+
+    def call(self, method, path, session=None, **kwargs):
+        """Untimed request (as me unless session is given) that follows redirects."""
+        session = session or self.me
+        reply = session.request(method, path, **kwargs)
+        self.follow(reply, session)
+        return reply
+
+    def follow(self, reply, session=None):
+        if reply.status in (301, 302, 303) and reply.location:
+            parts = urlsplit(reply.location)
+            path = parts.path + (f'?{parts.query}' if parts.query else '')
+            (session or self.me).request('GET', path)
+
+
+class Scenario:
+    """One timed request to one route, with untimed setup/teardown around it.
+
+    path is formatted with the fixture plus whatever setup returns; payload
+    turns the same values into request keyword arguments (json, form, body,
+    content_type); teardown gets the values and the reply.
+    """
+
+    def __init__(self, endpoint, method, path, payload=None, setup=None, teardown=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.setup = setup
+        self.teardown = teardown
+
+    @property
+    def name(self):
+        return f'{self.method} {self.endpoint}'
+
+    @property
+    def read_only(self):
+        return self.method == 'GET' and self.setup is None and self.teardown is None
+
+    def run(self, ctx, clock, counter=None):
+        """Return (seconds, statements or None, reply) for one timed request."""
+        values = dict(ctx.fixture)
+        if self.setup is not None:
+            values.update(self.setup(ctx, values) or {})
+        kwargs = self.payload(values) if self.payload else {}
+        path = self.path.format(**values)
+        if counter is not None:
+            counter.reset()
+        started = clock()
+        reply = ctx.me.request(self.method, path, **kwargs)
+        elapsed = clock() - started
+        statements = counter.count if counter is not None else None
+        ctx.follow(reply)
+        if self.teardown is not None:
+            self.teardown(ctx, values, reply)
+        return elapsed, statements, reply
+
+
+def _fresh(fn):
+    """Run a lookup on a fresh snapshot: the other side commits concurrently."""
+    try:
+        return fn()
+    finally:
+        db.session.rollback()
+
+
+def _participant_id(event_id, user_id):
+    return _fresh(lambda: db.session.query(EventParticipant.id).filter_by(
+        event_id=event_id, user_id=user_id).scalar())
+
+
+def _exclusion_id(event_id, user_a, user_b):
+    low, high = sorted((user_a, user_b))
+    return _fresh(lambda: db.session.query(EventExclusion.id).filter_by(
+        event_id=event_id, user_a_id=low, user_b_id=high).scalar())
+
+
+def _event_id(reply):
+    match = _EVENT_LOCATION.search(reply.location or '')
+    if match is None:
+        raise BenchmarkError(f'expected a redirect to an event, got {reply.status} {reply.location}')
+    return int(match.group(1))
+
+
+def _create_event(ctx, values):
+    return {'new_event_id': _event_id(ctx.call(
+        'POST', '/events/create', json={'name': 'Benchmark event', 'budget_amount': 100}))}
+
+
+def _create_archived_event(ctx, values):
+    created = _create_event(ctx, values)
+    ctx.call('POST', '/events/{new_event_id}/archive'.format(**created))
+    return created
+
+
+def _delete_created_event(ctx, values, reply):
+    event_id = _event_id(reply)
+    ctx.call('POST', f'/events/{event_id}/archive')
+    ctx.call('POST', f'/events/{event_id}/delete')
+
+
+def _add_item(ctx, values):
+    reply = ctx.call('POST', '/wishlist/', json={'name': 'Benchmark item', 'price': 10})
+    return {'new_item_id': json.loads(reply.body)['id']}
+
+
+def _delete_added_item(ctx, values, reply):
+    ctx.call('DELETE', f'/wishlist/{json.loads(reply.body)["id"]}')
+
+
+def _delete_imported_items(ctx, values, reply):
+    ids = _fresh(lambda: [item_id for (item_id,) in db.session.query(WishlistItem.id).filter(
+        WishlistItem.user_id == values['user_id'], WishlistItem.name.like(f'{_IMPORT_NAME}%'))])
+    if ids:
+        ctx.call('POST', '/wishlist/batch', json={'operations': [{'op': 'delete', 'id': i} for i in ids]})
+
+
+def _invite_candidate(ctx, values):
+    ctx.call('POST', '/events/{event_id}/invite'.format(**values), form={'nickname': values['candidate_nickname']})
+    return {'participant_id': _participant_id(values['event_id'], values['candidate_id'])}
+
+
+def _remove_candidate(ctx, values, reply=None):
+    participant_id = _participant_id(values['event_id'], values['candidate_id'])
+    if participant_id is not None:
+        ctx.call('POST', f'/events/{values["event_id"]}/participants/{participant_id}/remove')
+
+
+def _add_exclusion(ctx, values):
+    ctx.call('POST', '/events/{event_id}/exclusions'.format(**values),
+             form={'user_a_id': values['excluded_a'], 'user_b_id': values['excluded_b']})
+    return {'exclusion_id': _exclusion_id(values['event_id'], values['excluded_a'], values['excluded_b'])}
+
+
+def _remove_exclusion(ctx, values, reply=None):
+    exclusion_id = _exclusion_id(values['event_id'], values['excluded_a'], values['excluded_b'])
+    if exclusion_id is not None:
+        ctx.call('POST', f'/events/{values["event_id"]}/exclusions/{exclusion_id}/remove')
+
+
+def _enable_drawing(ctx, values):
+    ctx.call('POST', '/events/{event_id}/drawing/enable'.format(**values))
+
+
+def _reset_drawing(ctx, values, reply=None):
+    ctx.call('POST', '/events/{event_id}/drawing/reset'.format(**values))
+
+
+def _archive(ctx, values):
+    ctx.call('POST', '/events/{event_id}/archive'.format(**values))
+
+
+def _unarchive(ctx, values, reply=None):
+    ctx.call('POST', '/events/{event_id}/unarchive'.format(**values))
+
+
+def _peer_invites_me(ctx, values):
+    ctx.call('POST', '/events/{guest_event_id}/invite'.format(**values),
+             session=ctx.peer, form={'nickname': values['nickname']})
+
+
+def _peer_invites_me_and_i_accept(ctx, values):
+    _peer_invites_me(ctx, values)
+    ctx.call('POST', '/events/{guest_event_id}/accept'.format(**values))
+
+
+def _peer_removes_me(ctx, values, reply=None):
+    participant_id = _participant_id(values['guest_event_id'], values['user_id'])
+    if participant_id is not None:
+        ctx.call('POST', f'/events/{values["guest_event_id"]}/participants/{participant_id}/remove',
+                 session=ctx.peer)
+
+
+def _login(ctx, values, reply=None):
+    ctx.call('POST', '/auth/login', json={'email': values['email'], 'password': values['password']})
+
+
+def _register_payload(values):
+    token = f'{os.getpid()}x{threading.get_ident()}x{time.perf_counter_ns()}'
+    return {'json': {'email': f'register-{token}@{datagen.EMAIL_DOMAIN}',
+                     'nickname': f'register-{token}', 'password': values['password']}}
+
+
+def _delete_registered(ctx, values, reply):
+    User.query.filter(User.email.like(f'register-%@{datagen.EMAIL_DOMAIN}'),
+                      ~User.event_participations.any()).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _import_payload(values):
+    rows = '\n'.join(f'{_IMPORT_NAME} {n},{n}.50,PLN' for n in range(20))
+    return {'body': f'name,price,currency\n{rows}\n'.encode(), 'content_type': 'text/csv'}
+
+
+SCENARIOS = [
+    Scenario('static', 'GET', '/static/default_bullet.png'),
+    Scenario('set_language', 'GET', '/lang/en'),
+    Scenario('frontend.home', 'GET', '/'),
+    Scenario('frontend.login_page', 'GET', '/login'),
+    Scenario('frontend.register_page', 'GET', '/register'),
+    Scenario('frontend.profile_page', 'GET', '/profile'),
+    Scenario('frontend.settings_page', 'GET', '/settings'),
+    Scenario('frontend.user_search_page', 'GET', '/users'),
+    Scenario('frontend.wishlist_page', 'GET', '/wishlist'),
+    Scenario('auth.login', 'POST', '/auth/login',
+             payload=lambda v: {'json': {'email': v['email'], 'password': v['password']}}),
+    Scenario('auth.logout', 'POST', '/auth/logout', teardown=_login),
+    Scenario('auth.register', 'POST', '/auth/register', payload=_register_payload, teardown=_delete_registered),
+    Scenario('auth.profile', 'GET', '/auth/profile'),
+    Scenario('auth.profile', 'PUT', '/auth/profile',
+             payload=lambda v: {'json': {'name': v['name'], 'surname': v['surname']}}),
+    Scenario('auth.profile', 'POST', '/auth/profile',
+             payload=lambda v: {'form': {'nickname': v['nickname'], 'name': v['name'], 'surname': v['surname']}}),
+    Scenario('wishlist.get_wishlist', 'GET', '/wishlist/'),
+    Scenario('wishlist.get_item', 'GET', '/wishlist/{item_id}'),
+    Scenario('wishlist.add_item', 'POST', '/wishlist/',
+             payload=lambda v: {'json': {'name': 'Benchmark item', 'price': 10, 'currency': 'EUR'}},
+             teardown=_delete_added_item),
+    Scenario('wishlist.edit_item', 'PUT', '/wishlist/{item_id}',
+             payload=lambda v: {'json': {'name': v['item_name']}}),
+    Scenario('wishlist.delete_item', 'DELETE', '/wishlist/{new_item_id}', setup=_add_item),
+    Scenario('wishlist.batch', 'POST', '/wishlist/batch',
+             payload=lambda v: {'json': {'operations': [
+                 {'op': 'update', 'id': v['item_id'], 'data': {'name': v['item_name']}}]}}),
+    Scenario('wishlist.import_items', 'POST', '/wishlist/import', payload=_import_payload,
+             teardown=_delete_imported_items),
+    Scenario('wishlist.export_items', 'GET', '/wishlist/export?format=csv'),
+    Scenario('wishlist.link_previews', 'GET', '/wishlist/previews?url=https://shop.example/p/1'
+             '&url=https://shop.example/p/2'),
+    Scenario('public.search_users', 'GET', '/public/users?q=bench'),
+    Scenario('public.view_wishlist', 'GET', '/public/wishlist/{other_user_id}'),
+    Scenario('events.dashboard', 'GET', '/events/dashboard'),
+    Scenario('events.dashboard_version', 'GET', '/events/dashboard/version'),
+    Scenario('events.my_events_json', 'GET', '/events/mine'),
+    Scenario('events.view_event', 'GET', '/events/{event_id}'),
+    Scenario('events.invite_page', 'GET', '/events/{event_id}/invite'),
+    Scenario('events.participant_wishlist', 'GET', '/events/{event_id}/participant/{other_user_id}/wishlist'),
+    Scenario('events.create_event', 'POST', '/events/create',
+             payload=lambda v: {'json': {'name': 'Benchmark event', 'budget_amount': 100}},
+             teardown=_delete_created_event),
+    Scenario('events.delete_event', 'POST', '/events/{new_event_id}/delete', setup=_create_archived_event),
+    Scenario('events.edit_event', 'POST', '/events/{event_id}/edit',
+             payload=lambda v: {'form': {'name': v['event_name'], 'budget_amount': '100', 'budget_currency': 'PLN'}}),
+    Scenario('events.invite_user', 'POST', '/events/{event_id}/invite',
+             payload=lambda v: {'form': {'nickname': v['candidate_nickname']}}, teardown=_remove_candidate),
+    Scenario('events.confirm_invitations', 'POST', '/events/{event_id}/invite/confirm',
+             payload=lambda v: {'json': {'user_ids': [v['candidate_id']]}}, teardown=_remove_candidate),
+    Scenario('events.remove_participant', 'POST', '/events/{event_id}/participants/{participant_id}/remove',
+             setup=_invite_candidate),
+    Scenario('events.add_exclusion', 'POST', '/events/{event_id}/exclusions',
+             payload=lambda v: {'form': {'user_a_id': v['excluded_a'], 'user_b_id': v['excluded_b']}},
+             teardown=_remove_exclusion),
+    Scenario('events.remove_exclusion', 'POST', '/events/{event_id}/exclusions/{exclusion_id}/remove',
+             setup=_add_exclusion),
+    Scenario('events.enable_drawing', 'POST', '/events/{event_id}/drawing/enable', teardown=_reset_drawing),
+    Scenario('events.draw_recipient', 'POST', '/events/{event_id}/drawing/draw',
+             setup=_enable_drawing, teardown=_reset_drawing),
+    Scenario('events.reset_drawing', 'POST', '/events/{event_id}/drawing/reset', setup=_enable_drawing),
+    Scenario('events.archive_event', 'POST', '/events/{event_id}/archive', teardown=_unarchive),
+    Scenario('events.unarchive_event', 'POST', '/events/{event_id}/unarchive', setup=_archive),
+    Scenario('events.accept_invitation', 'POST', '/events/{guest_event_id}/accept',
+             setup=_peer_invites_me, teardown=_peer_removes_me),
+    Scenario('events.reject_invitation', 'POST', '/events/{guest_event_id}/reject',
+             setup=_peer_invites_me, teardown=_peer_removes_me),
+    Scenario('events.leave_event', 'POST', '/events/{guest_event_id}/leave',
+             setup=_peer_invites_me_and_i_accept, teardown=_peer_removes_me),
+]
+
+
+def uncovered(app):
+    """(endpoint, method) pairs registered on app that no scenario exercises."""
+    covered = {(s.endpoint, s.method) for s in SCENARIOS}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in _UNBENCHED:
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.endpoint, method) not in covered:
+                missing.append((rule.endpoint, method))
+    return missing
+
+
+def select(patterns=()):
+    """Scenarios whose endpoint or name contains any of the patterns (all if none)."""
+    if not patterns:
+        return list(SCENARIOS)
+    return [s for s in SCENARIOS if any(p in s.endpoint or p in s.name for p in patterns)]
+
+
+# -------------------------- Fixtures --------------------------------------
+
+def _busiest_user(users):
+    ids = [u.id for u in users]
+    counts = dict(db.session.query(EventParticipant.user_id, db.func.count(EventParticipant.id))
+                  .filter(EventParticipant.user_id.in_(ids),
+                          EventParticipant.status == EVENT_PARTICIPANT_STATUS_ACCEPTED)
+                  .group_by(EventParticipant.user_id))
+    return max(users, key=lambda u: (counts.get(u.id, 0), -u.id))
+
+
+def _fixture_event(name, admin_id, member_ids):
+    event = Event(name=name, budget_amount=100.0, budget_currency='PLN', admin_user_id=admin_id, is_active=True)
+    db.session.add(event)
+    db.session.flush()
+    for user_id in [admin_id] + list(member_ids):
+        db.session.add(EventParticipant(event_id=event.id, user_id=user_id, is_admin=user_id == admin_id,
+                                        status=EVENT_PARTICIPANT_STATUS_ACCEPTED))
+    return event
+
+
+def prepare(threads, password=datagen.DEFAULT_PASSWORD, sample=200):
+    """Create one fixture per thread and return the fixture dicts.
+
+    The signed-in user ("me") is the generated user with the most accepted
+    events among the first `sample`, so dashboards have realistic weight;
+    each thread gets an event me administers (three accepted members, plus a
+    candidate to invite) and an event a peer administers that me gets
+    invited to.
+    """
+    users = datagen.generated_users().limit(sample).all()
+    if len(users) < 8:
+        raise BenchmarkError('not enough generated users; run `flask perf seed` first')
+    me = _busiest_user(users)
+    peer, guest_a, guest_b, member_a, member_b, member_c, candidate = [u for u in users if u.id != me.id][:7]
+    item = (WishlistItem.query.filter_by(user_id=me.id).order_by(WishlistItem.id).first()
+            or WishlistItem(user_id=me.id, name='Benchmark wishlist item', price=25.0, currency='PLN'))
+    db.session.add(item)
+    db.session.flush()
+    fixtures = []
+    for index in range(threads):
+        own = _fixture_event(f'{_FIXTURE_NAME} {index}', me.id, (member_a.id, member_b.id, member_c.id))
+        guest = _fixture_event(f'{_FIXTURE_NAME} {index} (guest)', peer.id, (guest_a.id, guest_b.id))
+        fixtures.append({
+            'user_id': me.id, 'email': me.email, 'nickname': me.nickname, 'password': password,
+            'name': me.name or '', 'surname': me.surname or '',
+            'item_id': item.id, 'item_name': item.name,
+            'other_user_id': member_a.id,
+            'event_id': own.id, 'event_name': own.name, 'guest_event_id': guest.id,
+            'excluded_a': member_b.id, 'excluded_b': member_c.id,
+            'candidate_id': candidate.id, 'candidate_nickname': candidate.nickname,
+            'peer_email': peer.email,
+        })
+    db.session.commit()
+    return fixtures
+
+
+def cleanup(fixtures):
+    """Delete the fixture events (participants and exclusions cascade)."""
+    ids = {f['event_id'] for f in fixtures} | {f['guest_event_id'] for f in fixtures}
+    for event in Event.query.filter(Event.id.in_(ids)):
+        db.session.delete(event)
+    db.session.commit()
+
+
+# -------------------------- Measurement -----------------------------------
+
+class StatementCounter:
+    """Counts SQL statements executed by the engine in this process."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def _increment(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        sa_event.listen(self.engine, 'before_cursor_execute', self._increment)
+        return self
+
+    def __exit__(self, *exc):
+        sa_event.remove(self.engine, 'before_cursor_execute', self._increment)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, threads, wall=None):
+    """Latency percentiles (ms), throughput and error count for (seconds, statements, status) samples.
+
+    Without a wall time, throughput is what `threads` clients achieve when
+    they do nothing but this request: threads / mean latency.
+    """
+    latencies = sorted(s[0] for s in samples)
+    statements = [s[1] for s in samples if s[1] is not None]
+    errors = [s for s in samples if s[2] >= 400]
+    count = len(latencies)
+    total = sum(latencies)
+    if wall:
+        rps = count / wall
+    else:
+        rps = threads * count / total if total else None
+    return {
+        'count': count,
+        'errors': len(errors),
+        'error_statuses': sorted({s[2] for s in errors}),
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'mean_ms': _ms(total / count) if count else None,
+        'rps': round(rps, 1) if rps else None,
+        'queries': round(sum(statements) / len(statements), 2) if statements else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def parse_metrics(text):
+    """Return ({endpoint: requests}, {endpoint: sql statements}) from /metrics output."""
+    requests, statements = defaultdict(float), defaultdict(float)
+    for line in text.splitlines():
+        match = _METRIC_LINE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        target = {'http_requests_total': requests, 'sql_statements_total': statements}.get(name)
+        if target is not None:
+            endpoint = dict(_LABEL.findall(labels)).get('endpoint')
+            target[endpoint] += float(value)
+    return requests, statements
+
+
+# -------------------------- Runner ----------------------------------------
+
+class Runner:
+    """Runs scenarios with one Context per thread and collects samples per scenario."""
+
+    def __init__(self, app, contexts, counter=None, metrics=None):
+        self.app = app
+        self.contexts = contexts
+        self.counter = counter
+        self.metrics = metrics  # callable returning /metrics text, or None
+
+    def _run_thread(self, ctx, scenarios, iterations, warmup, out, errors):
+        try:
+            for scenario in scenarios:
+                for i in range(warmup + iterations):
+                    elapsed, statements, reply = scenario.run(ctx, time.perf_counter, self.counter)
+                    if i >= warmup:
+                        out[scenario.name].append((elapsed, statements, reply.status))
+        except Exception as exc:  # surfaced by the caller once the other threads finish
+            errors.append(exc)
+
+    def _parallel(self, target):
+        errors = []
+
+        def run(ctx):
+            # Setup and teardown look rows up; each thread needs its own app context and session
+            with self.app.app_context():
+                target(ctx, errors)
+        threads = [threading.Thread(target=run, args=(ctx,)) for ctx in self.contexts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def scenario(self, scenario, iterations, warmup):
+        """Run one scenario on every thread; iterations is the total across threads."""
+        per_thread = max(1, iterations // len(self.contexts))
+        before = parse_metrics(self.metrics()) if self.metrics else None
+        out = defaultdict(list)
+        self._parallel(lambda ctx, errors: self._run_thread(ctx, [scenario], per_thread, warmup, out, errors))
+        stats = summarize(out[scenario.name], len(self.contexts))
+        if before is not None:
+            stats['queries'] = self._queries_from_metrics(scenario.endpoint, before)
+        return stats
+
+    def _queries_from_metrics(self, endpoint, before):
+        # Untimed setup/teardown calls to the same endpoint are included; the ratio still holds
+        requests, statements = parse_metrics(self.metrics())
+        served = requests[endpoint] - before[0][endpoint]
+        if served <= 0:
+            return None
+        return round((statements[endpoint] - before[1][endpoint]) / served, 2)
+
+    def mixed(self, scenarios, duration):
+        """Cycle every thread through read-only scenarios for duration seconds."""
+        samples = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def run(ctx, errors):
+            local = []
+            try:
+                index = 0
+                while time.perf_counter() < deadline:
+                    scenario = scenarios[index % len(scenarios)]
+                    elapsed, statements, reply = scenario.run(ctx, time.perf_counter, self.counter)
+                    local.append((elapsed, statements, reply.status))
+                    index += 1
+            except Exception as exc:
+                errors.append(exc)
+            with lock:
+                samples.extend(local)
+        started = time.perf_counter()
+        self._parallel(run)
+        return summarize(samples, len(self.contexts), wall=time.perf_counter() - started)
+
+
+def _login_session(session, email, password):
+    reply = session.request('POST', '/auth/login', json={'email': email, 'password': password})
+    if reply.status != 200:
+        raise BenchmarkError(f'login as {email} failed with {reply.status}: {reply.body[:200]!r}')
+    return session
+
+
+def _contexts(fixtures, make_session):
+    return [Context(_login_session(make_session(), f['email'], f['password']),
+                    _login_session(make_session(), f['peer_email'], f['password']), f)
+            for f in fixtures]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """gunicorn with gunicorn.conf.py on a free local port, metrics enabled."""
+
+    def __init__(self, app, workers, threads):
+        self.app = app
+        self.workers = workers
+        self.threads = threads
+        self.port = _free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self._tmp = None
+        self._process = None
+
+    def __enter__(self):
+        self._tmp = tempfile.mkdtemp(prefix='wishlist-bench-')
+        env = dict(os.environ)
+        env.update({
+            'DATABASE_URL': db.engine.url.render_as_string(hide_password=False),
+            'SECRET_KEY': self.app.config['SECRET_KEY'],
+            'GUNICORN_BIND': f'127.0.0.1:{self.port}',
+            'GUNICORN_WORKERS': str(self.workers),
+            'GUNICORN_THREADS': str(self.threads),
+            'GUNICORN_MAX_REQUESTS': '0',
+            'GUNICORN_RSS_REPORT_INTERVAL': '0',
+            'METRICS_ENABLED': '1',
+            'METRICS_DIR': os.path.join(self._tmp, 'metrics'),
+        })
+        env.pop('METRICS_TOKEN', None)
+        os.makedirs(env['METRICS_DIR'])
+        root = os.path.dirname(self.app.root_path)
+        self._log = open(os.path.join(self._tmp, 'server.log'), 'wb')
+        self._process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                                         cwd=root, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+        try:
+            self._wait_ready(timeout=60)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise BenchmarkError(f'gunicorn exited with {self._process.returncode}:\n{self._tail()}')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                connection.request('GET', '/login')
+                if connection.getresponse().status < 500:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise BenchmarkError(f'gunicorn did not answer within {timeout}s:\n{self._tail()}')
+
+    def _tail(self, lines=20):
+        self._log.flush()
+        with open(self._log.name, 'rb') as log:
+            return b'\n'.join(log.read().splitlines()[-lines:]).decode(errors='replace')
+
+    def __exit__(self, *exc):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._log.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def _fetch_metrics(base_url):
+    session = HttpSession(base_url)
+    try:
+        reply = session.request('GET', '/metrics')
+    finally:
+        session.close()
+    return reply.body.decode() if reply.status == 200 else None
+
+
+def run(scenarios, driver='client', url=None, workers=2, threads=4, concurrency=4, iterations=50,
+        warmup=3, duration=10, progress=None):
+    """Benchmark scenarios and return the result document (see save())."""
+    app = current_app._get_current_object()
+    if driver == 'client':
+        concurrency = 1  # the test client runs in this thread; parallel clients would measure the GIL
+    fixtures = prepare(concurrency)
+    server = None
+    contexts = []
+    try:
+        if driver == 'client':
+            contexts = _contexts(fixtures, lambda: ClientSession(app))
+            counter = StatementCounter(db.engine)
+            metrics = None
+        else:
+            if url is None:
+                server = Server(app, workers, threads).__enter__()
+                url = server.url
+            contexts = _contexts(fixtures, lambda: HttpSession(url))
+            counter = None
+            metrics = (lambda: _fetch_metrics(url)) if _fetch_metrics(url) is not None else None
+        runner = Runner(app, contexts, counter, metrics)
+        results = {}
+        with counter or contextlib.nullcontext():
+            for scenario in scenarios:
+                results[scenario.name] = dict(runner.scenario(scenario, iterations, warmup),
+                                              method=scenario.method, path=scenario.path)
+                if progress:
+                    progress(scenario.name, results[scenario.name])
+            read_only = [s for s in scenarios if s.read_only]
+            mixed = runner.mixed(read_only, duration) if duration and read_only else None
+    finally:
+        for ctx in contexts:
+            for session in (ctx.me, ctx.peer):
+                if isinstance(session, HttpSession):
+                    session.close()
+        if server is not None:
+            server.__exit__(None, None, None)
+        cleanup(fixtures)
+    meta = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'driver': driver,
+        'url': url if server is None else None,
+        'workers': workers if server is not None else None,
+        'threads': threads if server is not None else None,
+        'concurrency': concurrency,
+        'iterations': iterations,
+        'warmup': warmup,
+        'python': sys.version.split()[0],
+        'dataset': datagen.dataset_counts(),
+    }
+    meta.update(git_revision(os.path.dirname(app.root_path)))
+    return {'meta': meta, 'scenarios': results, 'mixed': mixed}
+
+
+# -------------------------- Results ---------------------------------------
+
+def git_revision(cwd):
+    """{'commit': short sha, 'dirty': bool}, or Nones outside a git checkout."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': bool(status.strip())}
+
+
+def save(result, path=None, directory=None):
+    """Write result as JSON; the default name is <timestamp>-<commit>-<driver>.json."""
+    if path is None:
+        meta = result['meta']
+        stamp = meta['created'].replace(':', '').replace('-', '')[:15]
+        commit = (meta['commit'] or 'nogit') + ('-dirty' if meta['dirty'] else '')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{stamp}-{commit}-{meta["driver"]}.json')
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, metric='p95_ms'):
+    """Rows of (scenario, baseline value, current value, change in %) for scenarios in both."""
+    rows = []
+    for name, stats in current['scenarios'].items():
+        before = baseline['scenarios'].get(name, {}).get(metric)
+        after = stats.get(metric)
+        change = None
+        if before and after is not None:
+            change = round((after - before) / before * 100, 1)
+        rows.append((name, before, after, change))
+    return rows
@@ -0,0 +1,129 @@
+"""Dashboard data provider.
+
+Loads everything the events dashboard needs (active, archived and pending
+events) in one joined query and caches the result per worker, keyed by the
+user's dashboard_version. That counter is incremented in the same
+transaction as every change to one of the user's participations or to any
+event they take part in (via session flush hooks; bulk writers call bump()
+themselves), so a change committed by any worker is seen by all of them on
+the next request and a stale entry can never be served again. Checking the
+version costs one primary-key lookup, which is also what an open dashboard
+page polls to find out that it should reload.
+"""
+from collections import namedtuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import update
+
+from app import db
+from app.models.models import Event
+from app.models.models import EventParticipant
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import EVENT_PARTICIPANT_STATUS_PENDING
+from app.models.models import User
+from app.services.cache import TTLCache
+
+# Lightweight, session-independent snapshot of the event fields the dashboard renders
+DashboardEvent = namedtuple('DashboardEvent', 'id name date budget_amount budget_currency archived')
+DashboardData = namedtuple('DashboardData', 'events archived_events pending_events version')
+
+_DIRTY_KEY = 'dashboard_dirty_user_ids'
+
+_cache = TTLCache()  # (user_id, dashboard_version) -> DashboardData
+
+
+def dashboard_query(user_id):
+    return (db.session.query(
+                Event.id, Event.name, Event.date, Event.budget_amount,
+                Event.budget_currency, Event.archived, EventParticipant.status)
+            .join(EventParticipant, EventParticipant.event_id == Event.id)
+            .filter(EventParticipant.user_id == user_id,
+                    EventParticipant.status.in_([EVENT_PARTICIPANT_STATUS_ACCEPTED,
+                                                 EVENT_PARTICIPANT_STATUS_PENDING]))
+            .order_by(EventParticipant.id))
+
+
+def _load(user_id, version):
+    rows = dashboard_query(user_id).all()
+    active, archived, pending = [], [], []
+    for row in rows:
+        ev = DashboardEvent(row.id, row.name, row.date, row.budget_amount,
+                            row.budget_currency, bool(row.archived))
+        if row.status == EVENT_PARTICIPANT_STATUS_PENDING:
+            pending.append(ev)
+        elif ev.archived:
+            archived.append(ev)
+        else:
+            active.append(ev)
+    return DashboardData(active, archived, pending, version)
+
+
+def current_version(user_id):
+    return db.session.query(User.dashboard_version).filter(User.id == user_id).scalar()
+
+
+def get_dashboard(user_id):
+    """Return DashboardData for user_id, served from cache while the user's version is unchanged."""
+    version = current_version(user_id)
+    key = (user_id, version)
+    data = _cache.get(key)
+    if data is None:
+        data = _load(user_id, version)
+        _cache.set(key, data)
+    return data
+
+
+def bump(connection, user_ids):
+    """Invalidate the users' cached dashboards in every worker; runs in the caller's transaction."""
+    if user_ids:
+        connection.execute(update(User.__table__)
+                           .where(User.__table__.c.id.in_(list(user_ids)))
+                           .values(dashboard_version=User.__table__.c.dashboard_version + 1))
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return _cache.stats()
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _collect_dirty_users(session, flush_context, instances):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    event_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, EventParticipant):
+            if obj.user_id is not None:
+                dirty.add(obj.user_id)
+        elif isinstance(obj, Event) and obj.id is not None:
+            event_ids.add(obj.id)
+    if event_ids:
+        # Event changes affect the dashboard of every participant
+        with session.no_autoflush:
+            rows = (session.query(EventParticipant.user_id)
+                    .filter(EventParticipant.event_id.in_(event_ids))
+                    .all())
+        dirty.update(r.user_id for r in rows)
+
+
+def _bump_dirty_users(session, flush_context):
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        bump(session.connection(), dirty)
+
+
+def _discard_pending(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def init_app(app):
+    app.config.setdefault('DASHBOARD_CACHE_TTL', 300)
+    app.config.setdefault('DASHBOARD_CACHE_SIZE', 4096)
+    _cache.configure(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+    if not sa_event.contains(db.session, 'before_flush', _collect_dirty_users):
+        sa_event.listen(db.session, 'before_flush', _collect_dirty_users)
+        sa_event.listen(db.session, 'after_flush', _bump_dirty_users)
+        sa_event.listen(db.session, 'after_rollback', _discard_pending)
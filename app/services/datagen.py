@@ -0,0 +1,259 @@
+"""Synthetic datasets for benchmarks and local profiling (`flask perf seed`).
+
+generate() adds users with wishlist items and events whose participant
+counts follow a configurable distribution; a fraction of the events have
+their drawing enabled (some participants already drew) and some are
+archived. Rows are written with bulk Core INSERTs in batches, one
+transaction per batch, so a dataset of 100k users takes seconds rather than
+the hours the routes would need.
+
+Generated accounts use @example.test addresses and share one password
+(hashed once), so the benchmark can sign in as any of them. The same seed
+on the same starting database yields the same dataset.
+"""
+import random
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from sqlalchemy import func
+from sqlalchemy import insert
+
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import EVENT_PARTICIPANT_STATUS_PENDING
+from app.models.models import EVENT_PARTICIPANT_STATUS_REJECTED
+from app.models.models import Event
+from app.models.models import EventParticipant
+from app.models.models import User
+from app.models.models import WishlistItem
+from app.services import drawing
+from app.services import engine
+from app.services import fx
+from app.services import passwords
+
+DEFAULT_PASSWORD = 'benchmark'
+EMAIL_DOMAIN = 'example.test'
+DISTRIBUTIONS = ('fixed', 'uniform', 'zipf')
+
+_FIRST_NAMES = ('Anna', 'Piotr', 'Maria', 'Krzysztof', 'Katarzyna', 'Tomasz', 'Magdalena', 'Paweł',
+                'Agnieszka', 'Michał', 'Ewa', 'Jan', 'Zofia', 'Marek', 'Julia', 'Adam')
+_SURNAMES = ('Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski',
+             'Zieliński', 'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski')
+_ADJECTIVES = ('Wool', 'Leather', 'Wireless', 'Vintage', 'Ceramic', 'Wooden', 'Compact', 'Scented',
+               'Illustrated', 'Bamboo', 'Insulated', 'Handmade')
+_NOUNS = ('scarf', 'notebook', 'headphones', 'mug', 'board game', 'lamp', 'backpack', 'candle',
+          'cookbook', 'puzzle', 'thermos', 'plant pot', 'watch', 'socks')
+_SHOPS = ('shop.example.com', 'store.example.org', 'market.example.net', 'books.example.com')
+_OCCASIONS = ('Christmas', 'Office party', 'Family gifts', 'Book club', 'Birthday pool', 'Team swap')
+_BUDGETS = (50, 80, 100, 150, 200, 300)
+# Currency mix for items and event budgets
+_CURRENCIES = (('PLN', 0.7), ('EUR', 0.2), ('USD', 0.1))
+
+
+class InvalidDistribution(ValueError):
+    """A participant or item count spec could not be parsed."""
+
+
+def parse_distribution(spec):
+    """Turn 'fixed:N', 'uniform:A-B' or 'zipf:A-B' into a function rng -> int.
+
+    zipf favours the low end (weight 1/k**1.5): most events are small, a few
+    are large, which is what production data looks like.
+    """
+    kind, _, bounds = (spec or '').partition(':')
+    try:
+        if kind == 'fixed':
+            low = high = int(bounds)
+        elif kind in ('uniform', 'zipf'):
+            low, high = (int(part) for part in bounds.split('-', 1))
+        else:
+            raise ValueError(kind)
+    except ValueError:
+        raise InvalidDistribution(f'{spec!r}: expected one of fixed:N, uniform:A-B, zipf:A-B')
+    if low < 0 or high < low:
+        raise InvalidDistribution(f'{spec!r}: bounds must satisfy 0 <= A <= B')
+    if kind == 'zipf':
+        values = list(range(low, high + 1))
+        weights = [1 / (rank ** 1.5) for rank in range(1, len(values) + 1)]
+        return lambda rng: rng.choices(values, weights)[0]
+    return lambda rng: rng.randint(low, high)
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert_returning_ids(table, rows):
+    def run():
+        result = db.session.connection().execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        return [row.id for row in result]
+    return engine.run_in_transaction(run)
+
+
+def _insert(table, rows):
+    engine.run_in_transaction(lambda: db.session.connection().execute(insert(table), rows))
+
+
+def _currency(rng):
+    return rng.choices([c for c, _ in _CURRENCIES], [w for _, w in _CURRENCIES])[0]
+
+
+def _next_index():
+    """First free number for generated nicknames, so repeated runs add new users."""
+    return db.session.query(func.count(User.id)).filter(User.email.like(f'%@{EMAIL_DOMAIN}')).scalar()
+
+
+def _make_users(count, rng, password_hash, batch_size):
+    first = _next_index()
+    ids = []
+    rows = [{
+        'email': f'bench{n}@{EMAIL_DOMAIN}',
+        'nickname': f'bench{n}',
+        'nickname_key': f'bench{n}',  # already folded (see user_search.search_key)
+        'name': rng.choice(_FIRST_NAMES),
+        'surname': rng.choice(_SURNAMES),
+        'password_hash': password_hash,
+    } for n in range(first, first + count)]
+    for chunk in _chunks(rows, batch_size):
+        ids.extend(_insert_returning_ids(User.__table__, chunk))
+    return ids
+
+
+def _make_items(user_ids, distribution, rng, now, batch_size):
+    rates = fx.rates()
+    total = 0
+    rows = []
+    for user_id in user_ids:
+        for _ in range(distribution(rng)):
+            currency = _currency(rng)
+            price = round(min(rng.lognormvariate(4, 1), 5000), 2) if rng.random() < 0.9 else None
+            rate = rates.get(currency)
+            rows.append({
+                'user_id': user_id,
+                'name': f'{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}',
+                'price': price,
+                'currency': currency,
+                'price_base': None if price is None or rate is None else price * rate,
+                'details': 'Size M, any colour' if rng.random() < 0.3 else None,
+                'event': rng.choice(_OCCASIONS) if rng.random() < 0.4 else None,
+                'link': f'https://{rng.choice(_SHOPS)}/p/{rng.randrange(10 ** 6)}' if rng.random() < 0.6 else None,
+                'created_at': now - timedelta(days=rng.uniform(0, 365)),
+            })
+            if len(rows) >= batch_size:
+                _insert(WishlistItem.__table__, rows)
+                total += len(rows)
+                rows = []
+    if rows:
+        _insert(WishlistItem.__table__, rows)
+        total += len(rows)
+    return total
+
+
+def _plan_event(user_ids, distribution, accept_rate, drawn, archived, rng, now):
+    """Return (event row, participant rows without event_id)."""
+    size = max(2, min(distribution(rng), len(user_ids)))
+    members = rng.sample(user_ids, size)
+    admin = members[0]
+    participants = [{'user_id': admin, 'is_admin': True, 'status': EVENT_PARTICIPANT_STATUS_ACCEPTED}]
+    for user_id in members[1:]:
+        roll = rng.random()
+        if roll < accept_rate:
+            status = EVENT_PARTICIPANT_STATUS_ACCEPTED
+        elif roll < accept_rate + (1 - accept_rate) * 2 / 3:
+            status = EVENT_PARTICIPANT_STATUS_PENDING
+        else:
+            status = EVENT_PARTICIPANT_STATUS_REJECTED
+        participants.append({'user_id': user_id, 'is_admin': False, 'status': status})
+    created = now - timedelta(days=rng.uniform(0, 365))
+    for participant in participants:
+        participant['invited_at'] = created
+        participant['accepted_at'] = created if participant['status'] == EVENT_PARTICIPANT_STATUS_ACCEPTED else None
+        participant['assigned_recipient_user_id'] = None
+        participant['drawn_at'] = None
+    accepted = [p for p in participants if p['status'] == EVENT_PARTICIPANT_STATUS_ACCEPTED]
+    drawing_enabled = len(accepted) >= 2 and rng.random() < drawn
+    if drawing_enabled:
+        assignment = drawing.assign_recipients([p['user_id'] for p in accepted], rng=rng)
+        for participant in accepted:
+            participant['assigned_recipient_user_id'] = assignment[participant['user_id']]
+            participant['drawn_at'] = created + timedelta(days=1) if rng.random() < 0.5 else None
+    currency = _currency(rng)
+    event = {
+        'name': f'{rng.choice(_OCCASIONS)} {created.year}',
+        'event_date': (created + timedelta(days=rng.randint(7, 60))).date(),
+        'budget': float(rng.choice(_BUDGETS)),
+        'currency': currency,
+        'admin_id': admin,
+        'created_at': created,
+        'drawing_enabled': drawing_enabled,
+        'archived': rng.random() < archived,
+        'is_active': True,
+    }
+    return event, participants
+
+
+def _make_events(count, user_ids, distribution, accept_rate, drawn, archived, rng, now, batch_size):
+    stats = {'events': 0, 'participants': 0, 'drawn_events': 0, 'archived_events': 0}
+    planned = []
+
+    def flush():
+        event_ids = _insert_returning_ids(Event.__table__, [event for event, _ in planned])
+        rows = []
+        for event_id, (event, participants) in zip(event_ids, planned):
+            rows.extend(dict(p, event_id=event_id) for p in participants)
+            stats['drawn_events'] += event['drawing_enabled']
+            stats['archived_events'] += event['archived']
+        for chunk in _chunks(rows, batch_size):
+            _insert(EventParticipant.__table__, chunk)
+        stats['events'] += len(event_ids)
+        stats['participants'] += len(rows)
+        planned.clear()
+
+    for _ in range(count):
+        planned.append(_plan_event(user_ids, distribution, accept_rate, drawn, archived, rng, now))
+        if len(planned) >= batch_size:
+            flush()
+    if planned:
+        flush()
+    return stats
+
+
+def generate(users, events, participants='zipf:3-30', items='uniform:0-15', drawn=0.3,
+             archived=0.05, accept_rate=0.85, seed=None, password=DEFAULT_PASSWORD, batch_size=1000):
+    """Add a synthetic dataset and return row counts per kind.
+
+    participants and items are distribution specs (see parse_distribution);
+    drawn and archived are the fractions of events with the drawing enabled
+    and archived; accept_rate is the share of invitations that were accepted,
+    the rest being pending or rejected 2:1.
+    """
+    participant_dist = parse_distribution(participants)
+    item_dist = parse_distribution(items)
+    if events and users < 2:
+        raise InvalidDistribution('events need at least two users')
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    user_ids = _make_users(users, rng, passwords.hash_password(password), batch_size)
+    stats = {'users': len(user_ids)}
+    stats['items'] = _make_items(user_ids, item_dist, rng, now, batch_size)
+    stats.update(_make_events(events, user_ids, participant_dist, accept_rate, drawn, archived,
+                              rng, now, batch_size))
+    return stats
+
+
+def generated_users():
+    """Query for the accounts created by generate(), oldest first."""
+    return User.query.filter(User.email.like(f'%@{EMAIL_DOMAIN}')).order_by(User.id)
+
+
+def dataset_counts():
+    """Row counts of the tables the benchmark reads, recorded with each result."""
+    return {
+        'users': db.session.query(func.count(User.id)).scalar(),
+        'items': db.session.query(func.count(WishlistItem.id)).scalar(),
+        'events': db.session.query(func.count(Event.id)).scalar(),
+        'participants': db.session.query(func.count(EventParticipant.id)).scalar(),
+    }
@@ -0,0 +1,136 @@
+"""Secret Santa drawing engine.
+
+Without constraints, assignments are generated with Sattolo's algorithm, which
+yields a uniformly random permutation consisting of a single cycle. A single
+n-cycle (n >= 2) never maps anyone to themselves, so every run produces a
+valid derangement in one O(n) pass with no retries and no failure case.
+
+With constraints (exclusion pairs, last year's pairings) the drawing becomes a
+perfect matching between givers and recipients over the allowed edges; every
+perfect matching is a set of gift cycles covering all participants. The
+allowed graph is dense (everyone except a few blocked people), so it is never
+materialised: a randomised greedy pass matches almost everyone and the rest are
+fixed with augmenting paths found by BFS over the complement of the blocked
+sets, keeping the total work near O(n + constraints). When no augmenting path
+exists the BFS frontier is a Hall violator, reported by InfeasibleDrawing.
+"""
+import random
+from collections import deque
+
+
+class InfeasibleDrawing(ValueError):
+    """No valid assignment exists.
+
+    givers is a set of participants whose combined allowed recipients
+    (recipients) are fewer than themselves, so they cannot all be served.
+    """
+
+    def __init__(self, givers, recipients):
+        self.givers = set(givers)
+        self.recipients = set(recipients)
+        super().__init__(f'{len(self.givers)} participant(s) can only give to '
+                         f'{len(self.recipients)} allowed recipient(s)')
+
+
+def single_cycle(items, seed=None, rng=None):
+    """Return a uniformly random cyclic permutation of items as a new list.
+
+    result[i] is the recipient of items[i]. Pass seed (or an explicit
+    random.Random as rng) for reproducible output.
+    """
+    rng = rng or random.Random(seed)
+    perm = list(items)
+    for i in range(len(perm) - 1, 0, -1):
+        j = rng.randrange(i)  # j < i: excluding i itself is what forces one cycle
+        perm[i], perm[j] = perm[j], perm[i]
+    return perm
+
+
+def _augment(root, recipients, blocked, recipient_of, giver_of):
+    """Extend the matching to root along a shortest augmenting path."""
+    unvisited = set(recipients)
+    parent = {}  # recipient -> giver it was reached from
+    seen_givers = {root}
+    queue = deque([root])
+    while queue:
+        giver = queue.popleft()
+        banned = blocked[giver]
+        # Complement-graph BFS: each recipient leaves `unvisited` once and each
+        # retained one is charged to the giver's blocked set.
+        reached = [r for r in unvisited if r not in banned]
+        if not reached:
+            continue
+        unvisited.difference_update(reached)
+        for recipient in reached:
+            parent[recipient] = giver
+            holder = giver_of.get(recipient)
+            if holder is None:
+                # Flip the path: every giver on it moves to the next recipient
+                while recipient is not None:
+                    giver = parent[recipient]
+                    previous = recipient_of.get(giver)
+                    recipient_of[giver] = recipient
+                    giver_of[recipient] = giver
+                    recipient = previous
+                return
+            if holder not in seen_givers:
+                seen_givers.add(holder)
+                queue.append(holder)
+    raise InfeasibleDrawing(seen_givers, parent.keys())
+
+
+def _constrained_assignment(user_ids, blocked, rng):
+    givers = list(user_ids)
+    rng.shuffle(givers)
+    pool = list(user_ids)
+    rng.shuffle(pool)
+    recipient_of = {}
+    giver_of = {}
+    unmatched = []
+    for giver in givers:
+        banned = blocked[giver]
+        # Scan the shuffled pool from the end; at most len(banned) entries are skipped
+        for idx in range(len(pool) - 1, -1, -1):
+            if pool[idx] not in banned:
+                recipient = pool[idx]
+                pool[idx] = pool[-1]
+                pool.pop()
+                recipient_of[giver] = recipient
+                giver_of[recipient] = giver
+                break
+        else:
+            unmatched.append(giver)
+    for giver in unmatched:
+        _augment(giver, user_ids, blocked, recipient_of, giver_of)
+    return recipient_of
+
+
+def assign_recipients(user_ids, exclusions=(), forbidden=(), seed=None, rng=None):
+    """Map each giver user id to a recipient user id, never to themselves.
+
+    exclusions are symmetric (a, b) pairs that must not be matched in either
+    direction; forbidden are directed (giver, recipient) pairs, e.g. last
+    year's assignments. Pairs mentioning non-participants are ignored.
+    Raises ValueError for fewer than two distinct participants and
+    InfeasibleDrawing when the constraints leave no valid assignment.
+    """
+    user_ids = list(user_ids)
+    if len(set(user_ids)) != len(user_ids):
+        raise ValueError('user_ids must be unique')
+    if len(user_ids) < 2:
+        raise ValueError('at least two participants are required')
+    rng = rng or random.Random(seed)
+    blocked = {uid: {uid} for uid in user_ids}
+    constrained = False
+    for a, b in exclusions:
+        if a in blocked and b in blocked:
+            blocked[a].add(b)
+            blocked[b].add(a)
+            constrained = True
+    for giver, recipient in forbidden:
+        if giver in blocked and recipient in blocked:
+            blocked[giver].add(recipient)
+            constrained = True
+    if not constrained:
+        return dict(zip(user_ids, single_cycle(user_ids, rng=rng)))
+    return _constrained_assignment(user_ids, blocked, rng)
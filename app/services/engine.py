@@ -0,0 +1,115 @@
+"""Database engine profile and busy-tolerant transactions.
+
+engine_options() picks pool settings per backend before Flask-SQLAlchemy
+creates the engine; init_app() then installs a connect hook that applies
+sqlite_pragmas() (WAL journal, synchronous, cache and mmap sizes, busy
+timeout) to every new local SQLite connection. Remote libsql connections get
+pre-ping and recycling instead, as pragmas are managed server side.
+
+run_in_transaction() retries a unit of work when SQLite reports the database
+as locked or busy. busy_timeout covers most lock waits, but a deferred
+transaction that must upgrade from reader to writer under WAL fails
+immediately with SQLITE_BUSY, so the whole unit has to be rolled back and
+re-run.
+"""
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,  # KiB when negative, i.e. ~20 MB page cache per connection
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+_BUSY_MESSAGES = ('database is locked', 'database is busy', 'database table is locked')
+
+
+def sqlite_pragmas(config):
+    """DEFAULT_SQLITE_PRAGMAS with SQLITE_BUSY_TIMEOUT_MS and any SQLITE_PRAGMAS overrides applied."""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas['busy_timeout'] = config.get('SQLITE_BUSY_TIMEOUT_MS', pragmas['busy_timeout'])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def _backend(uri):
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return 'other'
+    if url.get_driver_name() in ('libsql', 'aiolibsql'):
+        return 'libsql'
+    if not url.database or url.database == ':memory:':
+        return 'sqlite-memory'
+    return 'sqlite'
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS suited to the configured backend."""
+    backend = _backend(config['SQLALCHEMY_DATABASE_URI'])
+    if backend == 'sqlite':
+        busy_ms = sqlite_pragmas(config)['busy_timeout']
+        return {
+            # Local file connections are cheap; keep a small pool per worker process
+            'pool_size': config.get('SQLALCHEMY_POOL_SIZE', 5),
+            'max_overflow': config.get('SQLALCHEMY_MAX_OVERFLOW', 10),
+            'connect_args': {'timeout': busy_ms / 1000.0, 'check_same_thread': False},
+        }
+    if backend == 'libsql':
+        return {
+            'pool_pre_ping': True,
+            'pool_recycle': config.get('SQLALCHEMY_POOL_RECYCLE', 300),
+        }
+    return {}
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def init_app(app):
+    """Install the connect hook; call after db.init_app(app)."""
+    if _backend(app.config['SQLALCHEMY_DATABASE_URI']) != 'sqlite':
+        return
+    with app.app_context():
+        sa_event.listen(db.engine, 'connect', _apply_pragmas(sqlite_pragmas(app.config)))
+
+
+def is_busy_error(exc):
+    message = str(getattr(exc, 'orig', exc)).lower()
+    return any(m in message for m in _BUSY_MESSAGES)
+
+
+def run_in_transaction(fn, *args, **kwargs):
+    """Run fn and commit, retrying with jittered exponential backoff on busy errors.
+
+    fn must be safe to re-run from scratch: it is called again after a rollback.
+    """
+    attempts = current_app.config.get('DB_RETRY_ATTEMPTS', 5)
+    backoff = current_app.config.get('DB_RETRY_BACKOFF', 0.05)
+    for attempt in range(attempts):
+        try:
+            result = fn(*args, **kwargs)
+            db.session.commit()
+            return result
+        except OperationalError as exc:
+            db.session.rollback()
+            if attempt == attempts - 1 or not is_busy_error(exc):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
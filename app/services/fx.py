@@ -0,0 +1,179 @@
+"""Cached exchange rates and the normalized WishlistItem.price_base column.
+
+Rates live in the exchange_rate table as units of BASE_CURRENCY per unit of
+a currency and are loaded from a CSV or JSON file with `flask fx load`. Every
+WishlistItem insert or price/currency change gets price_base filled in by a
+before_flush hook, so price filters, budget matching and price ordering
+across currencies are plain indexed comparisons on one column. Loading new
+rates recomputes price_base for the affected currencies with one UPDATE each
+and bumps the owners' wishlist versions so cached listings revalidate.
+
+Workers keep the rate table in memory for FX_RATES_TTL seconds.
+"""
+import csv
+import json
+import re
+
+from flask import current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy import select
+from sqlalchemy import update
+
+from app import db
+from app.models.models import ExchangeRate
+from app.models.models import User
+from app.models.models import WishlistItem
+from app.services.cache import TTLCache
+
+_CURRENCY = re.compile(r'^[A-Z]{3}$')
+
+_cache = TTLCache(maxsize=1)  # single entry: {currency: rate}
+
+
+class InvalidRates(ValueError):
+    """A rates file or mapping contains an unusable entry."""
+
+
+def base_currency():
+    return current_app.config['BASE_CURRENCY']
+
+
+def _load_rates(connection):
+    rates = dict(connection.execute(select(ExchangeRate.currency, ExchangeRate.rate)).all())
+    rates[base_currency()] = 1.0
+    return rates
+
+
+def rates(connection=None):
+    """Return {currency: units of base currency per unit}, always including the base."""
+    cached = _cache.get(None)
+    if cached is None:
+        cached = _load_rates(connection if connection is not None else db.session.connection())
+        _cache.set(None, cached)
+    return cached
+
+
+def to_base(amount, currency, connection=None):
+    """Convert amount to the base currency, or None if either is unknown."""
+    if amount is None:
+        return None
+    rate = rates(connection).get((currency or '').upper())
+    return None if rate is None else amount * rate
+
+
+def from_base(amount, currency):
+    rate = rates().get((currency or '').upper())
+    return None if rate is None or amount is None else amount / rate
+
+
+def clear():
+    _cache.clear()
+
+
+# -------------------------- Rate loading ----------------------------------
+
+def parse_rates(stream, fmt):
+    """Read a rates file: JSON object {"EUR": 4.3, ...} or CSV rows currency,rate."""
+    if fmt == 'json':
+        data = json.load(stream)
+        if not isinstance(data, dict):
+            raise InvalidRates('expected a JSON object of currency: rate')
+        pairs = data.items()
+    else:
+        pairs = [row[:2] for row in csv.reader(stream) if row and not row[0].startswith('#')]
+        if pairs and pairs[0][0].strip().lower() == 'currency':
+            pairs = pairs[1:]  # header
+    parsed = {}
+    for currency, rate in pairs:
+        currency = str(currency).strip().upper()
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            raise InvalidRates(f'{currency}: rate {rate!r} is not a number')
+        if not _CURRENCY.match(currency) or rate <= 0:
+            raise InvalidRates(f'{currency}: invalid currency code or rate')
+        parsed[currency] = rate
+    return parsed
+
+
+def recompute(connection, currencies):
+    """Re-derive price_base for items in the given currencies; returns rows updated."""
+    current = _load_rates(connection)
+    updated = 0
+    for currency in currencies:
+        rate = current.get(currency)
+        if rate is None:
+            continue
+        updated += connection.execute(
+            update(WishlistItem.__table__)
+            .where(WishlistItem.__table__.c.currency == currency)
+            .values(price_base=WishlistItem.__table__.c.price * rate)).rowcount
+        # Cached listings and ETags of these owners depend on price_base
+        connection.execute(
+            update(User.__table__)
+            .where(User.__table__.c.id.in_(
+                select(WishlistItem.user_id).where(WishlistItem.currency == currency).distinct()))
+            .values(wishlist_version=User.__table__.c.wishlist_version + 1))
+    return updated
+
+
+def store_rates(new_rates):
+    """Upsert rates and recompute price_base for currencies whose rate changed.
+
+    Must run inside a transaction (see engine.run_in_transaction).
+    """
+    base = base_currency()
+    if new_rates.get(base, 1.0) != 1.0:
+        raise InvalidRates(f'{base} is the base currency and must have rate 1')
+    new_rates = {currency: rate for currency, rate in new_rates.items() if currency != base}
+    existing = {r.currency: r for r in ExchangeRate.query.filter(ExchangeRate.currency.in_(list(new_rates)))}
+    changed = []
+    for currency, rate in new_rates.items():
+        row = existing.get(currency)
+        if row is None:
+            db.session.add(ExchangeRate(currency=currency, rate=rate))
+        elif row.rate == rate:
+            continue
+        else:
+            row.rate = rate
+        changed.append(currency)
+    db.session.flush()
+    updated = recompute(db.session.connection(), changed)
+    return changed, updated
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _normalize_prices(session, flush_context, instances):
+    items = [obj for obj in session.new if isinstance(obj, WishlistItem)]
+    items += [obj for obj in session.dirty
+              if isinstance(obj, WishlistItem) and session.is_modified(obj, include_collections=False)]
+    if not items:
+        return
+    connection = session.connection()
+    for item in items:
+        # Prices that are not numbers yet (e.g. a raw string) get no base price instead of failing the flush
+        numeric = isinstance(item.price, (int, float)) and not isinstance(item.price, bool)
+        item.price_base = to_base(item.price, item.currency or 'PLN', connection) if numeric else None
+
+
+def _drop_rates_after_commit(session):
+    # Rates written through this session take effect immediately in this worker
+    if session.info.pop('fx_rates_changed', False):
+        clear()
+
+
+def _track_rate_changes(session, flush_context):
+    if any(isinstance(obj, ExchangeRate) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['fx_rates_changed'] = True
+        clear()
+
+
+def init_app(app):
+    app.config.setdefault('BASE_CURRENCY', 'PLN')
+    app.config.setdefault('FX_RATES_TTL', 300)
+    _cache.configure(1, app.config['FX_RATES_TTL'])
+    if not sa_event.contains(db.session, 'before_flush', _normalize_prices):
+        sa_event.listen(db.session, 'before_flush', _normalize_prices)
+        sa_event.listen(db.session, 'after_flush', _track_rate_changes)
+        sa_event.listen(db.session, 'after_commit', _drop_rates_after_commit)
@@ -0,0 +1,65 @@
+"""Bulk invitations for confirm_invitations.
+
+invite() resolves a whole list of invitees with chunked IN queries (who is
+already a participant, which users exist) and inserts the new pending
+participants with one executemany INSERT, instead of two lookups and one
+INSERT per invitee.
+"""
+from sqlalchemy import insert
+
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_PENDING
+from app.models.models import EventParticipant
+from app.models.models import User
+from app.services import dashboard
+
+# Keep IN lists below SQLite's historical bound-parameter limit
+_IN_CHUNK_SIZE = 900
+
+
+def _normalize(user_ids):
+    candidates = []
+    for uid in user_ids:
+        try:
+            candidates.append((uid, int(uid)))
+        except (ValueError, TypeError):
+            candidates.append((uid, None))
+    return candidates
+
+
+def invite(event_id, inviter_id, user_ids):
+    """Insert pending participants for user_ids; returns (created, skipped).
+
+    Skipped are ids that are not integers (returned as given), the inviter,
+    existing participants, unknown users and repeats. Re-runnable as a whole,
+    so it can be retried on a busy database (engine.run_in_transaction).
+    """
+    candidates = _normalize(user_ids)
+    lookup_ids = list({uid_int for _, uid_int in candidates if uid_int is not None})
+    existing_ids = set()
+    valid_ids = set()
+    for i in range(0, len(lookup_ids), _IN_CHUNK_SIZE):
+        chunk = lookup_ids[i:i + _IN_CHUNK_SIZE]
+        existing_ids.update(row.user_id for row in db.session.query(EventParticipant.user_id)
+                            .filter(EventParticipant.event_id == event_id, EventParticipant.user_id.in_(chunk)))
+        valid_ids.update(row.id for row in db.session.query(User.id).filter(User.id.in_(chunk)))
+    created = []
+    skipped = []
+    for uid, uid_int in candidates:
+        if uid_int is None:
+            skipped.append(uid)
+            continue
+        # skip self, existing participants, unknown users and duplicates within the request
+        if uid_int == inviter_id or uid_int in existing_ids or uid_int not in valid_ids:
+            skipped.append(uid_int)
+            continue
+        existing_ids.add(uid_int)
+        created.append(uid_int)
+    if created:
+        db.session.execute(insert(EventParticipant), [
+            {'event_id': event_id, 'user_id': uid_int, 'status': EVENT_PARTICIPANT_STATUS_PENDING, 'is_admin': False}
+            for uid_int in created
+        ])
+        # Bulk inserts bypass the session flush hooks, so bump the invitees' dashboards explicitly
+        dashboard.bump(db.session.connection(), created)
+    return created, skipped
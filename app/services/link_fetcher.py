@@ -0,0 +1,460 @@
+"""The link preview HTTP client and per-worker fetcher thread.
+
+Split from link_preview so that asyncio, ssl and html.parser are only
+imported where previews are fetched: link_preview.init_app() loads this
+module when LINK_PREVIEW_ENABLED is set, and `flask previews fetch` loads
+it on demand. See link_preview for the limits and the cache table.
+"""
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+import socket
+import ssl
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+from app.services import link_preview
+
+logger = logging.getLogger(__name__)
+
+_MAX_REDIRECTS = 5
+_MAX_HEADERS = 100
+_CURRENCY = re.compile(r'^[A-Z]{3}$')
+
+
+class FetchError(Exception):
+    """A page could not be fetched; the message is stored with the preview."""
+
+
+def _domain(host):
+    host = host.lower().rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+# -------------------------- HTTP client -----------------------------------
+
+class Reply:
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers  # lower-cased name -> last value
+        self.body = body
+
+    @property
+    def content_type(self):
+        return self.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    @property
+    def charset(self):
+        match = re.search(r'charset=["\']?([\w.:-]+)', self.headers.get('content-type', ''), re.I)
+        return match.group(1) if match else None
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections shared by all fetches of one loop."""
+
+    def __init__(self, per_host=2, idle_timeout=30, allow_private=False, user_agent='wishlist-preview'):
+        self.per_host = per_host
+        self.idle_timeout = idle_timeout
+        self.allow_private = allow_private
+        self.user_agent = user_agent
+        self._idle = {}  # (scheme, host, port) -> [_Connection]
+        self._slots = {}  # (scheme, host, port) -> Semaphore
+        self._active = {}  # (scheme, host, port) -> requests holding a slot
+        self._ssl = ssl.create_default_context()
+        self.opened = 0  # connections created, for diagnostics
+
+    async def _resolve(self, host, port):
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        if not infos:
+            raise FetchError(f'cannot resolve {host}')
+        addresses = [info[4][0] for info in infos]
+        if not self.allow_private:
+            for address in addresses:
+                if not ipaddress.ip_address(address.split('%')[0]).is_global:
+                    raise FetchError(f'{host} resolves to a non-public address')
+        return addresses[0]
+
+    async def _open(self, scheme, host, port):
+        # Connect to the checked address so a second DNS answer cannot point elsewhere
+        address = await self._resolve(host, port)
+        tls = dict(ssl=self._ssl, server_hostname=host) if scheme == 'https' else {}
+        reader, writer = await asyncio.open_connection(address, port, **tls)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def _checkout(self, key):
+        idle = self._idle.get(key, [])
+        now = time.monotonic()
+        while idle:
+            connection = idle.pop()
+            if now - connection.idle_since < self.idle_timeout and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        return None
+
+    def _checkin(self, key, connection):
+        connection.idle_since = time.monotonic()
+        self._idle.setdefault(key, []).append(connection)
+
+    async def get(self, url, max_bytes):
+        """GET url once (no redirects); the body is only read for HTML and images are not downloaded."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname.lower(), port)
+        slots = self._slots.setdefault(key, asyncio.Semaphore(self.per_host))
+        self._active[key] = self._active.get(key, 0) + 1
+        try:
+            async with slots:
+                return await self._get(key, parts, port, max_bytes)
+        finally:
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+
+    async def _get(self, key, parts, port, max_bytes):
+        scheme = key[0]
+        connection = self._checkout(key)
+        reused = connection is not None
+        if connection is None:
+            connection = await self._open(scheme, parts.hostname, port)
+        try:
+            try:
+                reply, reusable = await self._request(connection, parts, port, max_bytes)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a new one
+                connection.close()
+                connection = await self._open(scheme, parts.hostname, port)
+                reply, reusable = await self._request(connection, parts, port, max_bytes)
+        except BaseException:
+            connection.close()
+            raise
+        if reusable:
+            self._checkin(key, connection)
+        else:
+            connection.close()
+        return reply
+
+    async def _request(self, connection, parts, port, max_bytes):
+        default_port = 443 if parts.scheme.lower() == 'https' else 80
+        host = parts.hostname if port == default_port else f'{parts.hostname}:{port}'
+        if ':' in parts.hostname:
+            host = f'[{parts.hostname}]' + ('' if port == default_port else f':{port}')
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        head = (f'GET {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {self.user_agent}\r\n'
+                'Accept: text/html,application/xhtml+xml;q=0.9,*/*;q=0.5\r\n'
+                'Accept-Encoding: identity\r\nConnection: keep-alive\r\n\r\n')
+        connection.writer.write(head.encode('latin-1'))
+        await connection.writer.drain()
+        return await _read_reply(connection.reader, parts.geturl(), max_bytes)
+
+    def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+    def prune(self):
+        """Close connections idle longer than idle_timeout."""
+        now = time.monotonic()
+        for key, connections in list(self._idle.items()):
+            keep = []
+            for connection in connections:
+                if now - connection.idle_since < self.idle_timeout:
+                    keep.append(connection)
+                else:
+                    connection.close()
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        for key in list(self._slots):
+            if key not in self._idle and key not in self._active:
+                del self._slots[key]
+
+
+async def _read_reply(reader, url, max_bytes):
+    """Read one response; returns (Reply, whether the connection can be reused)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed before the response')
+    try:
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        status = int(status)
+    except ValueError:
+        raise FetchError('malformed HTTP response')
+    headers = {}
+    for _ in range(_MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise FetchError('too many response headers')
+    reusable = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    reply = Reply(url, status, headers, b'')
+    if status in (204, 304) or 100 <= status < 200:
+        return reply, reusable
+    if status == 200 and reply.content_type not in ('text/html', 'application/xhtml+xml', ''):
+        return reply, False  # not a page: drop the connection instead of draining it
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # trailers
+                break
+            if len(body) + size > max_bytes:
+                body += await reader.readexactly(max_bytes - len(body))
+                reusable = False
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+        reply.body = bytes(body)
+    elif 'content-length' in headers:
+        length = int(headers['content-length'])
+        reply.body = await reader.readexactly(min(length, max_bytes))
+        reusable = reusable and length <= max_bytes
+    else:
+        reply.body = await reader.read(max_bytes)
+        reusable = False
+    return reply, reusable
+
+
+# -------------------------- Metadata extraction ---------------------------
+
+class _MetaParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.title = ''
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'title':
+            self._in_title = not self.title
+        elif tag == 'meta':
+            key = (attrs.get('property') or attrs.get('name') or attrs.get('itemprop') or '').lower()
+            if key and attrs.get('content') and key not in self.meta:
+                self.meta[key] = attrs['content'].strip()
+            if attrs.get('charset'):
+                self.meta.setdefault('charset', attrs['charset'])
+        elif tag == 'link' and (attrs.get('rel') or '').lower() == 'image_src' and attrs.get('href'):
+            self.meta.setdefault('image_src', attrs['href'])
+        elif attrs.get('itemprop') in ('price', 'priceCurrency') and attrs.get('content'):
+            self.meta.setdefault(attrs['itemprop'].lower(), attrs['content'].strip())
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def _first(meta, *keys):
+    for key in keys:
+        if meta.get(key):
+            return meta[key]
+    return None
+
+
+def parse_price(text):
+    """Read '1 299,99' / '1,299.99' / '12.50 zł' as a float, or None."""
+    if not text:
+        return None
+    number = re.sub(r'[^\d.,]', '', text)
+    if ',' in number and '.' in number:
+        # The later separator is the decimal one
+        number = number.replace(',' if number.rfind('.') > number.rfind(',') else '.', '')
+    number = number.replace(',', '.')
+    if number.count('.') > 1:
+        head, _, tail = number.rpartition('.')
+        number = head.replace('.', '') + '.' + tail
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _decode(reply):
+    charset = reply.charset
+    if charset is None:
+        match = re.search(rb'<meta[^>]+charset=["\']?([\w.:-]+)', reply.body[:2048], re.I)
+        charset = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return reply.body.decode(charset, errors='replace')
+    except LookupError:
+        return reply.body.decode('utf-8', errors='replace')
+
+
+def extract(reply):
+    """Preview fields from a fetched page (title, description, image, price, currency)."""
+    if reply.content_type.startswith('image/'):
+        return {'image': reply.url}
+    parser = _MetaParser()
+    try:
+        parser.feed(_decode(reply))
+        parser.close()
+    except Exception:  # broken markup: keep whatever was read
+        logger.debug('could not parse %s', reply.url, exc_info=True)
+    meta = parser.meta
+    image = _first(meta, 'og:image', 'og:image:url', 'og:image:secure_url', 'twitter:image', 'image_src')
+    currency = (_first(meta, 'product:price:currency', 'og:price:currency', 'pricecurrency') or '').upper()
+    return {
+        'title': _first(meta, 'og:title', 'twitter:title') or ' '.join(parser.title.split()) or None,
+        'description': _first(meta, 'og:description', 'twitter:description', 'description'),
+        'image': urljoin(reply.url, image) if image else None,
+        'price': parse_price(_first(meta, 'product:price:amount', 'og:price:amount', 'price')),
+        'currency': currency if _CURRENCY.match(currency) else None,
+    }
+
+
+# -------------------------- Fetcher ---------------------------------------
+
+class Fetcher:
+    """Fetch previews on the running loop with shared limits.
+
+    Create it inside the loop that uses it; close() releases the pool.
+    """
+
+    def __init__(self, concurrency=8, per_host=2, domain_interval=1.0, timeout=10.0, max_bytes=512 * 1024,
+                 allow_private=False, user_agent='wishlist-preview'):
+        self.pool = ConnectionPool(per_host, allow_private=allow_private, user_agent=user_agent)
+        self.domain_interval = domain_interval
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._slots = asyncio.Semaphore(concurrency)
+        self._next_start = {}  # domain -> loop time the next request may start
+
+    async def _wait_for_domain(self, domain):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if len(self._next_start) > 1000:
+            self._next_start = {d: t for d, t in self._next_start.items() if t > now}
+        start = max(now, self._next_start.get(domain, now))
+        self._next_start[domain] = start + self.domain_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _follow(self, url):
+        for _ in range(_MAX_REDIRECTS + 1):
+            # Wait for the domain's turn without holding a slot or running down the timeout
+            await self._wait_for_domain(_domain(urlsplit(url).hostname))
+            async with self._slots:
+                reply = await asyncio.wait_for(self.pool.get(url, self.max_bytes), self.timeout)
+            location = reply.headers.get('location')
+            if reply.status in (301, 302, 303, 307, 308) and location:
+                url = link_preview.normalize(urljoin(url, location))
+                if url is None:
+                    raise FetchError('redirect to an unsupported URL')
+                continue
+            return reply
+        raise FetchError('too many redirects')
+
+    async def fetch(self, url):
+        """Return a preview dict for url; failures are returned with status 'error'."""
+        preview = {'url': url, 'domain': _domain(urlsplit(url).hostname)}
+        try:
+            reply = await self._follow(url)
+        except asyncio.TimeoutError:
+            return dict(preview, status='error', error='timed out')
+        except (FetchError, OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            return dict(preview, status='error', error=str(exc) or type(exc).__name__)
+        preview['http_status'] = reply.status
+        if reply.status >= 400:
+            return dict(preview, status='error', error=f'HTTP {reply.status}')
+        return dict(preview, status='ok', **extract(reply))
+
+    async def fetch_many(self, urls):
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def close(self):
+        self.pool.close()
+
+
+# -------------------------- Background worker -----------------------------
+
+class Worker:
+    """Owns the fetcher loop thread of one process."""
+
+    def __init__(self, engine, settings):
+        self.engine = engine
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._fetcher = None
+        self._pending = set()  # URLs queued or being fetched; touched only on the loop
+
+    def submit(self, urls):
+        loop = self._ensure_loop()
+        for url in urls:
+            loop.call_soon_threadsafe(self._schedule, url)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # First use in this process (gunicorn forks after create_app)
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run, name='link-preview', daemon=True).start()
+            return self._loop
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        s = self.settings
+        self._fetcher = Fetcher(s['concurrency'], s['per_host'], s['domain_interval'], s['timeout'],
+                                s['max_bytes'], s['allow_private'], s['user_agent'])
+        self._loop.call_later(30, self._prune)
+        self._loop.run_forever()
+
+    def _prune(self):
+        self._fetcher.pool.prune()
+        self._loop.call_later(30, self._prune)
+
+    def _schedule(self, url):
+        if url in self._pending:
+            return
+        if len(self._pending) >= self.settings['queue_size']:
+            logger.warning('link preview queue full, dropping %s', url)
+            return
+        self._pending.add(url)
+        self._loop.create_task(self._process(url))
+
+    async def _process(self, url):
+        try:
+            if await asyncio.to_thread(link_preview.fresh_urls, self.engine, [url]):
+                return
+            preview = await self._fetcher.fetch(url)
+            await asyncio.to_thread(self._store, preview)
+        except Exception:
+            logger.exception('link preview for %s failed', url)
+        finally:
+            self._pending.discard(url)
+
+    def _store(self, preview):
+        with self.engine.begin() as connection:
+            link_preview.store(connection, [preview], self.settings['ttl'], self.settings['error_ttl'])
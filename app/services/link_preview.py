@@ -0,0 +1,200 @@
+"""Background link previews (title, image, price hints) for WishlistItem.link.
+
+With LINK_PREVIEW_ENABLED (off by default), committing an item whose link
+is new or changed hands the URL to a per-worker fetcher thread
+(after_commit hook; bulk importers register their links with
+enqueue_on_commit()). The request only schedules the work: enqueue() never
+waits and drops URLs once LINK_PREVIEW_QUEUE_SIZE are pending.
+
+The fetcher (link_fetcher, only imported when LINK_PREVIEW_ENABLED is set)
+runs an asyncio loop with a small HTTP/1.1 client on asyncio streams, so no
+extra dependency is needed:
+
+* connections are kept alive and reused per (scheme, host, port), at most
+  LINK_PREVIEW_PER_HOST at a time, and closed after idling;
+* at most LINK_PREVIEW_CONCURRENCY requests run at once, each limited to
+  LINK_PREVIEW_TIMEOUT seconds, and requests to one domain start at least
+  LINK_PREVIEW_DOMAIN_INTERVAL seconds apart (waiting for that holds no slot);
+* bodies are read up to LINK_PREVIEW_MAX_BYTES, only for HTML responses;
+* hosts resolving to private, loopback or link-local addresses are refused
+  unless LINK_PREVIEW_ALLOW_PRIVATE is set (e.g. for a local stub server).
+
+Results, including failures, are stored in the link_preview table and are
+fresh for LINK_PREVIEW_TTL (LINK_PREVIEW_ERROR_TTL for failures); a fresh
+row is never fetched again, which also keeps gunicorn workers from
+repeating each other's work. Stale rows are still served and refreshed in
+the background when read.
+
+`flask previews fetch URL...` runs the same fetcher in the foreground.
+"""
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from urllib.parse import urlsplit
+
+from flask import current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from app.models.models import LinkPreview
+from app.models.models import WishlistItem
+
+_EXTENSION_KEY = 'link_preview'
+_PENDING_KEY = 'link_preview_urls'
+MAX_LOOKUP = 100  # URLs per previews() request
+_LENGTHS = {'title': 256, 'description': 512, 'image': 512, 'error': 256}
+
+
+def normalize(url):
+    """Return url if it is an absolute http(s) link worth previewing, else None."""
+    if not isinstance(url, str):
+        return None
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname or len(url) > 256:
+        return None
+    return url
+
+
+# -------------------------- Cache table -----------------------------------
+
+def _clip(preview):
+    return {key: value[:_LENGTHS[key]] if key in _LENGTHS and isinstance(value, str) else value
+            for key, value in preview.items()}
+
+
+def store(connection, previews, ttl, error_ttl):
+    """Insert or replace previews in the link_preview table."""
+    now = datetime.now(timezone.utc)
+    table = LinkPreview.__table__
+    columns = {'title': None, 'description': None, 'image': None, 'price': None, 'currency': None,
+               'http_status': None, 'error': None}
+    rows = [dict(columns, **_clip(preview), fetched_at=now,
+                 expires_at=now + timedelta(seconds=ttl if preview['status'] == 'ok' else error_ttl))
+            for preview in previews]
+    if not rows:
+        return
+    if connection.dialect.name == 'sqlite':
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.url],
+            set_={name: statement.excluded[name] for name in rows[0] if name != 'url'})
+        connection.execute(statement, rows)
+    else:
+        # Portable fallback: replace the rows
+        connection.execute(table.delete().where(table.c.url.in_([row['url'] for row in rows])))
+        connection.execute(table.insert(), rows)
+
+
+def fresh_urls(engine, urls):
+    table = LinkPreview.__table__
+    with engine.connect() as connection:
+        return set(connection.execute(select(table.c.url).where(
+            table.c.url.in_(list(urls)), table.c.expires_at > datetime.now(timezone.utc))).scalars())
+
+
+def _as_dict(row):
+    return {'url': row.url, 'title': row.title, 'description': row.description, 'image': row.image,
+            'price': row.price, 'currency': row.currency}
+
+
+def previews(urls):
+    """Cached previews for urls as {url: dict}, stale ones included and queued for refresh.
+
+    Only URLs that were previewed before are refreshed; new URLs are fetched
+    when an item with that link is saved.
+    """
+    urls = {url for url in (normalize(u) for u in urls) if url}
+    if not urls:
+        return {}
+    now = datetime.now(timezone.utc)
+    rows = db.session.execute(select(LinkPreview).where(LinkPreview.url.in_(urls))).scalars().all()
+    enqueue(row.url for row in rows if _aware(row.expires_at) <= now)
+    return {row.url: _as_dict(row) for row in rows if row.status == 'ok'}
+
+
+def _aware(value):
+    # SQLite returns naive datetimes for the UTC values stored
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def settings(config):
+    return {
+        'concurrency': config['LINK_PREVIEW_CONCURRENCY'],
+        'per_host': config['LINK_PREVIEW_PER_HOST'],
+        'domain_interval': config['LINK_PREVIEW_DOMAIN_INTERVAL'],
+        'timeout': config['LINK_PREVIEW_TIMEOUT'],
+        'max_bytes': config['LINK_PREVIEW_MAX_BYTES'],
+        'allow_private': config['LINK_PREVIEW_ALLOW_PRIVATE'],
+        'user_agent': config['LINK_PREVIEW_USER_AGENT'],
+        'queue_size': config['LINK_PREVIEW_QUEUE_SIZE'],
+        'ttl': config['LINK_PREVIEW_TTL'],
+        'error_ttl': config['LINK_PREVIEW_ERROR_TTL'],
+    }
+
+
+def enqueue(urls):
+    """Queue previews for urls in the background; never blocks the caller."""
+    worker = current_app.extensions.get(_EXTENSION_KEY)
+    if worker is None:  # LINK_PREVIEW_ENABLED is off
+        return
+    urls = {url for url in (normalize(u) for u in urls) if url}
+    if urls:
+        worker.submit(urls)
+
+
+def enqueue_on_commit(session, urls):
+    """Queue urls once session commits; for writers that bypass the ORM flush."""
+    session.info.setdefault(_PENDING_KEY, set()).update(url for url in urls if url)
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _collect_links(session, flush_context):
+    links = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, WishlistItem) and obj.link:
+            links.add(obj.link)
+    for obj in session.dirty:
+        if isinstance(obj, WishlistItem) and obj.link:
+            if inspect(obj).attrs.link.history.has_changes():
+                links.add(obj.link)
+
+
+def _enqueue_after_commit(session):
+    links = session.info.pop(_PENDING_KEY, None)
+    if links:
+        enqueue(links)
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    app.config.setdefault('LINK_PREVIEW_ENABLED', False)
+    app.config.setdefault('LINK_PREVIEW_CONCURRENCY', 8)
+    app.config.setdefault('LINK_PREVIEW_PER_HOST', 2)
+    app.config.setdefault('LINK_PREVIEW_DOMAIN_INTERVAL', 1.0)
+    app.config.setdefault('LINK_PREVIEW_TIMEOUT', 10.0)
+    app.config.setdefault('LINK_PREVIEW_MAX_BYTES', 512 * 1024)
+    app.config.setdefault('LINK_PREVIEW_ALLOW_PRIVATE', False)
+    app.config.setdefault('LINK_PREVIEW_USER_AGENT', 'Mozilla/5.0 (compatible; wishlist-preview/1.0)')
+    app.config.setdefault('LINK_PREVIEW_QUEUE_SIZE', 1000)
+    app.config.setdefault('LINK_PREVIEW_TTL', 7 * 86400)
+    app.config.setdefault('LINK_PREVIEW_ERROR_TTL', 3600)
+    if not app.config['LINK_PREVIEW_ENABLED']:
+        return
+    from app.services import link_fetcher
+    with app.app_context():
+        app.extensions[_EXTENSION_KEY] = link_fetcher.Worker(db.engine, settings(app.config))
+    if not sa_event.contains(db.session, 'after_flush', _collect_links):
+        sa_event.listen(db.session, 'after_flush', _collect_links)
+        sa_event.listen(db.session, 'after_commit', _enqueue_after_commit)
+        sa_event.listen(db.session, 'after_rollback', _discard_pending)
@@ -0,0 +1,371 @@
+"""Per-endpoint request metrics in Prometheus text format at /metrics.
+
+When METRICS_ENABLED is set, request hooks record latency and response size
+histograms plus request counts per endpoint, engine hooks count SQL
+statements and their time per endpoint, and template signals time every
+render. /metrics serves the totals, optionally guarded by METRICS_TOKEN
+(sent as a bearer token).
+
+Each worker keeps its numbers in memory. With METRICS_DIR set (multi-worker
+gunicorn), a background thread in each worker also writes a snapshot to
+METRICS_DIR/worker-<pid>.json every METRICS_FLUSH_INTERVAL seconds and
+whichever worker answers a scrape merges all snapshots. Counters of workers that exited are folded into
+an archive file so totals never go backwards; gunicorn.conf.py empties the
+directory when the master starts.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response
+from flask import abort
+from flask import before_render_template
+from flask import current_app
+from flask import g
+from flask import has_request_context
+from flask import request
+from flask import template_rendered
+from sqlalchemy import event as sa_event
+
+from app import db
+from app.services import dashboard
+from app.services import page_cache
+from app.services import user_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (type, help, buckets for histograms)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'Time to build the response, by endpoint.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Response body size when known up front, by endpoint.', SIZE_BUCKETS),
+    'sql_statements_total': ('counter', 'SQL statements executed while serving an endpoint.', None),
+    'sql_duration_seconds_total': ('counter', 'Time spent executing SQL while serving an endpoint.', None),
+    'template_render_seconds': ('histogram', 'Jinja template render time, by template.', LATENCY_BUCKETS),
+    'cache_hits_total': ('counter', 'Per-worker cache hits.', None),
+    'cache_misses_total': ('counter', 'Per-worker cache misses.', None),
+    'cache_entries': ('gauge', 'Entries currently held in per-worker caches.', None),
+}
+
+_CACHES = {'dashboard': dashboard.stats, 'user': user_cache.stats, 'page': page_cache.stats}
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by (name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self.histograms.items()],
+            }
+
+
+_registry = Registry()
+
+
+def _cache_gauges():
+    counters, gauges = [], []
+    for cache, stats in _CACHES.items():
+        values = stats()
+        labels = [['cache', cache]]
+        counters.append(['cache_hits_total', labels, values['hits']])
+        counters.append(['cache_misses_total', labels, values['misses']])
+        gauges.append(['cache_entries', labels, values['size']])
+    return counters, gauges
+
+
+def worker_snapshot():
+    snapshot = _registry.snapshot()
+    counters, gauges = _cache_gauges()
+    snapshot['counters'].extend(counters)
+    snapshot['gauges'] = gauges
+    return snapshot
+
+
+def merge(snapshots):
+    """Sum counters, histograms and gauges of several snapshots."""
+    counters = defaultdict(float)
+    histograms = {}
+    gauges = defaultdict(float)
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get('counters', []):
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, value in snapshot.get('gauges', []):
+            gauges[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, state in snapshot.get('histograms', []):
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], state)]
+            else:
+                histograms[key] = list(state)
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), state] for (name, labels), state in histograms.items()],
+        'gauges': [[name, list(labels), value] for (name, labels), value in gauges.items()],
+    }
+
+
+# -------------------------- Prometheus text format ------------------------
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(snapshot):
+    by_name = defaultdict(list)
+    for kind in ('counters', 'gauges'):
+        for name, labels, value in sorted(snapshot.get(kind, [])):
+            by_name[name].append(f'{name}{_labels(labels)} {_format_value(value)}')
+    for name, labels, state in sorted(snapshot.get('histograms', [])):
+        buckets = METRICS[name][2]
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ['+Inf'], state[:-1]):
+            cumulative += count
+            by_name[name].append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+        by_name[name].append(f'{name}_sum{_labels(labels)} {_format_value(state[-1])}')
+        by_name[name].append(f'{name}_count{_labels(labels)} {cumulative}')
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text, _ = METRICS[name]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(by_name[name])
+    return '\n'.join(lines) + '\n'
+
+
+# -------------------------- Multi-worker snapshots ------------------------
+
+def _worker_path(directory, pid):
+    return os.path.join(directory, f'worker-{pid}.json')
+
+
+def _write_json(path, payload):
+    tmp = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(directory):
+    _write_json(_worker_path(directory, os.getpid()), worker_snapshot())
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fold_into_archive(directory, paths):
+    """Add the counters and histograms of exited workers to the archive file."""
+    archive_path = os.path.join(directory, 'archive.json')
+    with open(os.path.join(directory, 'archive.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = [s for s in map(_read_json, paths) if s]
+        archive = _read_json(archive_path) or {}
+        merged = merge([archive] + [dict(s, gauges=[]) for s in snapshots])
+        merged['gauges'] = []
+        _write_json(archive_path, merged)
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def retire(app):
+    """Called from gunicorn's worker_exit hook in the exiting worker."""
+    directory = app.config.get('METRICS_DIR')
+    if app.config.get('METRICS_ENABLED') and directory:
+        flush(directory)
+        _fold_into_archive(directory, [_worker_path(directory, os.getpid())])
+
+
+def reset_directory(app):
+    """Start a fresh metrics directory (gunicorn master, before forking)."""
+    directory = app.config.get('METRICS_DIR')
+    if not (app.config.get('METRICS_ENABLED') and directory):
+        return
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """Merged snapshot of every worker (or just this one without METRICS_DIR)."""
+    directory = current_app.config.get('METRICS_DIR')
+    if not directory:
+        return worker_snapshot()
+    flush(directory)
+    snapshots, dead = [], []
+    for name in os.listdir(directory):
+        if not (name.startswith('worker-') and name.endswith('.json')):
+            continue
+        path = os.path.join(directory, name)
+        pid = int(name[len('worker-'):-len('.json')])
+        if pid != os.getpid() and not _pid_alive(pid):
+            dead.append(path)
+            continue
+        snapshot = _read_json(path)
+        if snapshot:
+            snapshots.append(snapshot)
+    if dead:
+        _fold_into_archive(directory, dead)
+    archive = _read_json(os.path.join(directory, 'archive.json'))
+    return merge(snapshots + ([archive] if archive else []))
+
+
+# -------------------------- Hooks -----------------------------------------
+
+def _before_request():
+    g._metrics = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0}
+
+
+def _after_request(response):
+    state = g.pop('_metrics', None)
+    if state is None or request.endpoint == 'metrics':
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    labels = {'endpoint': endpoint}
+    _registry.inc('http_requests_total', {'endpoint': endpoint, 'method': request.method,
+                                          'status': str(response.status_code)})
+    _registry.observe('http_request_duration_seconds', labels, time.perf_counter() - state['start'])
+    if response.content_length is not None:
+        _registry.observe('http_response_size_bytes', labels, response.content_length)
+    if state['sql_count']:
+        _registry.inc('sql_statements_total', labels, state['sql_count'])
+        _registry.inc('sql_duration_seconds_total', labels, state['sql_time'])
+    directory = current_app.config.get('METRICS_DIR')
+    if directory and _flusher_pid != os.getpid():
+        _start_flusher(directory, current_app.config['METRICS_FLUSH_INTERVAL'])
+    return response
+
+
+_flusher_pid = None
+
+
+def _start_flusher(directory, interval):
+    """Write this worker's snapshot every interval seconds, even while it is idle."""
+    global _flusher_pid
+    with _registry._lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush(directory)
+            except OSError:
+                pass
+    threading.Thread(target=run, name='metrics-flusher', daemon=True).start()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context():
+        state = g.get('_metrics')
+        if state is not None:
+            state['sql_count'] += 1
+            state['sql_time'] += elapsed
+
+
+def _template_started(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('_metrics_templates', []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    if has_request_context():
+        started = g.get('_metrics_templates')
+        if started:
+            _registry.observe('template_render_seconds', {'template': template.name or 'string'},
+                              time.perf_counter() - started.pop())
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(403)
+    return Response(render(collect()), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.config.setdefault('METRICS_ENABLED', False)
+    app.config.setdefault('METRICS_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+    app.config.setdefault('METRICS_TOKEN', None)
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        sa_event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        sa_event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
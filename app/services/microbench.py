@@ -0,0 +1,291 @@
+"""Before/after micro-benchmarks behind `flask perf micro`.
+
+Route benchmarks (`flask perf bench`) show what a request costs today. These
+time one optimised code path against a copy of the implementation it
+replaced, over a range of input sizes, so a claimed gain can be re-measured
+on any machine and database:
+
+* ``invitations`` – confirm_invitations resolving and inserting N invitees
+  (one lookup pair per id before, chunked IN queries and one INSERT after);
+* ``drawing`` – assigning recipients to N participants (shuffle until no one
+  draws themselves, up to 50 attempts, before; one Sattolo cycle after);
+* ``login`` – N concurrent password checks (werkzeug defaults inline in the
+  request thread before; the passwords service as configured after, so run
+  it with PASSWORD_HASH_WORKERS / PASSWORD_HASH_METHOD set as in production);
+* ``serialization`` – a JSON response for a wishlist of N items (ORM objects
+  and jsonify before; projected columns and orjson after).
+
+Database benchmarks create their rows inside the session transaction and roll
+it back after every repetition, so nothing is left behind. Results use the
+`flask perf bench` format, one scenario per '<benchmark> n=<size> <variant>',
+so save() and compare() work on them as well.
+"""
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timezone
+
+from flask import current_app
+from flask import jsonify
+from sqlalchemy import insert
+from werkzeug.security import check_password_hash
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import EVENT_PARTICIPANT_STATUS_PENDING
+from app.models.models import Event
+from app.models.models import EventParticipant
+from app.models.models import User
+from app.models.models import WishlistItem
+from app.services import benchmark
+from app.services import drawing
+from app.services import invitations
+from app.services import passwords
+from app.services import serialization
+
+VARIANTS = ('before', 'after')
+_EMAIL_DOMAIN = 'microbench.invalid'
+_PASSWORD = 'correct horse battery staple'
+
+
+class Micro:
+    """One before/after pair.
+
+    setup(size) runs untimed and returns the fixture both variants are called
+    with; a variant returns False when it failed to produce a result.
+    per_unit names what size counts (reported as <per_unit>/s).
+    """
+
+    def __init__(self, name, sizes, setup, before, after, per_unit, database=False):
+        self.name = name
+        self.sizes = sizes
+        self.setup = setup
+        self.before = before
+        self.after = after
+        self.per_unit = per_unit
+        self.database = database
+
+    def run(self, variant, size, repeat, counter=None):
+        fn = getattr(self, variant)
+        samples = []
+        for _ in range(repeat):
+            fixture = self.setup(size)
+            try:
+                if counter is not None:
+                    counter.reset()
+                started = time.perf_counter()
+                ok = fn(fixture)
+                elapsed = time.perf_counter() - started
+            finally:
+                if self.database:
+                    db.session.rollback()
+            statements = counter.count if counter is not None else None
+            samples.append((elapsed, statements, 500 if ok is False else 200))
+        stats = benchmark.summarize(samples, 1)
+        stats['size'] = size
+        stats['per_second'] = round(size * 1000 / stats['mean_ms'], 1) if stats['mean_ms'] else None
+        return stats
+
+
+# -------------------------- Fixtures --------------------------------------
+
+def _insert_users(count, prefix):
+    rows = [{
+        'email': f'{prefix}{n}@{_EMAIL_DOMAIN}',
+        'nickname': f'{prefix}{n}',
+        'nickname_key': f'{prefix}{n}',
+        'password_hash': '-',
+    } for n in range(count)]
+    result = db.session.execute(insert(User).returning(User.id, sort_by_parameter_order=True), rows)
+    return [row.id for row in result]
+
+
+def _event_with_candidates(size):
+    """(event_id, admin_id, candidate user ids), inside the open transaction."""
+    admin_id, *user_ids = _insert_users(size + 1, 'micro')
+    event_id = db.session.execute(
+        insert(Event).returning(Event.id), {'name': 'Micro-benchmark', 'admin_user_id': admin_id}).scalar_one()
+    db.session.execute(insert(EventParticipant), {
+        'event_id': event_id, 'user_id': admin_id, 'status': EVENT_PARTICIPANT_STATUS_ACCEPTED, 'is_admin': True})
+    return event_id, admin_id, user_ids
+
+
+# -------------------------- Invitations -----------------------------------
+
+def _invite_one_by_one(fixture):
+    # The confirm_invitations loop as it was before set-based resolution
+    event_id, inviter_id, user_ids = fixture
+    created = []
+    skipped = []
+    for uid in user_ids:
+        if uid == inviter_id:
+            skipped.append(uid)
+            continue
+        existing = EventParticipant.query.filter_by(event_id=event_id, user_id=uid).first()
+        if existing:
+            skipped.append(uid)
+            continue
+        user_obj = db.session.get(User, uid)
+        if not user_obj:
+            skipped.append(uid)
+            continue
+        part = EventParticipant()
+        part.event_id = event_id
+        part.user_id = uid
+        part.status = EVENT_PARTICIPANT_STATUS_PENDING
+        part.is_admin = False
+        db.session.add(part)
+        created.append(uid)
+    db.session.flush()
+    return len(created) == len(user_ids)
+
+
+def _invite_in_bulk(fixture):
+    event_id, inviter_id, user_ids = fixture
+    created, _ = invitations.invite(event_id, inviter_id, user_ids)
+    return len(created) == len(user_ids)
+
+
+# -------------------------- Drawing ---------------------------------------
+
+def _participant_ids(size):
+    return list(range(1, size + 1))
+
+
+def _shuffle_until_deranged(user_ids):
+    # enable_drawing before the single-cycle construction; it gave up after 50 attempts
+    for _ in range(50):
+        perm = user_ids[:]
+        random.shuffle(perm)
+        if all(uid != perm[i] for i, uid in enumerate(user_ids)):
+            return dict(zip(user_ids, perm))
+    return False
+
+
+def _single_cycle(user_ids):
+    return drawing.assign_recipients(user_ids)
+
+
+# -------------------------- Login -----------------------------------------
+
+_hashes = {}
+
+
+def _concurrent_logins(size):
+    """(app, concurrency, before hash, after hash); hashes are made once per method."""
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _hashes:
+        _hashes[method] = passwords.hash_password(_PASSWORD)
+    if None not in _hashes:
+        _hashes[None] = generate_password_hash(_PASSWORD)  # werkzeug's default, as register used it
+    return current_app._get_current_object(), size, _hashes[None], _hashes[method]
+
+
+def _verify_concurrently(app, size, check):
+    def login():
+        with app.app_context():
+            return check()
+
+    with ThreadPoolExecutor(max_workers=size) as pool:
+        return all(pool.map(lambda _: login(), range(size)))
+
+
+def _check_inline(fixture):
+    app, size, pw_hash, _ = fixture
+    return _verify_concurrently(app, size, lambda: check_password_hash(pw_hash, _PASSWORD))
+
+
+def _check_through_service(fixture):
+    app, size, _, pw_hash = fixture
+    return _verify_concurrently(app, size, lambda: passwords.verify_password(pw_hash, _PASSWORD))
+
+
+# -------------------------- Serialization ---------------------------------
+
+def _user_with_items(size):
+    [user_id] = _insert_users(1, 'microitems')
+    db.session.execute(insert(WishlistItem), [{
+        'user_id': user_id, 'name': f'Item {n}', 'price': 10 + n % 500, 'currency': 'PLN', 'price_base': 10 + n % 500,
+        'details': 'Size M, any colour' if n % 3 == 0 else None, 'link': f'https://shop.example.com/{n}',
+    } for n in range(size)])
+    return user_id
+
+
+def _jsonify_orm_items(user_id):
+    # get_wishlist before column projection
+    items = WishlistItem.query.filter_by(user_id=user_id).all()
+    return bool(jsonify([{
+        'id': item.id,
+        'name': item.name,
+        'price': item.price,
+        'currency': item.currency,
+        'details': item.details,
+        'event': item.event,
+        'link': item.link
+    } for item in items]).get_data())
+
+
+def _serialize_projected_items(user_id):
+    query = serialization.project_items(WishlistItem.query.filter_by(user_id=user_id))
+    return bool(serialization.items_response(query).get_data())
+
+
+BENCHMARKS = {micro.name: micro for micro in (
+    Micro('invitations', (10, 100, 1000, 2500), _event_with_candidates, _invite_one_by_one, _invite_in_bulk,
+          'invitees', database=True),
+    Micro('drawing', (2, 10, 100, 1000, 10_000, 100_000), _participant_ids, _shuffle_until_deranged,
+          _single_cycle, 'participants'),
+    Micro('login', (1, 4, 16), _concurrent_logins, _check_inline, _check_through_service, 'logins'),
+    Micro('serialization', (100, 1000, 10_000), _user_with_items, _jsonify_orm_items, _serialize_projected_items,
+          'items', database=True),
+)}
+
+
+# -------------------------- Runner ----------------------------------------
+
+def run(names=(), sizes=None, repeat=5, progress=None):
+    """Run the named benchmarks (all by default) and return a result document.
+
+    sizes overrides every benchmark's default sizes. Raises KeyError for an
+    unknown name.
+    """
+    app = current_app._get_current_object()
+    micros = [BENCHMARKS[name] for name in names] if names else list(BENCHMARKS.values())
+    results = {}
+    with benchmark.StatementCounter(db.engine) as counter:
+        for micro in micros:
+            for size in sizes or micro.sizes:
+                for variant in VARIANTS:
+                    stats = micro.run(variant, size, repeat, counter if micro.database else None)
+                    stats.update(benchmark=micro.name, variant=variant, per_unit=micro.per_unit)
+                    name = f'{micro.name} n={size} {variant}'
+                    results[name] = stats
+                    if progress:
+                        progress(name, stats)
+    meta = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'driver': 'micro',
+        'repeat': repeat,
+        'python': sys.version.split()[0],
+        'database': db.engine.url.get_backend_name(),
+    }
+    meta.update(benchmark.git_revision(os.path.dirname(app.root_path)))
+    return {'meta': meta, 'scenarios': results, 'mixed': None}
+
+
+def speedups(result):
+    """Rows of (benchmark, size, before p50 ms, after p50 ms, before/after ratio)."""
+    rows = []
+    for name, after in result['scenarios'].items():
+        if after.get('variant') != 'after':
+            continue
+        before = result['scenarios'].get(name[:-len('after')] + 'before')
+        if before is None:
+            continue
+        ratio = round(before['p50_ms'] / after['p50_ms'], 1) if after['p50_ms'] else None
+        rows.append((after['benchmark'], after['size'], before['p50_ms'], after['p50_ms'], ratio))
+    return rows
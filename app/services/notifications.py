@@ -0,0 +1,298 @@
+"""Server-sent event notifications for event pages and the dashboard.
+
+The events blueprint publishes a small message after each committed change
+(invitation, acceptance, drawing enabled/reset, archive) to the channel of
+the affected user ('user:<id>') or event ('event:<id>'). Pages keep one
+EventSource on stream() open and update themselves when something they show
+has changed, instead of being reloaded by hand to find out.
+
+Messages go through a broker selected with NOTIFICATIONS_BACKEND:
+
+* 'local' fans them out inside the process. That covers the development
+  server and single-worker deployments; a message published by one gunicorn
+  worker never reaches streams held by another.
+* 'database' stores each message in the notification table. One thread per
+  worker polls for new rows every NOTIFICATIONS_POLL_INTERVAL seconds while
+  the worker has open streams and fans them out locally, so every worker and
+  host sharing the database sees every message. Rows older than
+  NOTIFICATIONS_RETENTION seconds are purged.
+* 'package.module:factory' is called with the app to build any other broker
+  (e.g. on Redis pub/sub); it needs publish(channels, message) and
+  subscribe(channels) returning a Subscription.
+
+Each open stream holds a server thread, so a worker serves at most
+NOTIFICATIONS_MAX_STREAMS of them (the route answers 503 beyond that) and
+closes each after NOTIFICATIONS_STREAM_TIMEOUT seconds; browsers reconnect.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from flask import Response
+from flask import current_app
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.utils import import_string
+
+from app import db
+from app.models.models import Notification
+from app.services import serialization
+
+logger = logging.getLogger(__name__)
+
+_EXTENSION_KEY = 'notifications'
+_PURGE_INTERVAL = 60
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def event_channel(event_id):
+    return f'event:{event_id}'
+
+
+class Subscription:
+    """Messages for a set of channels, buffered for one stream.
+
+    A subscriber that falls queue_size messages behind is marked overflowed
+    and should resynchronise (reload) rather than silently miss updates.
+    """
+
+    def __init__(self, broker, channels, queue_size):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.overflowed = False
+        self._queue = queue.Queue(queue_size)
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next message, or None after timeout seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub: publish() hands the message to every subscriber's queue."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # channel -> {Subscription}
+
+    def publish(self, channels, message):
+        for channel in channels:
+            self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class DatabaseBroker(LocalBroker):
+    """Messages stored in the notification table and polled by every worker."""
+
+    def __init__(self, engine, queue_size=100, poll_interval=1.0, retention=600):
+        super().__init__(queue_size)
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._table = Notification.__table__
+        self._last_id = None  # newest row delivered; None while nobody listens
+        self._poller_pid = None
+        self._last_purge = 0.0
+
+    def publish(self, channels, message):
+        # Delivered by the pollers, including this worker's, so nothing is sent twice
+        payload = serialization.dumps(message).decode()
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as connection:
+            connection.execute(insert(self._table), [
+                {'channel': channel, 'payload': payload, 'created_at': now} for channel in channels])
+
+    def _newest_id(self):
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.max(self._table.c.id))).scalar() or 0
+
+    def subscribe(self, channels):
+        # Start from the newest row so a new stream is not replayed old messages
+        start = self._newest_id() if self._last_id is None else None
+        subscription = super().subscribe(channels)
+        with self._lock:
+            if self._last_id is None:
+                self._last_id = start if start is not None else self._newest_id()
+        self._start_poller()
+        return subscription
+
+    def _start_poller(self):
+        with self._lock:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()  # a forked worker starts its own
+        threading.Thread(target=self._run, name='notifications-poller', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except SQLAlchemyError:
+                logger.exception('notification poll failed')
+
+    def poll(self):
+        """Deliver rows published since the last poll; returns how many."""
+        with self._lock:
+            if not self._subscribers:
+                self._last_id = None
+            last_id = self._last_id
+        if last_id is None:
+            return 0
+        table = self._table
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(table.c.id, table.c.channel, table.c.payload)
+                                      .where(table.c.id > last_id)
+                                      .order_by(table.c.id)
+                                      .limit(1000)).all()
+        for row in rows:
+            self.deliver(row.channel, json.loads(row.payload))
+            self._last_id = row.id
+        if time.monotonic() - self._last_purge > _PURGE_INTERVAL:
+            self._last_purge = time.monotonic()
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+            with self.engine.begin() as connection:
+                connection.execute(delete(table).where(table.c.created_at < cutoff))
+        return len(rows)
+
+
+class _State:
+    def __init__(self, broker, max_streams):
+        self.broker = broker
+        self.slots = threading.BoundedSemaphore(max_streams)
+
+
+def _state():
+    return current_app.extensions[_EXTENSION_KEY]
+
+
+def broker():
+    return _state().broker
+
+
+def publish(channels, kind, **data):
+    """Send a `kind` message with data to each channel.
+
+    Call after the change is committed. Delivery is best effort: a broker
+    failure is logged and never fails the request that made the change.
+    """
+    channels = [channels] if isinstance(channels, str) else list(channels)
+    if not channels:
+        return
+    try:
+        broker().publish(channels, dict(data, type=kind))
+    except Exception:  # the change itself is already committed
+        logger.exception('could not publish %s to %s', kind, ', '.join(channels))
+
+
+def _format(kind, message):
+    return f'event: {kind}\ndata: {serialization.dumps(message).decode()}\n\n'
+
+
+def stream(channels):
+    """Return a text/event-stream Response for channels, or None if the worker is at its stream limit."""
+    state = _state()
+    config = current_app.config
+    if not state.slots.acquire(blocking=False):
+        return None
+    try:
+        subscription = state.broker.subscribe(channels)
+    except Exception:
+        state.slots.release()
+        raise
+    keepalive = config['NOTIFICATIONS_KEEPALIVE']
+    deadline = time.monotonic() + config['NOTIFICATIONS_STREAM_TIMEOUT']
+    retry_ms = int(config['NOTIFICATIONS_RETRY'] * 1000)
+
+    def generate():
+        try:
+            yield f'retry: {retry_ms}\n\n'
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = subscription.get(min(keepalive, remaining))
+                if subscription.overflowed:
+                    yield _format('resync', {})
+                    return
+                if message is None:
+                    # Comment line: keeps proxies from timing the stream out and detects gone clients
+                    yield ': keepalive\n\n'
+                else:
+                    yield _format(message['type'], message)
+        finally:
+            subscription.close()
+            state.slots.release()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('NOTIFICATIONS_BACKEND', 'local')
+    app.config.setdefault('NOTIFICATIONS_MAX_STREAMS', 16)
+    app.config.setdefault('NOTIFICATIONS_QUEUE_SIZE', 100)
+    app.config.setdefault('NOTIFICATIONS_KEEPALIVE', 15)
+    app.config.setdefault('NOTIFICATIONS_STREAM_TIMEOUT', 300)
+    app.config.setdefault('NOTIFICATIONS_RETRY', 5)
+    app.config.setdefault('NOTIFICATIONS_POLL_INTERVAL', 1.0)
+    app.config.setdefault('NOTIFICATIONS_RETENTION', 600)
+    backend = app.config['NOTIFICATIONS_BACKEND']
+    queue_size = app.config['NOTIFICATIONS_QUEUE_SIZE']
+    if backend == 'local':
+        selected = LocalBroker(queue_size)
+    elif backend == 'database':
+        with app.app_context():
+            selected = DatabaseBroker(db.engine, queue_size, app.config['NOTIFICATIONS_POLL_INTERVAL'],
+                                      app.config['NOTIFICATIONS_RETENTION'])
+    else:
+        selected = import_string(backend)(app)
+    app.extensions[_EXTENSION_KEY] = _State(selected, app.config['NOTIFICATIONS_MAX_STREAMS'])
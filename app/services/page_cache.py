@@ -0,0 +1,64 @@
+"""Template bytecode cache and rendered-page cache for static frontend pages.
+
+Pages such as the landing, login and register views only vary by locale and
+by whether the visitor is logged in, so @cached_page keeps their rendered
+HTML per (endpoint, locale, authenticated) for PAGE_CACHE_TTL seconds. A
+request that has pending flash messages bypasses the cache, as the messages
+are rendered into the page and must be consumed.
+
+The rendered pages live in the worker, so a deploy (new processes) starts
+from an empty cache. Compiled templates are additionally stored as bytecode
+in JINJA_BYTECODE_CACHE_DIR, shared by all workers on the host; Jinja
+recompiles any template whose source changed, so a deploy never serves
+stale bytecode either.
+"""
+import os
+import tempfile
+from functools import wraps
+
+from flask import current_app
+from flask import request
+from flask import session
+from flask_babel import get_locale
+from flask_login import current_user
+from jinja2 import FileSystemBytecodeCache
+
+from app.services.cache import TTLCache
+
+_cache = TTLCache()  # (endpoint, locale, authenticated) -> rendered HTML
+
+
+def cached_page(view):
+    """Serve a view's rendered HTML from the per-worker page cache."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.debug or '_flashes' in session:
+            return view(*args, **kwargs)
+        key = (request.endpoint, str(get_locale()), current_user.is_authenticated)
+        html = _cache.get(key)
+        if html is None:
+            html = view(*args, **kwargs)
+            if isinstance(html, str):  # redirects and responses are not cached
+                _cache.set(key, html)
+        return html
+    return wrapper
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return _cache.stats()
+
+
+def init_app(app):
+    app.config.setdefault('PAGE_CACHE_TTL', 300)
+    app.config.setdefault('PAGE_CACHE_SIZE', 256)
+    app.config.setdefault('JINJA_BYTECODE_CACHE_DIR',
+                          os.path.join(tempfile.gettempdir(), 'wishlist-jinja-bytecode'))
+    _cache.configure(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
@@ -0,0 +1,97 @@
+"""Password hashing service.
+
+Hashing and verification are CPU bound. With PASSWORD_HASH_WORKERS > 0 they
+run in a per-process ProcessPoolExecutor so the calling worker thread only
+waits on a future (releasing the GIL for other threads), and at most
+PASSWORD_HASH_QUEUE_SIZE jobs may be pending at once; callers beyond that
+get HashingBusy instead of piling up. With PASSWORD_HASH_WORKERS = 0 hashing
+runs inline, which is what tests and the dev server use.
+
+PASSWORD_HASH_METHOD is a werkzeug method spec (e.g. 'scrypt',
+'scrypt:32768:8:1' or 'pbkdf2:sha256:1000000'). init_app expands it to the
+full spec werkzeug writes into hashes, and stored hashes with a different
+spec are reported by needs_rehash so login can upgrade them.
+"""
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash
+from werkzeug.security import generate_password_hash
+
+_EXTENSION_KEY = 'password_hasher'
+
+
+class HashingBusy(RuntimeError):
+    """The hashing queue is full or a job did not finish in time."""
+
+
+class _Hasher:
+    def __init__(self, method, prefix, workers, queue_size, timeout):
+        self.method = method
+        self.prefix = prefix
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Created lazily and per pid so pools never leak across a fork (gunicorn --preload)
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = pid
+        return self._pool
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy('password hashing queue is full')
+        try:
+            return self._executor().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusy('password hashing timed out')
+        finally:
+            self._slots.release()
+
+
+def _hasher():
+    return current_app.extensions[_EXTENSION_KEY]
+
+
+def hash_password(password):
+    hasher = _hasher()
+    return hasher.run(generate_password_hash, password, hasher.method)
+
+
+def verify_password(pw_hash, password):
+    return _hasher().run(check_password_hash, pw_hash, password)
+
+
+def needs_rehash(pw_hash):
+    """True when pw_hash was produced with a method/cost other than the configured one."""
+    return pw_hash.split('$', 1)[0] != _hasher().prefix
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 0)
+    app.config.setdefault('PASSWORD_HASH_QUEUE_SIZE', 64)
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+    method = app.config['PASSWORD_HASH_METHOD']
+    # Short specs ('scrypt', 'pbkdf2:sha256') are written with werkzeug's defaults filled in
+    prefix = generate_password_hash('', method).split('$', 1)[0]
+    app.extensions[_EXTENSION_KEY] = _Hasher(
+        method,
+        prefix,
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        app.config['PASSWORD_HASH_TIMEOUT'],
+    )
@@ -0,0 +1,67 @@
+"""EXPLAIN QUERY PLAN checks for the application's hot queries.
+
+Each entry in HOT_QUERIES builds its statement with the same helper the
+endpoint calls, with placeholder ids and amounts. check() asks SQLite for its
+plan and reports any step that scans a whole table instead of searching an
+index; `flask perf check-plans` exits non-zero when one regresses, so it can
+gate CI and deploys. User search is checked on whichever index the database
+has, so a database without the FTS5 tables reports the LIKE fallback's scan.
+"""
+import re
+
+from sqlalchemy import text
+
+from app import db
+from app.models.models import Event
+from app.models.models import EventParticipant
+from app.models.models import WishlistItem
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.services import dashboard
+from app.services import fx
+from app.services import serialization
+from app.services import user_search
+from app.services import wishlist_listing
+
+# "SCAN wishlist_item" is a full table scan; "SCAN t USING (COVERING) INDEX ix"
+# walks an index in order and is accepted, as are SEARCH steps.
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+# ISO 4217 "no currency": never has a rate, so the raw-price fallbacks are planned
+_UNRATED = 'XXX'
+
+HOT_QUERIES = {
+    'wishlist.get_wishlist': lambda: serialization.project_items(
+        wishlist_listing.ordered(WishlistItem.query.filter_by(user_id=1), 'created')),
+    'events.participant_wishlist (within budget)': lambda: wishlist_listing.budget_items(
+        1, fx.base_currency(), 1.0, 100),
+    'events.participant_wishlist (no rate)': lambda: wishlist_listing.budget_items(1, _UNRATED, None),
+    'public.view_wishlist (price range)': lambda: serialization.project_items(wishlist_listing.ordered(
+        wishlist_listing.price_range(WishlistItem.query.filter_by(user_id=1), fx.base_currency(), 10, 100),
+        'price')),
+    'public.view_wishlist (price range, no rate)': lambda: serialization.project_items(wishlist_listing.ordered(
+        wishlist_listing.price_range(WishlistItem.query.filter_by(user_id=1), _UNRATED, 10, 100), 'price')),
+    'events.dashboard': lambda: dashboard.dashboard_query(1),
+    'events.my_events_json': lambda: EventParticipant.query.filter_by(
+        user_id=1, status=EVENT_PARTICIPANT_STATUS_ACCEPTED),
+    'events.view_event': lambda: EventParticipant.query.filter_by(event_id=1),
+    'events.admin_events': lambda: Event.query.filter_by(admin_user_id=1),
+    'public.search_users (list all)': lambda: user_search.search_statement('', 20),
+    'public.search_users (prefix)': lambda: user_search.search_statement('an', 20),
+    'public.search_users (mid-word)': lambda: user_search.search_statement('nna', 20),
+}
+
+
+def explain(query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def check():
+    """Return {name: (plan_lines, full_scan_tables)} for every hot query."""
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        plan = explain(build())
+        scans = [m.group(1) for m in (_FULL_SCAN.match(line) for line in plan) if m]
+        results[name] = (plan, scans)
+    return results
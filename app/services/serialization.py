@@ -0,0 +1,44 @@
+"""Column-projected serialization for WishlistItem JSON responses.
+
+Endpoints select only the public columns (ITEM_COLUMNS) as plain rows instead
+of hydrating full ORM objects, and encode them with orjson when it is
+installed (falling back to the standard library encoder).
+"""
+import json
+
+from flask import Response
+
+from app.models.models import WishlistItem
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+ITEM_FIELDS = ('id', 'name', 'price', 'currency', 'details', 'event', 'link')
+ITEM_COLUMNS = tuple(getattr(WishlistItem, field) for field in ITEM_FIELDS)
+
+
+def dumps(payload):
+    """Encode payload as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def item_dict(row):
+    """Map a projected row (ITEM_COLUMNS first, extra columns ignored) to the public dict."""
+    return dict(zip(ITEM_FIELDS, row))
+
+
+def project_items(query, *extra_columns):
+    """Turn a WishlistItem query into one returning lightweight column rows."""
+    return query.with_entities(*ITEM_COLUMNS, *extra_columns)
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def items_response(rows):
+    return json_response([item_dict(row) for row in rows])
@@ -0,0 +1,135 @@
+"""Slow-query log with query plans, written as JSON lines.
+
+With SLOW_QUERY_THRESHOLD_MS set, engine hooks time every statement; those
+over the threshold are logged (a SLOW_QUERY_SAMPLE_RATE fraction of them)
+with the endpoint and path that issued them, the shape of the bound
+parameters (types and lengths, never values) and the backend's plan. Plans
+are taken on the same DBAPI connection right after the statement and cached
+per statement text for SLOW_QUERY_PLAN_TTL seconds, so a hot slow query costs
+one EXPLAIN per interval rather than one per execution.
+
+Lines go to SLOW_QUERY_LOG ('-' for stderr) through the app.slow_query
+logger; files are opened with WatchedFileHandler so logrotate can move them.
+"""
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from datetime import timezone
+
+from flask import has_request_context
+from flask import request
+from sqlalchemy import event as sa_event
+
+from app import db
+from app.services.cache import TTLCache
+
+logger = logging.getLogger('app.slow_query')
+
+_plans = TTLCache(maxsize=512)  # statement -> plan lines
+_EXPLAINABLE = ('select', 'with', 'update', 'delete', 'insert')
+
+
+def _shape(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f'{type(value).__name__}({len(value)})'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany):
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'first': parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    return [_shape(value) for value in (parameters or ())]
+
+
+def _explain(dialect_name, cursor, statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(prefix + statement, parameters)
+        rows = plan_cursor.fetchall()
+    finally:
+        plan_cursor.close()
+    # SQLite rows are (id, parent, notused, detail); other backends return one text column
+    return [str(row[-1]) for row in rows]
+
+
+def _plan(conn, cursor, statement, parameters, executemany):
+    if executemany or not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    plan = _plans.get(statement)
+    if plan is None:
+        try:
+            plan = _explain(conn.dialect.name, cursor, statement, parameters)
+        except Exception as exc:  # the plan is best effort; never fail the request
+            plan = [f'EXPLAIN failed: {exc}']
+        _plans.set(statement, plan)
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _make_after_cursor_execute(threshold, sample_rate, explain):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < threshold or (sample_rate < 1 and random.random() >= sample_rate):
+            return
+        record = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(elapsed * 1000, 3),
+            'statement': statement,
+            'parameters': parameter_shape(parameters, executemany),
+        }
+        if has_request_context():
+            record['endpoint'] = request.endpoint
+            record['method'] = request.method
+            record['path'] = request.path
+        if explain:
+            record['plan'] = _plan(conn, cursor, statement, parameters, executemany)
+        logger.warning(json.dumps(record, default=str))
+    return after_cursor_execute
+
+
+def _configure_logger(destination):
+    if logger.handlers:
+        return
+    if destination in (None, '', '-'):
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        from logging.handlers import WatchedFileHandler
+        handler = WatchedFileHandler(destination)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def init_app(app):
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', None)
+    app.config.setdefault('SLOW_QUERY_SAMPLE_RATE', 1.0)
+    app.config.setdefault('SLOW_QUERY_EXPLAIN', True)
+    app.config.setdefault('SLOW_QUERY_PLAN_TTL', 300)
+    app.config.setdefault('SLOW_QUERY_LOG', '-')
+    threshold_ms = app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold_ms is None:
+        return
+    _plans.configure(512, app.config['SLOW_QUERY_PLAN_TTL'])
+    _configure_logger(app.config['SLOW_QUERY_LOG'])
+    after = _make_after_cursor_execute(threshold_ms / 1000.0, app.config['SLOW_QUERY_SAMPLE_RATE'],
+                                       app.config['SLOW_QUERY_EXPLAIN'])
+    with app.app_context():
+        sa_event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        sa_event.listen(db.engine, 'after_cursor_execute', after)
@@ -0,0 +1,94 @@
+"""Startup-time budget tooling.
+
+create_app() records how long each of its init phases takes in
+app.extensions['startup_phases']. measure() boots the app in a fresh
+interpreter, serves one request through the test client and returns the
+init phases, the time to first response and (from a second run under
+-X importtime) the import cost per top-level package, so `flask perf startup`
+can hold them against STARTUP_BUDGET_MS. Imports here are stdlib only: this
+module is loaded while create_app() is being timed.
+"""
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_EXTENSION_KEY = 'startup_phases'
+
+# Runs in the child interpreter; argv[1] is the path of the first request.
+_PROBE = '''
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+response.get_data()
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_app': t1 - t0,
+    'create_app': t2 - t1,
+    'first_request': t3 - t2,
+    'status': response.status_code,
+    'phases': app.extensions.get('startup_phases', []),
+}))
+'''
+
+
+class PhaseTimer:
+    """Accumulates (name, seconds) pairs for consecutive init phases."""
+
+    def __init__(self, app):
+        self._phases = app.extensions.setdefault(_EXTENSION_KEY, [])
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - start))
+
+
+def parse_importtime(stderr, depth=1):
+    """Sum -X importtime self times (microseconds) per module prefix of the given depth."""
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = '.'.join(fields[2].strip().split('.')[:depth])
+        totals[name] += int(fields[0])
+    return totals
+
+
+def _run_probe(path, cwd, importtime):
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    proc = subprocess.run(args + ['-c', _PROBE, path], cwd=cwd, capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'startup probe failed')
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def measure(path='/login', cwd=None, breakdown=True):
+    """Cold-start the app in a subprocess and return its timing report.
+
+    Timings come from a plain interpreter; with breakdown a second run under
+    -X importtime (which inflates timings) supplies the per-package import
+    costs.
+    """
+    started = time.perf_counter()
+    report, _ = _run_probe(path, cwd, importtime=False)
+    report['wall'] = time.perf_counter() - started
+    report['time_to_first_response'] = report['import_app'] + report['create_app'] + report['first_request']
+    if breakdown:
+        _, stderr = _run_probe(path, cwd, importtime=True)
+        report['imports'] = parse_importtime(stderr)
+    return report
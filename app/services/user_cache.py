@@ -0,0 +1,86 @@
+"""Per-worker cache of user identity records for the login manager.
+
+load() resolves the id stored in the session cookie to a User attached to the
+current db.session without issuing SQL when the record is cached: the cached
+columns are copied onto a fresh instance and merged with load=False, so code
+that modifies current_user and commits still persists normally. Columns not
+cached (password_hash) are loaded lazily if something touches them.
+
+Entries are dropped after commit whenever a User row changes in this worker
+and expire after USER_CACHE_TTL seconds to bound staleness across workers.
+"""
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models.models import User
+from app.services.cache import TTLCache
+
+CACHED_COLUMNS = ('id', 'email', 'nickname', 'name', 'surname', 'avatar')
+
+_DIRTY_KEY = 'user_cache_dirty_ids'
+
+_cache = TTLCache()  # user_id -> tuple of CACHED_COLUMNS values
+
+
+def _attach(record):
+    user = User()
+    for column, value in zip(CACHED_COLUMNS, record):
+        setattr(user, column, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load(user_id):
+    """Return the User for user_id (or None), using the cache when possible."""
+    user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if user is not None:
+        return user
+    record = _cache.get(user_id)
+    if record is not None:
+        return _attach(record)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        _cache.set(user_id, tuple(getattr(user, column) for column in CACHED_COLUMNS))
+    return user
+
+
+def invalidate(*user_ids):
+    _cache.pop(*user_ids)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return _cache.stats()
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _collect_dirty_users(session, flush_context, instances):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            dirty.add(obj.id)
+
+
+def _apply_invalidation(session):
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        invalidate(*dirty)
+
+
+def _discard_pending(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def init_app(app):
+    app.config.setdefault('USER_CACHE_SIZE', 10000)
+    app.config.setdefault('USER_CACHE_TTL', 60)
+    _cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    if not sa_event.contains(db.session, 'before_flush', _collect_dirty_users):
+        sa_event.listen(db.session, 'before_flush', _collect_dirty_users)
+        sa_event.listen(db.session, 'after_commit', _apply_invalidation)
+        sa_event.listen(db.session, 'after_rollback', _discard_pending)
@@ -0,0 +1,205 @@
+"""User search backed by an SQLite FTS5 index.
+
+Results are ranked in tiers: exact nickname match, nickname prefix, then
+word-prefix matches on name/surname, then (tier 3) matches in the middle of a
+word, each tier ordered by nickname. Pages are keyset-paginated on
+(tier, nickname, id) so every page costs the same regardless of how deep the
+caller scrolls. When the ``user_fts`` table is not present (non-SQLite
+backend or a database built with ``db.create_all``) the same ordering is
+produced from a LIKE query.
+
+Nickname tiers compare User.nickname_key, the nickname folded by
+search_key() the way the FTS tokenizer folds it (Unicode case and
+diacritics), because SQLite's lower() only folds ASCII. A before_flush hook
+keeps the column in step with nickname.
+
+Mid-word matches come from the ``user_trigram`` index (trigram tokenizer,
+SQLite 3.34+) and need at least three characters per search term; shorter
+terms, or databases without that index, only match word prefixes.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import case
+from sqlalchemy import event as sa_event
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import or_
+from sqlalchemy import text
+from sqlalchemy import tuple_
+
+from app import db
+from app.models.models import User
+from app.services.pagination import InvalidCursor
+from app.services.pagination import decode_cursor
+from app.services.pagination import encode_cursor
+
+FTS_TABLE = 'user_fts'
+TRIGRAM_TABLE = 'user_trigram'
+
+_tables_present = {}  # (engine url, table) -> bool
+
+_PREFIX_MATCHES = """
+        SELECT u.id, u.nickname, u.avatar, u.name, u.surname,
+               CASE WHEN u.nickname_key = :qk THEN 0
+                    WHEN substr(u.nickname_key, 1, length(:qk)) = :qk THEN 1
+                    ELSE 2 END AS tier
+        FROM user_fts JOIN "user" u ON u.id = user_fts.rowid
+        WHERE user_fts MATCH :match
+"""
+_SUBSTRING_MATCHES = """
+        UNION ALL
+        SELECT u.id, u.nickname, u.avatar, u.name, u.surname, 3 AS tier
+        FROM user_trigram JOIN "user" u ON u.id = user_trigram.rowid
+        WHERE user_trigram MATCH :substring
+          AND u.id NOT IN (SELECT rowid FROM user_fts WHERE user_fts MATCH :match)
+"""
+_PAGE = """
+    SELECT id, nickname, avatar, name, surname, tier FROM ({matches})
+    WHERE (tier, nickname, id) > (:c_tier, :c_nickname, :c_id)
+    ORDER BY tier, nickname, id
+    LIMIT :limit
+"""
+_FTS_SQL = text(_PAGE.format(matches=_PREFIX_MATCHES))
+_FTS_TRIGRAM_SQL = text(_PAGE.format(matches=_PREFIX_MATCHES + _SUBSTRING_MATCHES))
+
+
+def search_key(value):
+    """Fold value for nickname ranking: Unicode case folding and no combining marks (Ś -> s, Ł -> ł)."""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _row_cursor(row):
+    return encode_cursor([row.tier, row.nickname, row.id])
+
+
+def _decode(cursor):
+    tier, nickname, user_id = decode_cursor(cursor, 3)
+    try:
+        return int(tier), str(nickname), int(user_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def _terms(query):
+    return [t for t in re.split(r'\s+', query) if t]
+
+
+def _match_expression(query):
+    # Each whitespace separated term becomes a quoted prefix phrase, ANDed together
+    return ' '.join('"%s"*' % t.replace('"', '""') for t in _terms(query))
+
+
+def _substring_expression(query):
+    # Trigram phrases match anywhere in a column; terms under three characters cannot be matched
+    terms = _terms(query)
+    if not terms or any(len(t) < 3 for t in terms):
+        return None
+    return ' '.join('"%s"' % t.replace('"', '""') for t in terms)
+
+
+def _has_table(name):
+    engine = db.engine
+    key = (str(engine.url), name)
+    if key not in _tables_present:
+        if engine.dialect.name != 'sqlite':
+            _tables_present[key] = False
+        else:
+            found = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': name}).first()
+            _tables_present[key] = found is not None
+    return _tables_present[key]
+
+
+def has_fts_index():
+    return _has_table(FTS_TABLE)
+
+
+def _fts_statement(query, after, limit):
+    c_tier, c_nickname, c_id = after if after else (-1, '', 0)
+    params = {
+        'qk': search_key(query), 'match': _match_expression(query),
+        'c_tier': c_tier, 'c_nickname': c_nickname, 'c_id': c_id, 'limit': limit,
+    }
+    substring = _substring_expression(query)
+    if substring is None or not _has_table(TRIGRAM_TABLE):
+        return _FTS_SQL.bindparams(**params)
+    return _FTS_TRIGRAM_SQL.bindparams(substring=substring, **params)
+
+
+def _list_all_statement(after, limit):
+    # Ordered straight off the unique nickname index; tier is constant
+    q = db.session.query(User.id, User.nickname, User.avatar, User.name, User.surname,
+                         literal(0).label('tier'))
+    if after:
+        q = q.filter(tuple_(User.nickname, User.id) > tuple_(after[1], after[2]))
+    return q.order_by(User.nickname, User.id).limit(limit).statement
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like_statement(query, after, limit):
+    qk = search_key(query)
+    ql = _like_escape(query.lower())
+    nick = User.nickname_key
+    name, surname = func.lower(User.name), func.lower(User.surname)
+    word_prefix = or_(name.like(ql + '%', escape='\\'), surname.like(ql + '%', escape='\\'))
+    tier = case((nick == qk, 0), (func.substr(nick, 1, len(qk)) == qk, 1), (word_prefix, 2), else_=3)
+    contains = '%' + ql + '%'
+    inner = (db.session.query(User.id, User.nickname, User.avatar, User.name, User.surname,
+                              tier.label('tier'))
+             .filter(or_(nick.like('%' + _like_escape(qk) + '%', escape='\\'),
+                         name.like(contains, escape='\\'),
+                         surname.like(contains, escape='\\')))
+             .subquery())
+    q = db.session.query(inner)
+    if after:
+        q = q.filter(tuple_(inner.c.tier, inner.c.nickname, inner.c.id) > tuple_(*after))
+    return q.order_by(inner.c.tier, inner.c.nickname, inner.c.id).limit(limit).statement
+
+
+def search_statement(query, limit, cursor=None):
+    """Return the statement that fetches up to limit users matching query after cursor.
+
+    The index in use decides its shape: nickname order when query is empty,
+    FTS5 (plus trigram) MATCH when the tables exist, LIKE otherwise.
+    """
+    query = (query or '').strip()
+    after = _decode(cursor) if cursor else None
+    if not query:
+        return _list_all_statement(after, limit)
+    if has_fts_index():
+        return _fts_statement(query, after, limit)
+    return _like_statement(query, after, limit)
+
+
+def search_users(query, limit, cursor=None):
+    """Return (rows, next_cursor) for one page of users matching query.
+
+    Rows expose id, nickname, avatar, name, surname and tier. next_cursor is
+    None on the last page. Raises InvalidCursor for a malformed cursor.
+    """
+    rows = db.session.execute(search_statement(query, limit + 1, cursor)).all()
+    next_cursor = _row_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _fold_nicknames(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User):
+            key = search_key(obj.nickname)
+            if obj.nickname_key != key:
+                obj.nickname_key = key
+
+
+def init_app(app):
+    if not sa_event.contains(db.session, 'before_flush', _fold_nicknames):
+        sa_event.listen(db.session, 'before_flush', _fold_nicknames)
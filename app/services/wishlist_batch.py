@@ -0,0 +1,104 @@
+"""Atomic batches of wishlist create/update/delete operations.
+
+apply() validates and applies every operation of a batch inside a single
+transaction: either all of them are committed (one flush, one commit, one
+wishlist version bump) or, if any operation is invalid or targets an item the
+user does not own, none are. Either way the caller gets one result per
+operation in request order.
+
+Operations are ``{"op": "create", "data": {...}}``,
+``{"op": "update", "id": 1, "data": {...}}`` and ``{"op": "delete", "id": 1}``;
+update data is merged over the stored item and validated like an import row.
+"""
+from app import db
+from app.models.models import WishlistItem
+from app.services.wishlist_transfer import EXPORT_FIELDS
+from app.services.wishlist_transfer import validate_row
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class InvalidBatch(ValueError):
+    """The request body is not a list of operations."""
+
+
+def check(operations, max_ops):
+    """Validate the batch envelope before a transaction is opened."""
+    if not isinstance(operations, list) or not operations:
+        raise InvalidBatch('operations must be a non-empty list')
+    if len(operations) > max_ops:
+        raise InvalidBatch(f'at most {max_ops} operations per batch')
+    return operations
+
+
+def _target_ids(operations):
+    ids = set()
+    for op in operations:
+        if isinstance(op, dict) and op.get('op') in ('update', 'delete'):
+            try:
+                ids.add(int(op.get('id')))
+            except (TypeError, ValueError):
+                pass
+    return ids
+
+
+def _apply_one(op, user_id, items, deleted):
+    """Apply one operation; return (result, new_item_or_None)."""
+    if not isinstance(op, dict) or op.get('op') not in OPERATIONS:
+        return {'status': 'error', 'error': 'unknown operation'}, None
+    kind = op['op']
+    data = op.get('data') or {}
+    if kind != 'delete' and not isinstance(data, dict):
+        return {'op': kind, 'status': 'error', 'error': 'data must be an object'}, None
+    if kind == 'create':
+        values, error = validate_row(data)
+        if error:
+            return {'op': kind, 'status': 'error', 'error': error}, None
+        item = WishlistItem(user_id=user_id, **values)
+        db.session.add(item)
+        return {'op': kind, 'status': 'ok'}, item
+    try:
+        item_id = int(op.get('id'))
+    except (TypeError, ValueError):
+        return {'op': kind, 'status': 'error', 'error': 'id is required'}, None
+    item = items.get(item_id)
+    if item is None or item_id in deleted:
+        return {'op': kind, 'id': item_id, 'status': 'error', 'error': 'not found'}, None
+    if kind == 'delete':
+        db.session.delete(item)
+        deleted.add(item_id)
+        return {'op': kind, 'id': item_id, 'status': 'ok'}, None
+    merged = {field: getattr(item, field) for field in EXPORT_FIELDS}
+    merged.update({k: v for k, v in data.items() if k in EXPORT_FIELDS})
+    values, error = validate_row(merged)
+    if error:
+        return {'op': kind, 'id': item_id, 'status': 'error', 'error': error}, None
+    for field, value in values.items():
+        setattr(item, field, value)
+    return {'op': kind, 'id': item_id, 'status': 'ok'}, None
+
+
+def apply(user_id, operations):
+    """Run a checked batch; returns (applied, results). Must run in run_in_transaction."""
+    ids = _target_ids(operations)
+    items = {}
+    if ids:
+        items = {item.id: item for item in WishlistItem.query.filter(
+            WishlistItem.user_id == user_id, WishlistItem.id.in_(ids))}
+    results, created, deleted = [], [], set()
+    for index, op in enumerate(operations):
+        result, item = _apply_one(op, user_id, items, deleted)
+        result['index'] = index
+        results.append(result)
+        if item is not None:
+            created.append((result, item))
+    if any(result['status'] == 'error' for result in results):
+        db.session.rollback()
+        for result in results:
+            if result['status'] == 'ok':
+                result['status'] = 'skipped'  # valid, but not applied because another one failed
+        return False, results
+    db.session.flush()
+    for result, item in created:
+        result['id'] = item.id
+    return True, results
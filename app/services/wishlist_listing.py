@@ -0,0 +1,157 @@
+"""Keyset pagination, price filters and streamed JSON for wishlist item listings.
+
+Listings are ordered by (created_at, id), or by (price_base, id) with
+``sort=price``. A page is requested with ``limit`` and continued with the
+opaque ``cursor`` returned in ``X-Next-Cursor``; ``stream=1`` instead emits the whole array incrementally while rows are
+fetched in batches, so worker memory stays bounded for very long lists.
+"""
+from datetime import datetime
+
+from flask import Response
+from flask import current_app
+from flask import jsonify
+from flask import request
+from flask import stream_with_context
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import or_
+
+from app.models.models import WishlistItem
+from app.services import fx
+from app.services import serialization
+from app.services.pagination import InvalidCursor
+from app.services.pagination import decode_cursor
+from app.services.pagination import encode_cursor
+
+STREAM_BATCH_SIZE = 500
+
+
+def _encode_created(value):
+    return value.isoformat() if value is not None else None
+
+
+def _decode_created(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _decode_price(value):
+    return float(value) if value is not None else None
+
+
+# sort name -> (column, cursor encoder, cursor decoder); id breaks ties
+SORTS = {
+    'created': (WishlistItem.created_at, _encode_created, _decode_created),
+    'price': (WishlistItem.price_base, lambda value: value, _decode_price),
+}
+
+
+def ordered(query, sort):
+    column = SORTS[sort][0]
+    return query.order_by(column, WishlistItem.id)
+
+
+def _price_bound(currency, amount, compare):
+    same_currency = and_(WishlistItem.currency == currency, compare(WishlistItem.price, amount))
+    base_amount = fx.to_base(amount, currency)
+    if base_amount is None:
+        return same_currency
+    return or_(compare(WishlistItem.price_base, base_amount),
+               and_(WishlistItem.price_base.is_(None), same_currency))
+
+
+def price_range(query, currency, min_price=None, max_price=None):
+    """Restrict query to items priced between min_price and max_price, given in currency.
+
+    Prices are compared in the base currency; where a rate is missing (for
+    currency or for an item), items in currency are compared by raw price.
+    """
+    if min_price is not None:
+        query = query.filter(_price_bound(currency, min_price, lambda column, bound: column >= bound))
+    if max_price is not None:
+        query = query.filter(_price_bound(currency, max_price, lambda column, bound: column <= bound))
+    return query
+
+
+def budget_items(user_id, currency, rate, max_amount=None):
+    """Project user_id's items in creation order with their price in currency as budget_price.
+
+    rate is fx.rates()[currency]; without one only items already priced in
+    currency can be compared. max_amount drops items above it.
+    """
+    query = WishlistItem.query.filter_by(user_id=user_id)
+    if rate is None:
+        query = query.filter_by(currency=currency)
+        budget_price = WishlistItem.price
+    else:
+        budget_price = func.round(WishlistItem.price_base / rate, 2)
+        if max_amount is not None:
+            query = query.filter(WishlistItem.price_base <= max_amount * rate)
+    return serialization.project_items(query.order_by(WishlistItem.created_at, WishlistItem.id),
+                                       budget_price.label('budget_price'))
+
+
+def _item_cursor(sort, value, item_id):
+    _, encode, _ = SORTS[sort]
+    return encode_cursor([encode(value), item_id])
+
+
+def _after_cursor(query, sort, cursor):
+    column, _, decode = SORTS[sort]
+    value, item_id = decode_cursor(cursor, 2)
+    try:
+        item_id = int(item_id)
+        value = decode(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if value is None:
+        # NULLs (legacy rows without created_at, unpriced items) sort first in SQLite
+        return query.filter(or_(
+            and_(column.is_(None), WishlistItem.id > item_id),
+            column.isnot(None)))
+    return query.filter(or_(
+        column > value,
+        and_(column == value, WishlistItem.id > item_id)))
+
+
+def _stream(query):
+    yield b'['
+    first = True
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        yield (b'' if first else b',') + serialization.dumps(serialization.item_dict(row))
+        first = False
+    yield b']'
+
+
+def list_response(query):
+    """Build the JSON response for a WishlistItem query honouring request args.
+
+    Without ``limit``/``cursor``/``stream`` the full list is returned as before.
+    ``sort=price`` orders by the normalized price_base instead of creation time.
+    """
+    sort = request.args.get('sort', 'created')
+    if sort not in SORTS:
+        return jsonify({'error': 'Invalid sort'}), 400
+    column = SORTS[sort][0]
+    query = ordered(query, sort)
+    if request.args.get('stream', type=int):
+        query = serialization.project_items(query)
+        return Response(stream_with_context(_stream(query)), mimetype='application/json')
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return serialization.items_response(serialization.project_items(query).all())
+    if limit is None:
+        limit = current_app.config['WISHLIST_PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['WISHLIST_MAX_PAGE_SIZE']))
+    if cursor:
+        try:
+            query = _after_cursor(query, sort, cursor)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    # The sort column rides along after the public columns so the next cursor can be built
+    rows = serialization.project_items(query, column).limit(limit + 1).all()
+    response = serialization.items_response(rows[:limit])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers['X-Next-Cursor'] = _item_cursor(sort, last[-1], last.id)
+    return response
@@ -0,0 +1,247 @@
+"""Bulk wishlist import and export as CSV or JSON Lines.
+
+Imports are parsed and validated row by row from the request stream; valid
+rows are spooled to a temporary file, so an upload that turns out to be too
+large or undecodable is rejected before anything is written. They are then
+inserted with one bulk INSERT per WISHLIST_IMPORT_BATCH_SIZE rows, each batch
+in its own transaction; invalid rows are skipped and reported by row
+number. Bulk inserts bypass the session flush hooks, so
+price_base, the owner's wishlist version and the link previews to fetch
+are handled here explicitly.
+
+Exports stream the owner's items straight from a yield_per cursor, so
+neither direction holds a whole list in memory. CSV cells that a spreadsheet
+would evaluate as a formula are written with a leading apostrophe, which CSV
+imports strip again.
+"""
+import csv
+import io
+import json
+import math
+import tempfile
+
+from sqlalchemy import insert
+
+from app import db
+from app.models.models import ALLOWED_CURRENCIES
+from app.models.models import WishlistItem
+from app.services import engine
+from app.services import fx
+from app.services import link_preview
+from app.services import serialization
+from app.services import wishlist_version
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = ('name', 'price', 'currency', 'details', 'event', 'link')
+EXPORT_BATCH_SIZE = 1000
+_MAX_LENGTHS = {'name': 128, 'event': 128, 'link': 256}
+_SPOOL_MEMORY = 1 << 20  # validated rows beyond this many bytes go to disk
+# Leading characters that make spreadsheets treat a CSV cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class ImportTooLarge(ValueError):
+    """The upload has more rows than WISHLIST_IMPORT_MAX_ROWS."""
+
+
+def detect_format(requested, filename, content_type):
+    """Pick csv/jsonl from an explicit value, the file extension or the content type."""
+    if requested:
+        return requested.lower() if requested.lower() in FORMATS else None
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('jsonl', 'ndjson'):
+            return 'jsonl'
+        if extension == 'csv':
+            return 'csv'
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return 'jsonl'
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    return None
+
+
+def mimetype(fmt):
+    return _MIMETYPES[fmt]
+
+
+# -------------------------- Import ----------------------------------------
+
+class _RawStream(io.RawIOBase):
+    """Adapt an object that only has read(n) (e.g. a server's request body) to io."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _unescape_cell(value):
+    # Undo _escape_cell so exported files import unchanged
+    if isinstance(value, str) and value[:1] == "'" and value[1:2] and value[1] in _FORMULA_PREFIXES:
+        return value[1:]
+    return value
+
+
+def _read_rows(stream, fmt):
+    """Yield (row_number, mapping or None, error) from a binary stream."""
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(_RawStream(stream))  # raw request body
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for number, row in enumerate(reader, start=1):
+            if None in row:
+                yield number, None, 'too many columns'
+            else:
+                # Header names from other services vary in case and padding
+                yield number, {(key or '').strip().lower(): _unescape_cell(value) for key, value in row.items()}, None
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, 'invalid JSON'
+            continue
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, 'expected a JSON object'
+
+
+def validate_row(row):
+    """Return (values, error) for one import row."""
+    name = row.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return None, 'name is required'
+    values = {'name': name.strip()}
+    price = row.get('price')
+    if price in (None, ''):
+        values['price'] = None
+    else:
+        try:
+            if isinstance(price, bool):
+                raise TypeError(price)
+            values['price'] = float(price)
+        except (TypeError, ValueError):
+            return None, 'price must be a number'
+        if not math.isfinite(values['price']) or values['price'] < 0:
+            return None, 'price must be a non-negative number'
+    currency = row.get('currency') or 'PLN'
+    if not isinstance(currency, str) or currency.strip().upper() not in ALLOWED_CURRENCIES:
+        return None, 'unsupported currency'
+    values['currency'] = currency.strip().upper()
+    for field in ('details', 'event', 'link'):
+        value = row.get(field)
+        if value in (None, ''):
+            values[field] = None
+            continue
+        if not isinstance(value, str):
+            return None, f'{field} must be text'
+        values[field] = value
+    for field, limit in _MAX_LENGTHS.items():
+        if values[field] is not None and len(values[field]) > limit:
+            return None, f'{field} is longer than {limit} characters'
+    return values, None
+
+
+def _insert_batch(user_id, batch):
+    rates = fx.rates()
+    for values in batch:
+        values['user_id'] = user_id
+        rate = rates.get(values['currency'])
+        values['price_base'] = None if values['price'] is None or rate is None else values['price'] * rate
+    db.session.connection().execute(insert(WishlistItem.__table__), batch)
+    wishlist_version.bump(db.session.connection(), [user_id])
+    link_preview.enqueue_on_commit(db.session, [values['link'] for values in batch])
+
+
+def import_items(user_id, stream, fmt, batch_size, max_rows, max_errors):
+    """Import rows for user_id; returns {'imported', 'failed', 'errors'}.
+
+    Raises ImportTooLarge (or UnicodeDecodeError) before writing any row.
+    Batches already written stay committed if a later one fails.
+    """
+    failed = 0
+    errors = []
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY) as spool:
+        for number, row, error in _read_rows(stream, fmt):
+            if number > max_rows:
+                raise ImportTooLarge(f'more than {max_rows} rows')
+            if error is None:
+                values, error = validate_row(row)
+            if error is not None:
+                failed += 1
+                if len(errors) < max_errors:
+                    errors.append({'row': number, 'error': error})
+                continue
+            spool.write(serialization.dumps(values) + b'\n')
+        spool.seek(0)
+        imported = 0
+        batch = []
+        for line in spool:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                # Copy: a retried transaction must start from the validated values
+                engine.run_in_transaction(_insert_batch, user_id, [dict(v) for v in batch])
+                imported += len(batch)
+                batch = []
+        if batch:
+            engine.run_in_transaction(_insert_batch, user_id, [dict(v) for v in batch])
+            imported += len(batch)
+    return {'imported': imported, 'failed': failed, 'errors': errors}
+
+
+# -------------------------- Export ----------------------------------------
+
+def _export_query(user_id):
+    columns = tuple(getattr(WishlistItem, field) for field in EXPORT_FIELDS)
+    return (db.session.query(*columns)
+            .filter(WishlistItem.user_id == user_id)
+            .order_by(WishlistItem.created_at, WishlistItem.id)
+            .yield_per(EXPORT_BATCH_SIZE))
+
+
+def _escape_cell(value):
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_items(user_id, fmt):
+    """Yield the user's items as CSV or JSON Lines chunks."""
+    rows = _export_query(user_id)
+    if fmt == 'jsonl':
+        chunk = []
+        for row in rows:
+            chunk.append(serialization.dumps(dict(zip(EXPORT_FIELDS, row))))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield b'\n'.join(chunk) + b'\n'
+                chunk = []
+        if chunk:
+            yield b'\n'.join(chunk) + b'\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_escape_cell(value) for value in row])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
@@ -0,0 +1,79 @@
+"""Per-user wishlist versions and conditional GET for wishlist JSON endpoints.
+
+User.wishlist_version is incremented in the same transaction as every
+WishlistItem insert, update or delete (via a session after_flush hook; bulk
+writers call bump() themselves). Listing endpoints derive a weak ETag from
+that number plus the request variant, so answering If-None-Match with 304
+costs one primary-key lookup and never loads or serializes the items.
+"""
+import hashlib
+
+from flask import make_response
+from flask import request
+from sqlalchemy import event as sa_event
+from sqlalchemy import update
+
+from app import db
+from app.models.models import User
+from app.models.models import WishlistItem
+
+
+def current_version(user_id):
+    """Return the user's wishlist version, or None if the user does not exist."""
+    return db.session.query(User.wishlist_version).filter(User.id == user_id).scalar()
+
+
+def bump(connection, user_ids):
+    if user_ids:
+        connection.execute(update(User.__table__)
+                           .where(User.__table__.c.id.in_(list(user_ids)))
+                           .values(wishlist_version=User.__table__.c.wishlist_version + 1))
+
+
+def _etag(user_id, version, variant):
+    digest = hashlib.blake2s(repr(variant).encode(), digest_size=6).hexdigest()
+    return f'wl-{user_id}-{version}-{digest}'
+
+
+def conditional(user_id, build, *variant):
+    """Serve build() with a wishlist ETag for user_id, or 304 if the client is current.
+
+    variant lists anything besides the items that shapes the body (the query
+    string is always included).
+    """
+    version = current_version(user_id)
+    if version is None:
+        return build()
+    tag = _etag(user_id, version, variant + (request.query_string,))
+    if request.if_none_match.contains_weak(tag):
+        response = make_response('', 304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(tag, weak=True)
+    # Allow the browser to store the body but make it revalidate on every use
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# -------------------------- Session hooks ---------------------------------
+
+def _bump_changed_wishlists(session, flush_context):
+    user_ids = set()
+    for obj in session.new:
+        if isinstance(obj, WishlistItem):
+            user_ids.add(obj.user_id)
+    for obj in session.deleted:
+        if isinstance(obj, WishlistItem):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, WishlistItem) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.user_id)
+    user_ids.discard(None)
+    bump(session.connection(), user_ids)
+
+
+def init_app(app):
+    if not sa_event.contains(db.session, 'after_flush', _bump_changed_wishlists):
+        sa_event.listen(db.session, 'after_flush', _bump_changed_wishlists)
@@ -0,0 +1,31 @@
+"""Pre-fork warm-up for preloaded deployments (see gunicorn.conf.py).
+
+Everything done here happens once in the master process so forked workers
+inherit it through copy-on-write pages instead of rebuilding it lazily on
+their first requests.
+"""
+from flask_babel import force_locale
+from flask_babel import get_translations
+from sqlalchemy.orm import configure_mappers
+
+from app import db
+
+
+def warm_up(app):
+    """Compile templates, load translation catalogs and configure ORM mappers."""
+    # Jinja caches compiled templates on the environment
+    for name in app.jinja_env.list_templates():
+        if name.endswith('.html'):
+            app.jinja_env.get_template(name)
+    # Babel caches one Translations object per locale
+    with app.test_request_context():
+        for locale in app.config.get('LANGUAGES', []):
+            with force_locale(locale):
+                get_translations()
+    configure_mappers()
+    with app.app_context():
+        # Reflect nothing, but make sure the engine and dialect are initialized,
+        # then drop pooled connections: SQLite handles must not cross a fork.
+        with db.engine.connect():
+            pass
+        db.engine.dispose()
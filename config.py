@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -6,6 +7,82 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Local SQLite connections get engine.DEFAULT_SQLITE_PRAGMAS with this busy timeout;
+    # SQLITE_PRAGMAS (a dict) may override individual pragmas
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # Retries for transactions that hit "database is locked"
+    DB_RETRY_ATTEMPTS = 5
+    DB_RETRY_BACKOFF = 0.05
+    # Cached dashboards are keyed by User.dashboard_version, so the TTL only bounds memory use
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+    DASHBOARD_CACHE_SIZE = 4096
+    # Per-worker cache of user identity records used by the login manager
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = 10000
+    # User search pagination (/public/users)
+    USER_SEARCH_PAGE_SIZE = 20
+    USER_SEARCH_MAX_PAGE_SIZE = 100
+    # Wishlist listing pagination (/wishlist/, /public/wishlist/<id>)
+    WISHLIST_PAGE_SIZE = 50
+    WISHLIST_MAX_PAGE_SIZE = 500
+    # Currency that WishlistItem.price_base is stored in; other rates come from `flask fx load`
+    BASE_CURRENCY = 'PLN'
+    FX_RATES_TTL = int(os.environ.get('FX_RATES_TTL', 300))
+    # Operations accepted per /wishlist/batch request
+    WISHLIST_BATCH_MAX_OPS = 500
+    # Bulk import (/wishlist/import): rows per INSERT/transaction, upload limit, errors reported
+    WISHLIST_IMPORT_BATCH_SIZE = 1000
+    WISHLIST_IMPORT_MAX_ROWS = int(os.environ.get('WISHLIST_IMPORT_MAX_ROWS', 100000))
+    WISHLIST_IMPORT_MAX_ERRORS = 100
+    # Password hashing: full werkzeug method spec; 0 workers hashes inline in the request thread
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # Rendered static frontend pages, per worker and keyed by (endpoint, locale, logged in); 0 disables
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    PAGE_CACHE_SIZE = 256
+    # Compiled template bytecode shared by all workers on the host; empty disables
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR',
+                                              os.path.join(tempfile.gettempdir(), 'wishlist-jinja-bytecode'))
+    # Prometheus metrics at /metrics (opt-in); METRICS_DIR aggregates gunicorn workers
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    METRICS_DIR = os.environ.get('METRICS_DIR') or None
+    METRICS_FLUSH_INTERVAL = 5
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    # Slow-query log: statements over the threshold (ms) with endpoint, parameter shapes and plan
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ['SLOW_QUERY_THRESHOLD_MS']) if os.environ.get('SLOW_QUERY_THRESHOLD_MS') else None
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 1.0))
+    SLOW_QUERY_EXPLAIN = True
+    SLOW_QUERY_PLAN_TTL = 300
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', '-')
+    # Server-sent event updates at /events/stream: 'local' (one process), 'database' (all
+    # workers, polled) or 'module:factory'; each open stream holds a server thread
+    NOTIFICATIONS_BACKEND = os.environ.get('NOTIFICATIONS_BACKEND', 'local')
+    NOTIFICATIONS_MAX_STREAMS = int(os.environ.get('NOTIFICATIONS_MAX_STREAMS', 16))
+    NOTIFICATIONS_QUEUE_SIZE = 100
+    NOTIFICATIONS_KEEPALIVE = 15
+    NOTIFICATIONS_STREAM_TIMEOUT = int(os.environ.get('NOTIFICATIONS_STREAM_TIMEOUT', 300))
+    NOTIFICATIONS_RETRY = 5
+    NOTIFICATIONS_POLL_INTERVAL = float(os.environ.get('NOTIFICATIONS_POLL_INTERVAL', 1.0))
+    NOTIFICATIONS_RETENTION = 600
+    # Background previews (title, image, price) of item links, cached in link_preview.
+    # Off unless enabled: it makes outbound requests to whatever users link to
+    LINK_PREVIEW_ENABLED = os.environ.get('LINK_PREVIEW_ENABLED', '').lower() in ('1', 'true', 'yes')
+    LINK_PREVIEW_CONCURRENCY = int(os.environ.get('LINK_PREVIEW_CONCURRENCY', 8))
+    LINK_PREVIEW_PER_HOST = 2
+    LINK_PREVIEW_DOMAIN_INTERVAL = float(os.environ.get('LINK_PREVIEW_DOMAIN_INTERVAL', 1.0))
+    LINK_PREVIEW_TIMEOUT = 10.0
+    LINK_PREVIEW_MAX_BYTES = 512 * 1024
+    LINK_PREVIEW_QUEUE_SIZE = 1000
+    LINK_PREVIEW_TTL = int(os.environ.get('LINK_PREVIEW_TTL', 7 * 86400))
+    LINK_PREVIEW_ERROR_TTL = 3600
+    # Allow links to loopback/private addresses (local stub servers in development only)
+    LINK_PREVIEW_ALLOW_PRIVATE = os.environ.get('LINK_PREVIEW_ALLOW_PRIVATE', '').lower() in ('1', 'true', 'yes')
+    # `flask perf startup` fails when import + create_app + first request exceeds this
+    STARTUP_BUDGET_MS = int(os.environ.get('STARTUP_BUDGET_MS', 1500))
+    # Where `flask perf bench` saves its JSON results (one file per run)
+    BENCHMARK_RESULTS_DIR = os.environ.get('BENCHMARK_RESULTS_DIR', 'benchmarks')
     UPLOAD_FOLDER = 'app/static/uploads'
     # Internationalization settings
     BABEL_DEFAULT_LOCALE = 'pl'
@@ -0,0 +1,96 @@
+"""Gunicorn settings for the wishlist app.
+
+Run with ``gunicorn -c gunicorn.conf.py``. The app is imported and warmed up
+once in the master (preload_app), the resulting heap is frozen out of the
+cyclic GC so collections in workers do not touch (and un-share) those pages,
+and worker/thread counts are derived from the CPUs available to the process.
+Every option can be overridden with the GUNICORN_* environment variables
+below or the usual command line flags.
+"""
+import gc
+import os
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        return os.cpu_count() or 1
+
+
+def _memory_usage():
+    """Return (rss_mb, shared_mb) for the current process.
+
+    smaps_rollup counts copy-on-write pages still shared with the master as
+    shared, which is what preloading and gc.freeze() are meant to maximise.
+    """
+    try:
+        fields = {}
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+        shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+        return fields['Rss'] / 1024, shared / 1024
+    except (OSError, KeyError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '10000'))
+preload_app = True
+workers = int(os.environ.get('GUNICORN_WORKERS', _cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+# Recycle workers now and then to cap slow leaks; jitter avoids simultaneous restarts
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+# Log worker memory every N requests (0 disables)
+rss_report_interval = int(os.environ.get('GUNICORN_RSS_REPORT_INTERVAL', 1000))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+# Server-sent event streams: share messages between workers. Each open stream holds one
+# idle gthread thread, so only a small fixed number per worker may stream and the rest
+# stay free for ordinary requests (none with fewer than 4 threads); refused pages retry later
+os.environ.setdefault('NOTIFICATIONS_BACKEND', 'database' if workers > 1 else 'local')
+os.environ.setdefault('NOTIFICATIONS_MAX_STREAMS', str(min(2, threads // 4)))
+
+
+def when_ready(server):
+    # The preloaded app is fully imported and warmed at this point; workers fork next
+    from app.services import metrics
+    metrics.reset_directory(server.app.wsgi())
+    gc.collect()
+    gc.freeze()
+    rss, shared = _memory_usage()
+    server.log.info('master ready: %d workers x %d threads, rss=%.1fMB, %d objects frozen',
+                    workers, threads, rss, gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    worker._requests_served = 0
+    rss, shared = _memory_usage()
+    server.log.info('worker %s started: rss=%.1fMB shared=%.1fMB', worker.pid, rss, shared)
+
+
+def post_request(worker, req, environ, resp):
+    if not rss_report_interval:
+        return
+    worker._requests_served = getattr(worker, '_requests_served', 0) + 1
+    if worker._requests_served % rss_report_interval == 0:
+        rss, shared = _memory_usage()
+        worker.log.info('worker %s after %d requests: rss=%.1fMB shared=%.1fMB private=%.1fMB',
+                        worker.pid, worker._requests_served, rss, shared, rss - shared)
+
+
+def worker_exit(server, worker):
+    # Keep the exiting worker's request counters in the shared metrics totals
+    from app.services import metrics
+    metrics.retire(worker.wsgi)
+    rss, shared = _memory_usage()
+    server.log.info('worker %s exiting after %d requests: rss=%.1fMB shared=%.1fMB',
+                    worker.pid, getattr(worker, '_requests_served', 0), rss, shared)
@@ -0,0 +1,23 @@
+"""add dashboard version counter to user
+
+Revision ID: a3b5c7d9e1f3
+revises: f2a4c6e8b0d2
+Create Date: 2025-12-01 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3b5c7d9e1f3'
+down_revision = 'f2a4c6e8b0d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('dashboard_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('dashboard_version')
@@ -0,0 +1,40 @@
+"""add drawing exclusions and previous event link
+
+Revision ID: a7b9c1d3e5f7
+revises: f6a8b0c1d2e3
+Create Date: 2025-11-12 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7b9c1d3e5f7'
+down_revision = 'f6a8b0c1d2e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.add_column(sa.Column('previous_event_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_event_previous_event', 'event', ['previous_event_id'], ['id'], ondelete='SET NULL')
+
+    op.create_table(
+        'event_exclusion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('user_a_id', sa.Integer(), nullable=False),
+        sa.Column('user_b_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['event.id']),
+        sa.ForeignKeyConstraint(['user_a_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['user_b_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'user_a_id', 'user_b_id', name='uq_event_exclusion_pair')
+    )
+
+
+def downgrade():
+    op.drop_table('event_exclusion')
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.drop_constraint('fk_event_previous_event', type_='foreignkey')
+        batch_op.drop_column('previous_event_id')
@@ -0,0 +1,39 @@
+"""add folded nickname for user search ranking
+
+Revision ID: b5d7f9a1c3e5
+revises: a3b5c7d9e1f3
+Create Date: 2025-12-02 00:00:00.000000
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b5d7f9a1c3e5'
+down_revision = 'a3b5c7d9e1f3'
+branch_labels = None
+depends_on = None
+
+
+def _fold(value):
+    # Same folding as app/services/user_search.search_key at the time of writing
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def upgrade():
+    op.add_column('user', sa.Column('nickname_key', sa.String(length=64), nullable=True))
+    bind = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('nickname', sa.String),
+                    sa.column('nickname_key', sa.String))
+    rows = bind.execute(sa.select(user.c.id, user.c.nickname)).all()
+    if rows:
+        bind.execute(user.update().where(user.c.id == sa.bindparam('uid'))
+                     .values(nickname_key=sa.bindparam('key')),
+                     [{'uid': row.id, 'key': _fold(row.nickname)} for row in rows])
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('nickname_key')
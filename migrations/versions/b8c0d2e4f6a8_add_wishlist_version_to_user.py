@@ -0,0 +1,23 @@
+"""add wishlist version counter to user
+
+Revision ID: b8c0d2e4f6a8
+revises: a7b9c1d3e5f7
+Create Date: 2025-11-13 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8c0d2e4f6a8'
+down_revision = 'a7b9c1d3e5f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('wishlist_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('wishlist_version')
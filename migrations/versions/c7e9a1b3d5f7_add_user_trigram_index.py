@@ -0,0 +1,62 @@
+"""add trigram user index for mid-word user search matches
+
+Revision ID: c7e9a1b3d5f7
+revises: b5d7f9a1c3e5
+Create Date: 2025-12-02 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c7e9a1b3d5f7'
+down_revision = 'b5d7f9a1c3e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # FTS5 is SQLite/libsql specific and the trigram tokenizer needs SQLite 3.34+;
+    # without this table app/services/user_search.py only matches word prefixes.
+    if bind.dialect.name != 'sqlite':
+        return
+    version = tuple(int(part) for part in bind.exec_driver_sql('SELECT sqlite_version()').scalar().split('.'))
+    if version < (3, 34, 0):
+        return
+    op.execute("""
+        CREATE VIRTUAL TABLE user_trigram USING fts5(
+            nickname, name, surname,
+            content='user', content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    # Same sync triggers as user_fts (f6a8b0c1d2e3)
+    op.execute("""
+        CREATE TRIGGER user_trigram_ai AFTER INSERT ON "user" BEGIN
+            INSERT INTO user_trigram(rowid, nickname, name, surname)
+            VALUES (new.id, new.nickname, new.name, new.surname);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER user_trigram_ad AFTER DELETE ON "user" BEGIN
+            INSERT INTO user_trigram(user_trigram, rowid, nickname, name, surname)
+            VALUES ('delete', old.id, old.nickname, old.name, old.surname);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER user_trigram_au AFTER UPDATE OF nickname, name, surname ON "user" BEGIN
+            INSERT INTO user_trigram(user_trigram, rowid, nickname, name, surname)
+            VALUES ('delete', old.id, old.nickname, old.name, old.surname);
+            INSERT INTO user_trigram(rowid, nickname, name, surname)
+            VALUES (new.id, new.nickname, new.name, new.surname);
+        END
+    """)
+    op.execute("INSERT INTO user_trigram(user_trigram) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS user_trigram_au')
+    op.execute('DROP TRIGGER IF EXISTS user_trigram_ad')
+    op.execute('DROP TRIGGER IF EXISTS user_trigram_ai')
+    op.execute('DROP TABLE IF EXISTS user_trigram')
@@ -0,0 +1,27 @@
+"""add secondary indexes for hot access paths
+
+Revision ID: c9d1e3f5a7b9
+revises: b8c0d2e4f6a8
+Create Date: 2025-11-14 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c9d1e3f5a7b9'
+down_revision = 'b8c0d2e4f6a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_wishlist_item_user_created', 'wishlist_item', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_wishlist_item_user_currency', 'wishlist_item', ['user_id', 'currency'])
+    op.create_index('ix_event_participant_user_status', 'event_participant', ['user_id', 'status'])
+    op.create_index('ix_event_admin_id', 'event', ['admin_id'])
+
+
+def downgrade():
+    op.drop_index('ix_event_admin_id', table_name='event')
+    op.drop_index('ix_event_participant_user_status', table_name='event_participant')
+    op.drop_index('ix_wishlist_item_user_currency', table_name='wishlist_item')
+    op.drop_index('ix_wishlist_item_user_created', table_name='wishlist_item')
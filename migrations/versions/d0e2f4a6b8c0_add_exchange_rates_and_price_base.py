@@ -0,0 +1,35 @@
+"""add exchange rates and normalized wishlist item price
+
+Revision ID: d0e2f4a6b8c0
+revises: c9d1e3f5a7b9
+Create Date: 2025-11-15 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd0e2f4a6b8c0'
+down_revision = 'c9d1e3f5a7b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'exchange_rate',
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('rate', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('currency')
+    )
+    op.add_column('wishlist_item', sa.Column('price_base', sa.Float(), nullable=True))
+    op.create_index('ix_wishlist_item_user_price_base', 'wishlist_item', ['user_id', 'price_base', 'id'])
+    # Items in the default base currency (PLN) need no rate; others are filled by `flask fx load`
+    op.execute("UPDATE wishlist_item SET price_base = price WHERE currency = 'PLN' OR currency IS NULL")
+
+
+def downgrade():
+    op.drop_index('ix_wishlist_item_user_price_base', table_name='wishlist_item')
+    with op.batch_alter_table('wishlist_item') as batch_op:
+        batch_op.drop_column('price_base')
+    op.drop_table('exchange_rate')
@@ -0,0 +1,21 @@
+"""add index on notification.created_at for the retention purge
+
+Revision ID: d2e4f6a8b0c2
+revises: c7e9a1b3d5f7
+Create Date: 2025-12-04 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2e4f6a8b0c2'
+down_revision = 'c7e9a1b3d5f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notification_created_at', 'notification', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_created_at', table_name='notification')
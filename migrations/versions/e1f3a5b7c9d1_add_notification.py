@@ -0,0 +1,29 @@
+"""add notification table for server-sent event updates
+
+Revision ID: e1f3a5b7c9d1
+revises: d0e2f4a6b8c0
+Create Date: 2025-11-22 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e1f3a5b7c9d1'
+down_revision = 'd0e2f4a6b8c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('channel', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('notification')
@@ -0,0 +1,39 @@
+"""add link_preview cache table for wishlist item links
+
+Revision ID: f2a4c6e8b0d2
+revises: e1f3a5b7c9d1
+Create Date: 2025-11-29 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2a4c6e8b0d2'
+down_revision = 'e1f3a5b7c9d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'link_preview',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=256), nullable=False),
+        sa.Column('domain', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('http_status', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=256), nullable=True),
+        sa.Column('description', sa.String(length=512), nullable=True),
+        sa.Column('image', sa.String(length=512), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('currency', sa.String(length=3), nullable=True),
+        sa.Column('error', sa.String(length=256), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('url')
+    )
+
+
+def downgrade():
+    op.drop_table('link_preview')
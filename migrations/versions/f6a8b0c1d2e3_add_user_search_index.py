@@ -0,0 +1,61 @@
+"""add full-text user search index
+
+Revision ID: f6a8b0c1d2e3
+revises: e5f7a9c0d1e2
+Create Date: 2025-11-10 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f6a8b0c1d2e3'
+down_revision = 'e5f7a9c0d1e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite/libsql specific; other backends use the LIKE fallback in
+    # app/services/user_search.py.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # External-content index over user(nickname, name, surname); prefix indexes
+    # keep short type-ahead queries from scanning the whole vocabulary.
+    op.execute("""
+        CREATE VIRTUAL TABLE user_fts USING fts5(
+            nickname, name, surname,
+            content='user', content_rowid='id',
+            prefix='1 2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    # Triggers keep the index in sync with every write to the user table
+    op.execute("""
+        CREATE TRIGGER user_fts_ai AFTER INSERT ON "user" BEGIN
+            INSERT INTO user_fts(rowid, nickname, name, surname)
+            VALUES (new.id, new.nickname, new.name, new.surname);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER user_fts_ad AFTER DELETE ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, nickname, name, surname)
+            VALUES ('delete', old.id, old.nickname, old.name, old.surname);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER user_fts_au AFTER UPDATE OF nickname, name, surname ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, nickname, name, surname)
+            VALUES ('delete', old.id, old.nickname, old.name, old.surname);
+            INSERT INTO user_fts(rowid, nickname, name, surname)
+            VALUES (new.id, new.nickname, new.name, new.surname);
+        END
+    """)
+    op.execute("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS user_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS user_fts_ad')
+    op.execute('DROP TRIGGER IF EXISTS user_fts_ai')
+    op.execute('DROP TABLE IF EXISTS user_fts')
@@ -0,0 +1,100 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import event as sa_event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app import db
+from app.models.models import User
+from config import Config
+
+PASSWORD = 'secret'
+MIGRATIONS = Path(__file__).resolve().parent.parent / 'migrations' / 'versions'
+SEARCH_MIGRATIONS = ('f6a8b0c1d2e3_add_user_search_index.py', 'c7e9a1b3d5f7_add_user_trigram_index.py')
+
+
+def upgrade(connection, filename):
+    """Run one migration's upgrade() on a database built with db.create_all()."""
+    spec = importlib.util.spec_from_file_location(filename, MIGRATIONS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with Operations.context(MigrationContext.configure(connection)):
+        module.upgrade()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "test.db"}')
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(Config, 'JINJA_BYTECODE_CACHE_DIR', '')
+    monkeypatch.setattr(Config, 'BABEL_DEFAULT_LOCALE', 'en')
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    created = []
+
+    def make(nickname=None, **fields):
+        n = len(created) + 1
+        nickname = nickname or f'user{n}'
+        with app.app_context():
+            user = User(email=f'{nickname}@example.test', nickname=nickname, name=fields.pop('name', f'Name{n}'),
+                        surname=fields.pop('surname', f'Surname{n}'),
+                        password_hash=generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000'), **fields)
+            db.session.add(user)
+            db.session.commit()
+            created.append(user.id)
+            return user.id
+    return make
+
+
+@pytest.fixture
+def login(app):
+    def login(user_id):
+        with app.app_context():
+            email = db.session.get(User, user_id).email
+        client = app.test_client()
+        response = client.post('/auth/login', json={'email': email, 'password': PASSWORD})
+        assert response.status_code == 200, response.data
+        return client
+    return login
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        sa_event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        sa_event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements(app):
+    def counter():
+        with app.app_context():
+            return StatementCounter(db.engine)
+    return counter
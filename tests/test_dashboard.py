@@ -0,0 +1,105 @@
+from sqlalchemy import create_engine
+
+from app import db
+from app.models.models import Event
+from app.models.models import User
+from app.services import dashboard
+
+
+def _create_event(client, name):
+    response = client.post('/events/create', data={'name': name, 'budget_amount': '20', 'budget_currency': 'PLN'})
+    assert response.status_code == 302
+    with client.application.app_context():
+        return db.session.query(Event.id).filter(Event.name == name).scalar()
+
+
+def _dashboard(app, user_id):
+    with app.app_context():
+        return dashboard.get_dashboard(user_id)
+
+
+def test_changes_bump_the_version_used_as_cache_key(app, make_user, login):
+    admin_id, guest_id = make_user(), make_user()
+    admin = login(admin_id)
+    event_id = _create_event(admin, 'Office party')
+    assert _dashboard(app, guest_id).pending_events == []  # cached for the current version
+
+    assert admin.post(f'/events/{event_id}/invite', data={'nickname': 'user2'}).status_code == 302
+    assert [e.id for e in _dashboard(app, guest_id).pending_events] == [event_id]
+
+    guest = login(guest_id)
+    assert guest.post(f'/events/{event_id}/accept').status_code == 302
+    data = _dashboard(app, guest_id)
+    assert ([e.id for e in data.events], data.pending_events) == ([event_id], [])
+
+    admin.post(f'/events/{event_id}/archive')
+    assert [e.id for e in _dashboard(app, guest_id).archived_events] == [event_id]
+
+
+def test_bulk_invitations_bump_the_invitees(app, make_user, login):
+    admin_id = make_user()
+    invitees = [make_user() for _ in range(3)]
+    admin = login(admin_id)
+    event_id = _create_event(admin, 'Team dinner')
+    for user_id in invitees:
+        assert _dashboard(app, user_id).pending_events == []
+
+    response = admin.post(f'/events/{event_id}/invite/confirm', json={'user_ids': invitees})
+    assert response.get_json()['invited_count'] == 3
+    for user_id in invitees:
+        assert [e.id for e in _dashboard(app, user_id).pending_events] == [event_id]
+
+
+def test_a_change_committed_elsewhere_is_seen_without_local_invalidation(app, make_user, login):
+    admin_id, guest_id = make_user(), make_user()
+    admin = login(admin_id)
+    event_id = _create_event(admin, 'Launch')
+    assert admin.post(f'/events/{event_id}/invite', data={'nickname': 'user2'}).status_code == 302
+    assert [e.name for e in _dashboard(app, guest_id).pending_events] == ['Launch']
+
+    # Another worker renames the event: only the database changes, this worker's cache is untouched
+    other = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    with app.app_context():
+        version = dashboard.current_version(guest_id)
+    with other.begin() as connection:
+        connection.execute(Event.__table__.update().values(name='Launch (moved)'))
+        dashboard.bump(connection, [guest_id, admin_id])
+    other.dispose()
+    with app.app_context():
+        assert dashboard.current_version(guest_id) == version + 1
+    assert [e.name for e in _dashboard(app, guest_id).pending_events] == ['Launch (moved)']
+
+
+def test_cached_dashboard_costs_one_lookup(app, make_user, login, count_statements):
+    user_id = make_user()
+    _create_event(login(user_id), 'Party')
+    _dashboard(app, user_id)
+    with count_statements() as counter:
+        _dashboard(app, user_id)
+    assert counter.count == 1
+    with app.app_context():
+        assert db.session.get(User, user_id).dashboard_version > 0
+
+
+def test_dashboard_streams_invitations_and_checks_the_version_on_reconnect(app, make_user, login):
+    admin_id, guest_id = make_user(), make_user()
+    admin, guest = login(admin_id), login(guest_id)
+    event_id = _create_event(admin, 'Book club')
+    page = guest.get('/events/dashboard').get_data(as_text=True)
+    version = guest.get('/events/dashboard/version').get_json()['version']
+    assert f'const RENDERED_VERSION = {version};' in page
+    assert "listenForUpdates('/events/stream'" in page
+
+    app.config['NOTIFICATIONS_STREAM_TIMEOUT'] = 5
+    response = guest.get('/events/stream', buffered=False)
+    try:
+        assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+        # Published on the guest's user channel, which no event page of theirs is subscribed to
+        assert admin.post(f'/events/{event_id}/invite', data={'nickname': 'user2'}).status_code == 302
+        message = next(chunks).decode()
+    finally:
+        response.close()
+    assert message.startswith('event: invited\n') and '"event_name":"Book club"' in message
+    assert guest.get('/events/dashboard/version').get_json()['version'] > version
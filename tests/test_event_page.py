@@ -0,0 +1,101 @@
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import EVENT_PARTICIPANT_STATUS_PENDING
+from app.models.models import Event
+from app.models.models import EventExclusion
+from app.models.models import EventParticipant
+
+
+def _event_with_participants(app, make_user, admin_id, viewer_id, size):
+    """Event with size accepted participants besides admin and viewer; the viewer has drawn."""
+    others = [make_user() for _ in range(size)]
+    with app.app_context():
+        event = Event(name=f'Party of {size}', budget_amount=50, budget_currency='PLN', admin_user_id=admin_id)
+        db.session.add(event)
+        db.session.flush()
+        members = list(dict.fromkeys([admin_id, viewer_id] + others))
+        for index, user_id in enumerate(members):
+            db.session.add(EventParticipant(
+                event_id=event.id, user_id=user_id, is_admin=user_id == admin_id,
+                status=EVENT_PARTICIPANT_STATUS_ACCEPTED,
+                assigned_recipient_user_id=members[(index + 1) % len(members)],
+                drawn_at=datetime.now(timezone.utc) if user_id == viewer_id else None))
+        event.drawing_enabled = True
+        db.session.commit()
+        return event.id
+
+
+@pytest.mark.parametrize('viewer_is_admin', [False, True])
+def test_view_event_query_count_is_independent_of_participants(app, make_user, login, count_statements,
+                                                               viewer_is_admin):
+    admin_id = make_user()
+    viewer_id = admin_id if viewer_is_admin else make_user()
+    small = _event_with_participants(app, make_user, admin_id, viewer_id, 5)
+    large = _event_with_participants(app, make_user, admin_id, viewer_id, 15)
+    client = login(viewer_id)
+    assert client.get(f'/events/{small}').status_code == 200  # warm per-worker caches
+
+    counts = []
+    for event_id in (small, large):
+        with count_statements() as counter:
+            response = client.get(f'/events/{event_id}')
+        assert response.status_code == 200
+        counts.append(counter.count)
+    assert counts[0] == counts[1], counts
+
+
+def test_infeasible_drawing_names_the_blocked_participants(app, make_user, login):
+    admin_id, blocked_id, other_id = make_user(), make_user('Żaneta'), make_user()
+    with app.app_context():
+        event = Event(name='Blocked', budget_amount=50, budget_currency='PLN', admin_user_id=admin_id)
+        db.session.add(event)
+        db.session.flush()
+        for user_id in (admin_id, blocked_id, other_id):
+            db.session.add(EventParticipant(event_id=event.id, user_id=user_id, is_admin=user_id == admin_id,
+                                            status=EVENT_PARTICIPANT_STATUS_ACCEPTED))
+        for user_id in (admin_id, other_id):
+            a, b = sorted((user_id, blocked_id))
+            db.session.add(EventExclusion(event_id=event.id, user_a_id=a, user_b_id=b))
+        db.session.commit()
+        event_id = event.id
+    client = login(admin_id)
+
+    response = client.post(f'/events/{event_id}/drawing/enable')
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        [(category, message)] = session['_flashes']
+    assert category == 'error' and message.endswith('No valid recipients for: Żaneta.')
+
+
+def test_handlers_check_permissions_through_event_access(app, make_user, login):
+    admin_id, member_id, pending_id, outsider_id = make_user(), make_user(), make_user(), make_user()
+    with app.app_context():
+        event = Event(name='Access', budget_amount=50, budget_currency='PLN', admin_user_id=admin_id)
+        db.session.add(event)
+        db.session.flush()
+        for user_id, status in ((admin_id, EVENT_PARTICIPANT_STATUS_ACCEPTED),
+                                (member_id, EVENT_PARTICIPANT_STATUS_ACCEPTED), (pending_id, EVENT_PARTICIPANT_STATUS_PENDING)):
+            db.session.add(EventParticipant(event_id=event.id, user_id=user_id, is_admin=user_id == admin_id,
+                                            status=status))
+        db.session.commit()
+        event_id = event.id
+    admin, member, pending = login(admin_id), login(member_id), login(pending_id)
+
+    def invite(client):
+        return client.post(f'/events/{event_id}/invite/confirm', json={'user_ids': [outsider_id]}).status_code
+
+    assert member.post(f'/events/{event_id}/archive').status_code == 403
+    assert pending.get(f'/events/{event_id}/invite').status_code == 403
+    assert invite(pending) == 403
+    assert admin.post(f'/events/{event_id}/archive').status_code == 302
+    assert invite(member) == 400
+    assert admin.post(f'/events/{event_id}/unarchive').status_code == 302
+    assert admin.post(f'/events/{event_id}/drawing/enable').status_code == 302
+    assert invite(member) == 400
+    assert admin.post(f'/events/{event_id}/drawing/reset').status_code == 302
+    assert invite(member) == 200
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from app.services import link_fetcher
+from app.services import link_preview
+from config import Config
+
+PAGE = b'''<html><head><meta charset="utf-8"><title> Plain  title </title>
+<meta property="og:title" content="Fancy Lamp &amp; Co">
+<meta property="og:image" content="/img/lamp.jpg">
+<meta property="product:price:amount" content="1 299,99"><meta property="product:price:currency" content="pln">
+</head><body></body></html>'''
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b'', **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace('_', '-'), value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/page':
+            self._reply(200, PAGE, Content_Type='text/html')
+        elif self.path == '/redirect':
+            self._reply(302, Location='/page')
+        else:
+            self._reply(404)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(urls, allow_private):
+    async def run():
+        fetcher = link_fetcher.Fetcher(domain_interval=0, timeout=5, allow_private=allow_private)
+        try:
+            return await fetcher.fetch_many(urls)
+        finally:
+            fetcher.close()
+    return asyncio.run(run())
+
+
+def test_fetch_follows_redirects_and_reads_page_metadata(stub_server):
+    page, redirected, missing = _fetch([f'{stub_server}/page', f'{stub_server}/redirect', f'{stub_server}/missing'],
+                                       allow_private=True)
+    for preview in (page, redirected):
+        assert preview['status'] == 'ok', preview
+        assert preview['title'] == 'Fancy Lamp & Co'
+        assert preview['image'] == f'{stub_server}/img/lamp.jpg'
+        assert (preview['price'], preview['currency']) == (1299.99, 'PLN')
+    assert redirected['url'] == f'{stub_server}/redirect'
+    assert (missing['status'], missing['error']) == ('error', 'HTTP 404')
+
+
+def test_loopback_is_refused_unless_private_addresses_are_allowed(stub_server):
+    [preview] = _fetch([f'{stub_server}/page'], allow_private=False)
+    assert (preview['status'], preview['error']) == ('error', '127.0.0.1 resolves to a non-public address')
+
+
+def test_previews_are_off_by_default(app):
+    assert app.config['LINK_PREVIEW_ENABLED'] is False
+    assert 'link_preview' not in app.extensions
+
+
+@pytest.fixture
+def previews_enabled(monkeypatch):
+    monkeypatch.setattr(Config, 'LINK_PREVIEW_ENABLED', True)
+    monkeypatch.setattr(Config, 'LINK_PREVIEW_ALLOW_PRIVATE', True)
+    monkeypatch.setattr(Config, 'LINK_PREVIEW_DOMAIN_INTERVAL', 0)
+
+
+def test_saved_links_are_previewed_in_the_background(previews_enabled, app, make_user, login, stub_server):
+    client = login(make_user())
+    url = f'{stub_server}/redirect'
+    assert client.post('/wishlist/', json={'name': 'Lamp', 'link': url}).status_code == 201
+
+    deadline = time.monotonic() + 5
+    previews = {}
+    while url not in previews and time.monotonic() < deadline:
+        time.sleep(0.05)
+        previews = client.get('/wishlist/previews', query_string={'url': url}).get_json()
+    assert previews[url]['title'] == 'Fancy Lamp & Co'
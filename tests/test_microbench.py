@@ -0,0 +1,69 @@
+import json
+
+from app import db
+from app.models.models import Event
+from app.models.models import User
+from app.models.models import WishlistItem
+from app.services import benchmark
+from app.services import microbench
+from app.services import serialization
+
+
+def _run(app, name, sizes, repeat=2):
+    with app.app_context():
+        return microbench.run([name], sizes, repeat)
+
+
+def _row_counts(app):
+    with app.app_context():
+        return db.session.query(User).count(), db.session.query(Event).count()
+
+
+def test_invitations_compare_per_id_lookups_with_bulk_insert(app):
+    empty = _row_counts(app)
+    result = _run(app, 'invitations', [5, 20])
+
+    scenarios = result['scenarios']
+    assert set(scenarios) == {f'invitations n={n} {v}' for n in (5, 20) for v in microbench.VARIANTS}
+    assert all(stats['errors'] == 0 for stats in scenarios.values())
+    # the old loop looks up every invitee twice, the bulk path issues a fixed number of statements
+    assert scenarios['invitations n=5 before']['queries'] >= 2 * 5
+    assert scenarios['invitations n=20 before']['queries'] >= 2 * 20
+    assert scenarios['invitations n=20 after']['queries'] == scenarios['invitations n=5 after']['queries']
+    assert _row_counts(app) == empty  # fixtures are rolled back
+
+
+def test_results_can_be_saved_and_compared_like_bench_results(app, tmp_path):
+    result = _run(app, 'invitations', [3], repeat=1)
+    path = benchmark.save(result, str(tmp_path / 'micro.json'))
+    assert result['meta']['driver'] == 'micro'
+    assert [row[0] for row in benchmark.compare(benchmark.load(path), result, 'p50_ms')] == list(result['scenarios'])
+    [(name, size, before, after, ratio)] = microbench.speedups(result)
+    assert (name, size) == ('invitations', 3) and before > 0 and after > 0
+
+
+def test_drawing_variants_produce_derangements(app):
+    result = _run(app, 'drawing', [2, 50])
+    assert all(stats['errors'] == 0 and stats['queries'] is None for stats in result['scenarios'].values())
+    ids = microbench.BENCHMARKS['drawing'].setup(50)
+    for fn in (microbench.BENCHMARKS['drawing'].before, microbench.BENCHMARKS['drawing'].after):
+        assignment = fn(ids)
+        assert sorted(assignment.values()) == ids and all(giver != recipient for giver, recipient in assignment.items())
+
+
+def test_login_checks_the_password_in_every_thread(app):
+    result = _run(app, 'login', [2], repeat=1)
+    assert [stats['errors'] for stats in result['scenarios'].values()] == [0, 0]
+    assert result['scenarios']['login n=2 after']['per_unit'] == 'logins'
+
+
+def test_serialization_variants_encode_the_same_items(app):
+    result = _run(app, 'serialization', [25], repeat=1)
+    assert all(stats['errors'] == 0 and stats['queries'] == 1 for stats in result['scenarios'].values())
+    with app.app_context():
+        user_id = microbench.BENCHMARKS['serialization'].setup(3)
+        query = WishlistItem.query.filter_by(user_id=user_id)
+        projected = json.loads(serialization.items_response(serialization.project_items(query)).get_data())
+        assert projected == [{field: getattr(item, field) for field in serialization.ITEM_FIELDS} for item in query]
+        db.session.rollback()
+    assert _row_counts(app) == (0, 0)
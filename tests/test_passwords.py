@@ -0,0 +1,31 @@
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.models import User
+from app.services import passwords
+
+
+def _app(method):
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_METHOD'] = method
+    passwords.init_app(app)
+    return app
+
+
+def test_short_method_spec_matches_the_hashes_it_produces():
+    with _app('scrypt').app_context():
+        pw_hash = passwords.hash_password('secret')
+        assert pw_hash.startswith('scrypt:32768:8:1$')
+        assert not passwords.needs_rehash(pw_hash)
+        assert passwords.needs_rehash(generate_password_hash('secret', 'scrypt:16384:8:1'))
+        assert passwords.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+
+
+def test_login_keeps_a_current_hash(app, make_user, login):
+    user_id = make_user()
+    with app.app_context():
+        before = db.session.get(User, user_id).password_hash
+    login(user_id)
+    with app.app_context():
+        assert db.session.get(User, user_id).password_hash == before
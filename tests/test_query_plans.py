@@ -0,0 +1,33 @@
+from app import db
+from app.services import query_plans
+from app.services import user_search
+from tests.conftest import SEARCH_MIGRATIONS
+from tests.conftest import upgrade
+
+
+def _check(app):
+    user_search._tables_present.clear()
+    try:
+        with app.app_context():
+            return query_plans.check()
+    finally:
+        user_search._tables_present.clear()
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for filename in SEARCH_MIGRATIONS:
+                upgrade(connection, filename)
+
+    results = _check(app)
+    assert set(results) == set(query_plans.HOT_QUERIES)
+    assert {name: scans for name, (plan, scans) in results.items() if scans} == {}
+    # The search entries really go through the FTS5 and trigram indexes
+    assert any('user_fts' in line for line in results['public.search_users (prefix)'][0])
+    assert any('user_trigram' in line for line in results['public.search_users (mid-word)'][0])
+
+
+def test_like_search_fallback_is_reported_as_a_full_scan(app):
+    results = _check(app)
+    assert results['public.search_users (prefix)'][1] == ['user']
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.services import startup
+from config import Config
+
+ROOT = Path(__file__).resolve().parent.parent
+# Loaded only when their feature is enabled, or a command needs them
+OPTIONAL_MODULES = ('flask_migrate', 'app.services.link_fetcher', 'app.services.metrics', 'app.services.slow_query')
+
+
+@pytest.fixture
+def cold_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "startup.db"}')
+    monkeypatch.setenv('JINJA_BYTECODE_CACHE_DIR', str(tmp_path / 'jinja'))
+    for name in ('LINK_PREVIEW_ENABLED', 'METRICS_ENABLED', 'SLOW_QUERY_THRESHOLD_MS'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_cold_start_stays_within_budget(cold_env):
+    report = startup.measure('/login', cwd=str(ROOT), breakdown=False)
+    assert report['status'] == 200
+    assert report['time_to_first_response'] * 1000 <= Config.STARTUP_BUDGET_MS, report
+
+
+def test_disabled_features_are_not_imported(cold_env):
+    probe = ('import sys; from app import create_app; create_app(); '
+             'print(",".join(sorted(name for name in sys.argv[1:] if name in sys.modules)))')
+    proc = subprocess.run([sys.executable, '-c', probe, *OPTIONAL_MODULES], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+    assert proc.stdout.strip() == ''
@@ -0,0 +1,80 @@
+import pytest
+
+from app import db
+from app.models.models import User
+from app.services import user_search
+from tests.conftest import SEARCH_MIGRATIONS
+from tests.conftest import upgrade
+
+
+@pytest.fixture(params=['fts', 'like'])
+def backend(request, app):
+    """Search with the FTS5 indexes from the migrations, or through the LIKE fallback."""
+    if request.param == 'fts':
+        with app.app_context():
+            with db.engine.begin() as connection:
+                for filename in SEARCH_MIGRATIONS:
+                    upgrade(connection, filename)
+    user_search._tables_present.clear()
+    yield request.param
+    user_search._tables_present.clear()
+
+
+def _search(app, query, limit=20, cursor=None):
+    with app.app_context():
+        return user_search.search_users(query, limit, cursor)
+
+
+def _nicknames(app, query):
+    return [(row.nickname, row.tier) for row in _search(app, query)[0]]
+
+
+def test_polish_nicknames_are_ranked_by_unicode_folding(app, make_user, backend):
+    make_user('Łukasz')
+    make_user('łukaszek')
+    make_user('Święty')
+    make_user('anna', name='Łucja')
+    with app.app_context():
+        assert user_search.has_fts_index() is (backend == 'fts')
+
+    assert _nicknames(app, 'ŁUKASZ') == [('Łukasz', 0), ('łukaszek', 1)]
+    assert _nicknames(app, 'świę') == [('Święty', 1)]
+    if backend == 'fts':
+        # The FTS tokenizer drops diacritics, and the ranking key folds the same way
+        assert _nicknames(app, 'swie') == [('Święty', 1)]
+        assert _nicknames(app, 'łuc') == [('anna', 2)]
+
+
+def test_mid_word_matches_come_last(app, make_user, backend):
+    make_user('marek')
+    make_user('kowalski')
+    make_user('bob', surname='Nowakowski')
+    make_user('ski', name='Ola')
+
+    assert _nicknames(app, 'ski') == [('ski', 0), ('bob', 3), ('kowalski', 3)]
+    # Under three characters only word prefixes match
+    assert _nicknames(app, 'ar') == ([] if backend == 'fts' else [('marek', 3)])
+
+
+def test_pages_follow_the_ranking(app, make_user, backend):
+    for n in range(5):
+        make_user(f'ola{n}')
+        make_user(f'kola{n}')
+    seen = []
+    rows, cursor = _search(app, 'ola', limit=3)
+    while True:
+        seen.extend(row.nickname for row in rows)
+        if cursor is None:
+            break
+        rows, cursor = _search(app, 'ola', limit=3, cursor=cursor)
+    assert seen == [f'ola{n}' for n in range(5)] + [f'kola{n}' for n in range(5)]
+
+
+def test_nickname_key_follows_renames(app, make_user):
+    user_id = make_user('Żaneta')
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.nickname_key == 'zaneta'
+        user.nickname = 'Ćma'
+        db.session.commit()
+        assert db.session.get(User, user_id).nickname_key == 'cma'
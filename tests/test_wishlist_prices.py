@@ -0,0 +1,63 @@
+from app import db
+from app.models.models import WishlistItem
+from app.services import engine
+from app.services import fx
+
+
+def _item(app, item_id):
+    with app.app_context():
+        item = db.session.get(WishlistItem, item_id)
+        return item.price, item.currency, item.price_base
+
+
+def test_add_and_edit_coerce_and_validate_prices(app, make_user, login):
+    client = login(make_user())
+
+    reply = client.post('/wishlist/', json={'name': 'Lamp', 'price': '12.5', 'currency': 'pln'})
+    assert reply.status_code == 201
+    item_id = reply.get_json()['id']
+    assert _item(app, item_id) == (12.5, 'PLN', 12.5)
+
+    assert client.put(f'/wishlist/{item_id}', json={'price': ''}).status_code == 200
+    assert _item(app, item_id) == (None, 'PLN', None)
+
+    for price in ('abc', -1, True, 'nan'):
+        assert client.post('/wishlist/', json={'name': 'Mug', 'price': price}).status_code == 400
+        assert client.put(f'/wishlist/{item_id}', json={'price': price}).status_code == 400
+    assert client.post('/wishlist/', json=['not', 'an', 'object']).status_code == 400
+    assert client.put(f'/wishlist/{item_id}', json={'name': 'Desk lamp'}).status_code == 200
+    assert _item(app, item_id) == (None, 'PLN', None)
+
+
+def test_non_numeric_price_gets_no_base_price(app, make_user):
+    user_id = make_user()
+    with app.app_context():
+        item = WishlistItem(name='Odd', price='12.5', currency='PLN', user_id=user_id)
+        db.session.add(item)
+        db.session.flush()
+        assert item.price_base is None
+        db.session.rollback()
+
+
+def test_price_filters_fall_back_to_raw_prices_without_a_rate(app, make_user, login):
+    owner_id = make_user()
+    client = login(owner_id)
+    for name, price, currency in (('Book', 40, 'PLN'), ('Scarf', 20, 'EUR'), ('Game', 80, 'EUR'), ('Cap', 15, 'USD')):
+        assert client.post('/wishlist/', json={'name': name, 'price': price, 'currency': currency}).status_code == 201
+
+    def names(**params):
+        reply = client.get(f'/public/wishlist/{owner_id}', query_string=params)
+        assert reply.status_code == 200, reply.data
+        return sorted(item['name'] for item in reply.get_json())
+
+    # No EUR or USD rates are stored: only same-currency items can be compared
+    assert names(min_price=10) == ['Book']
+    assert names(min_price=10, currency='EUR') == ['Game', 'Scarf']
+    assert names(max_price=50, currency='eur') == ['Scarf']
+    assert names(min_price=10, currency='USD') == ['Cap']
+    assert client.get(f'/public/wishlist/{owner_id}', query_string={'currency': 'XYZ'}).status_code == 400
+
+    with app.app_context():
+        engine.run_in_transaction(fx.store_rates, {'EUR': 4.0})
+    assert names(min_price=100) == ['Game']  # 320 PLN
+    assert names(max_price=50, currency='EUR') == ['Book', 'Scarf']  # 10 EUR and 20 EUR
@@ -0,0 +1,39 @@
+import io
+
+from app import db
+from app.models.models import WishlistItem
+
+
+def _items(app, user_id):
+    with app.app_context():
+        return sorted(db.session.query(WishlistItem.name, WishlistItem.link).filter_by(user_id=user_id).all())
+
+
+def test_oversized_import_writes_nothing(app, make_user, login):
+    app.config.update(WISHLIST_IMPORT_BATCH_SIZE=2, WISHLIST_IMPORT_MAX_ROWS=5)
+    user_id = make_user()
+    client = login(user_id)
+    body = 'name,price\n' + ''.join(f'Item {n},{n}\n' for n in range(6))
+
+    reply = client.post('/wishlist/import', data=body, content_type='text/csv')
+    assert reply.status_code == 413
+    assert _items(app, user_id) == []
+
+    reply = client.post('/wishlist/import', data=body.rsplit('Item 5', 1)[0], content_type='text/csv')
+    assert reply.status_code == 201 and reply.get_json()['imported'] == 5
+
+
+def test_csv_export_neutralizes_formulas_and_imports_back(app, make_user, login):
+    owner_id, other_id = make_user(), make_user()
+    owner = login(owner_id)
+    for name, link in (('=HYPERLINK("http://x.test","go")', None), ('+1 mug', '@link'), ('-', None), ('Lamp', None)):
+        assert owner.post('/wishlist/', json={'name': name, 'link': link}).status_code == 201
+
+    exported = owner.get('/wishlist/export?format=csv').get_data(as_text=True)
+    cells = [line.split(',', 1)[0] for line in exported.splitlines()[1:]]
+    assert cells == ['"\'=HYPERLINK(""http://x.test""', "'+1 mug", "'-", 'Lamp']
+
+    other = login(other_id)
+    reply = other.post('/wishlist/import', data={'file': (io.BytesIO(exported.encode()), 'wishlist.csv')})
+    assert reply.status_code == 201 and reply.get_json()['imported'] == 4
+    assert _items(app, other_id) == _items(app, owner_id)
@@ -0,0 +1,76 @@
+import multiprocessing
+import traceback
+
+from app import create_app
+from app import db
+from app.models.models import EVENT_PARTICIPANT_STATUS_ACCEPTED
+from app.models.models import Event
+from app.models.models import EventParticipant
+from app.models.models import User
+from tests.conftest import PASSWORD
+
+PROCESSES = 4
+ROUNDS = 8
+INVITEES = 3
+
+
+def _client(app, user_id):
+    with app.app_context():
+        email = db.session.get(User, user_id).email
+    client = app.test_client()
+    assert client.post('/auth/login', json={'email': email, 'password': PASSWORD}).status_code == 200
+    return client
+
+
+def _hammer(admin_id, invitee_ids, errors):
+    """One worker process: create events, invite, accept and draw as fast as possible."""
+    try:
+        app = create_app()  # forked: Config still points at the test database
+        app.config['TESTING'] = True
+        admin = _client(app, admin_id)
+        invitees = [_client(app, user_id) for user_id in invitee_ids]
+        for n in range(ROUNDS):
+            name = f'Stress {admin_id}-{n}'
+            assert admin.post('/events/create', data={'name': name, 'budget_amount': '20',
+                                                      'budget_currency': 'PLN'}).status_code == 302
+            with app.app_context():
+                event_id = db.session.query(Event.id).filter(Event.name == name).scalar()
+            reply = admin.post(f'/events/{event_id}/invite/confirm', json={'user_ids': invitee_ids})
+            assert reply.status_code == 200 and reply.get_json()['invited_count'] == INVITEES, reply.data
+            for client in invitees:
+                assert client.post(f'/events/{event_id}/accept').status_code == 302
+            assert admin.post(f'/events/{event_id}/drawing/enable').status_code == 302
+        with app.app_context():
+            db.engine.dispose()
+    except BaseException:
+        errors.put(traceback.format_exc())
+        raise
+
+
+def test_concurrent_invites_and_draws_from_several_processes(app, make_user):
+    # Invitees are shared between processes so their dashboard versions are contended too
+    invitee_ids = [make_user() for _ in range(INVITEES)]
+    admin_ids = [make_user() for _ in range(PROCESSES)]
+    with app.app_context():
+        db.engine.dispose()  # no pooled connections across the fork
+
+    context = multiprocessing.get_context('fork')
+    errors = context.Queue()
+    workers = [context.Process(target=_hammer, args=(admin_id, invitee_ids, errors)) for admin_id in admin_ids]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+    failures = []
+    while not errors.empty():
+        failures.append(errors.get())
+    assert not failures, '\n'.join(failures)
+    assert [worker.exitcode for worker in workers] == [0] * PROCESSES
+
+    with app.app_context():
+        events = Event.query.filter(Event.name.like('Stress %')).all()
+        assert len(events) == PROCESSES * ROUNDS
+        assert all(event.drawing_enabled for event in events)
+        assert EventParticipant.query.filter(
+            EventParticipant.status == EVENT_PARTICIPANT_STATUS_ACCEPTED,
+            EventParticipant.assigned_recipient_user_id.is_(None)).count() == 0
@@ -0,0 +1,6 @@
+"""WSGI entry point for production servers (used by gunicorn.conf.py)."""
+from app import create_app
+from app.warmup import warm_up
+
+app = create_app()
+warm_up(app)